@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, request, session, redirect, url_for, flash
+from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify
 from werkzeug.security import check_password_hash
-from db_manager import with_db
+from db_manager import with_db, reference_data, bump_reference_version, MEMBER_IDS_NAMESPACE
 from functools import wraps
+from scheduler import scheduler
+from fragment_cache import invalidate_after_request
+import query_monitor
+import tracing
 
 
 # 1. Define the Blueprint
@@ -75,16 +79,13 @@ def dashboard(conn):  # conn is injected by @with_db
             stats['companies'] = result_companies['total'] if result_companies else 0
             
             # 3. Count Active Jobs
-            cursor.execute("""
-                SELECT COUNT(*) AS total FROM jobs 
-                WHERE expires_at >= CURDATE() OR expires_at IS NULL
-            """)
+            cursor.execute("SELECT COUNT(*) AS total FROM jobs WHERE is_active = 1")
             result_jobs = cursor.fetchone()
             stats['jobs'] = result_jobs['total'] if result_jobs else 0
             
-            # 4. Fetch Categories
-            cursor.execute("SELECT * FROM profession_category ORDER BY category_name")
-            categories = cursor.fetchall()
+            # 4. Categories (reference cache, already ordered by name)
+            categories = [{'category_id': cat_id, 'category_name': name}
+                          for cat_id, name in reference_data('categories', cursor=cursor).items()]
 
     except Exception as e:
         # Security: Log the specific error server-side, show generic message to admin
@@ -109,6 +110,7 @@ def add_profession(conn): # conn is injected by @with_db
                     "INSERT INTO profession (pro_name, category_id) VALUES (%s, %s)", 
                     (pro_name, category_id)
                 )
+                bump_reference_version(cursor)
                 # conn.commit() is handled automatically by @with_db on success
                 flash(f"Profession '{pro_name}' added successfully!", "success")
         except Exception as e:
@@ -127,6 +129,7 @@ def add_skill(conn): # conn is injected by @with_db
         try:
             with conn.cursor() as cursor:
                 cursor.execute("INSERT INTO skills_list (skill_name) VALUES (%s)", (skill_name,))
+                bump_reference_version(cursor)
                 # conn.commit() is handled automatically by @with_db on success
                 flash(f"Skill '{skill_name}' added successfully!", "success")
         except Exception as e:
@@ -186,7 +189,8 @@ def delete_user(conn, user_id): # conn is injected by @with_db
             if public_id:
                 import cloudinary.uploader
                 try:
-                    cloudinary.uploader.destroy(public_id)
+                    with tracing.span('cloudinary.destroy'):
+                        cloudinary.uploader.destroy(public_id)
                 except Exception as c_error:
                     # Log but continue; DB integrity is higher priority
                     print(f"Cloudinary Orphaned File Alert: {c_error}")
@@ -194,6 +198,7 @@ def delete_user(conn, user_id): # conn is injected by @with_db
             # 3. Trigger Database Deletion
             # Deleting from 'auth' triggers the ON DELETE CASCADE for 'users' and related tables
             cursor.execute("DELETE FROM auth WHERE member_id = %s", (user_data['member_id'],))
+            invalidate_after_request('members', MEMBER_IDS_NAMESPACE)
             
             # commit is automatic via @with_db upon exiting this block successfully
             flash(f"Successfully deleted user and all associated records.", "success")
@@ -257,7 +262,8 @@ def delete_company(conn, comp_id): # conn is injected by @with_db
                 import cloudinary.uploader
                 try:
                     # Remove the logo from the internet
-                    cloudinary.uploader.destroy(public_id)
+                    with tracing.span('cloudinary.destroy'):
+                        cloudinary.uploader.destroy(public_id)
                 except Exception as c_error:
                     # Log error but don't interrupt the DB process
                     print(f"Cloudinary cleanup failed for {public_id}: {c_error}")
@@ -265,6 +271,7 @@ def delete_company(conn, comp_id): # conn is injected by @with_db
             # 3. Trigger Database Cascade
             # Wiping 'auth' deletes linked records in 'companies' and 'jobs'
             cursor.execute("DELETE FROM auth WHERE member_id = %s", (company_data['member_id'],))
+            invalidate_after_request('companies', 'jobs', MEMBER_IDS_NAMESPACE)
             
             # commit is automatic via @with_db on success
             flash(f"Company {company_data['member_id']} and all linked job posts deleted successfully.", "success")
@@ -408,6 +415,37 @@ def manage_quiz(conn): # conn injected by @with_db
     
     return render_template('admin/manage_quiz.html', quiz=current_quiz)
 
+@admin_bp.route('/scheduler')
+@admin_required
+def scheduler_status():
+    # Run history of this worker's periodic tasks (only the leader actually runs them)
+    return jsonify(scheduler.get_history())
+
+@admin_bp.route('/traces')
+@admin_required
+def traces():
+    # Slowest sampled traces of this worker; ?id= shows one waterfall
+    kind = request.args.get('kind') or None
+    selected = tracing.find(request.args.get('id', ''))
+    slowest = tracing.slowest(limit=25, kind=kind)
+    if selected is None and slowest:
+        selected = slowest[0]
+    return render_template('admin/traces.html',
+                           traces=[t.to_dict() for t in slowest],
+                           selected=selected.to_dict() if selected else None,
+                           kind=kind,
+                           sample_rate=tracing.TRACE_SAMPLE_RATE)
+
+@admin_bp.route('/slow-queries')
+@admin_required
+def slow_queries():
+    # Recent slow statements and N+1 suspects seen by this worker, newest first
+    return jsonify({
+        'slow_query_ms': query_monitor.SLOW_QUERY_MS,
+        'repeat_threshold': query_monitor.N_PLUS_ONE_THRESHOLD,
+        'recent': list(query_monitor.recent),
+    })
+
 @admin_bp.route('/logout')
 def logout():
     # Completely wipe the session for security
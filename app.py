@@ -1,25 +1,37 @@
-import eventlet
-eventlet.monkey_patch()
-print("Eventlet monkey patch applied.")
 import os
 from dotenv import load_dotenv
 load_dotenv()
+# Socket.IO server: 'eventlet' (Flask-SocketIO, blocking PyMySQL on green threads)
+# or 'asgi' (python-socketio AsyncServer + aiomysql, see asgi.py)
+SOCKETIO_MODE = os.getenv('SOCKETIO_MODE', 'eventlet').lower()
+if SOCKETIO_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+    print("Eventlet monkey patch applied.")
 from flask import Flask, render_template, request, redirect, url_for, flash, session
 from mail_service import generate_otp, send_otp_email 
-from db_manager import get_all_members, get_all_companies, get_companies_count, get_members_count, get_detailed_profile_data, get_public_jobs, get_jobs_count
+from db_manager import get_all_members, get_all_companies, get_companies_count, get_members_count, get_detailed_profile_data, get_public_jobs, get_jobs_count, reference_data
 from flask_mail import Mail, Message
 from members import members_bp
 from companies import companies_bp
 
 from flask_socketio import SocketIO
-from chat import chat_bp, init_chat_socket, cleanup_old_chats
+from chat import chat_bp, init_chat_socket, cleanup_old_chats, reconcile_chat_asset_refs
 from auth import auth_bp
 from datetime import datetime, timedelta
-import time
 from dashboard import dashboard_bp
-import threading
-from jobs import jobs_bp
+from jobs import jobs_bp, archive_expired_jobs
 from admin_routes import admin_bp
+from avatars import avatars_bp
+from upload_queue import start_upload_worker
+from scheduler import scheduler
+from fragment_cache import cached_fragment, cached_count, cache_page
+from http_cache import conditional_page
+from compression import CompressionMiddleware
+from assets import init_assets
+from metrics import init_metrics
+from query_monitor import init_query_monitor
+from tracing import init_tracing, span
 import cloudinary
 
 
@@ -39,6 +51,17 @@ cloudinary.config(
     api_secret = os.getenv('CLOUDINARY_API_SECRET'),
     secure = True
 )
+# Optional: point uploads at a local fake Cloudinary server (testing/benchmarks)
+if os.getenv('CLOUDINARY_UPLOAD_PREFIX'):
+    cloudinary.config(upload_prefix=os.getenv('CLOUDINARY_UPLOAD_PREFIX'))
+# Fingerprinted static files from `python assets.py build` (no-op without a manifest)
+init_assets(app)
+# Latency/DB-time per endpoint, exported at /metrics (admin session or METRICS_TOKEN)
+init_metrics(app)
+# Slow statements are logged as they happen; repeated ones (N+1) when a request ends
+init_query_monitor(app)
+# Sampled span traces (TRACE_SAMPLE_RATE), browsable at /admin/traces
+init_tracing(app)
 app.config['MAX_CONTENT_LENGTH'] = 11 * 1024 * 1024 
 app.config['MAIL_DEBUG'] = False
 # Force cookies to be sent over HTTPS only
@@ -61,7 +84,18 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 
 # socketio = SocketIO(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+# Engine.IO already compresses polling payloads over 1 KB by default
+# (asgi mode: asgi.py builds the AsyncServer and registers chat_async's handlers)
+socketio = None
+if SOCKETIO_MODE == 'eventlet':
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+# gzip/brotli for pages, partials, JSON and static files (wraps Socket.IO too, but leaves it alone)
+app.wsgi_app = CompressionMiddleware(
+    app.wsgi_app,
+    static_folder=app.static_folder,
+    static_url_path=app.static_url_path,
+    websocket_deflate=os.getenv('SOCKETIO_WS_DEFLATE', 'True').lower() == 'true',
+)
 
 # Register the Blueprint for routes
 app.register_blueprint(chat_bp)
@@ -69,9 +103,19 @@ app.register_blueprint(members_bp)
 app.register_blueprint(companies_bp)
 app.register_blueprint(jobs_bp)
 app.register_blueprint(admin_bp)
+app.register_blueprint(avatars_bp)
 # Register the Socket events
-init_chat_socket(socketio)
+if socketio is not None:
+    init_chat_socket(socketio)
 mail = Mail(app)
+# Background picture/logo uploads (resumes pending jobs)
+start_upload_worker()
+# Schema comes from `python migrate.py up`; row backfills from `python migrate.py backfill`
+# Profession/skill/category names are served from memory (loaded once here)
+try:
+    reference_data('professions')
+except Exception as e:
+    print(f"Reference Data Setup Error: {e}")
 
 from flask import send_from_directory
 
@@ -110,7 +154,8 @@ def contact():
 
         # 3. Try to send
         try:
-            mail.send(msg)
+            with span('mail.send'):
+                mail.send(msg)
             flash("Success! Your message has been sent.", "success")
         except Exception as e:
             print(f"Mail Error: {e}")
@@ -175,92 +220,105 @@ def guidelines():
     return render_template('legal/guidelines.html')
 
 app.register_blueprint(dashboard_bp) 
+
+# Rendered cards are cached per listing + offset; write paths call invalidate()
+def listing_cards(namespace, template, fetch, items_name, offset, limit=20):
+    def build():
+        items = fetch(limit=limit, offset=offset)
+        # An empty page may be a swallowed DB error: render it but don't cache it
+        return render_template(template, **{items_name: items}), bool(items)
+    return cached_fragment(namespace, f"cards:{limit}:{offset}", build)
+
+def get_offset():
+    try:
+        return max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return 0
+
 @app.route('/members')
+@conditional_page(('members',))
+@cache_page('members')
 def members():
-    members_list = []
-    total_count = 0
     try:
-        limit = 20 
-        members_list = get_all_members(limit=limit, offset=0)
-       
-       
-        total_count = get_members_count()
-        # print(f"DEBUG: Members List Count: {len(members_list)} | Total Count: {total_count}")
+        cards_html = listing_cards('members', 'partials/_member_card.html', get_all_members, 'members', 0)
+        total_count = cached_count('members', get_members_count)
+        # print(f"DEBUG: Total Count: {total_count}")
         return render_template('main/members.html', 
-                               members=members_list, 
+                               cards_html=cards_html, 
                                total_count=total_count)
     except Exception as e:
         print(f"Members Route Error: {e}")
-        return render_template('main/members.html', members=[], total_count=0)
+        return render_template('main/members.html', cards_html='', total_count=0)
 
 @app.route('/load-more-members')
+@conditional_page(('members',))
 def load_more_members():
-    offset = int(request.args.get('offset', 0))
-    limit = 20 # Match your main route limit
-    members_list = get_all_members(limit=limit, offset=offset)
-    return render_template('partials/_member_card.html', members=members_list)
+    # Match your main route limit
+    return listing_cards('members', 'partials/_member_card.html', get_all_members, 'members', get_offset())
 
 @app.route('/companies')
+@conditional_page(('companies',))
+@cache_page('companies')
 def companies():
     try:
-        limit = 20
-        companies_list = get_all_companies(limit=limit, offset=0)
-        total_count = get_companies_count()
+        cards_html = listing_cards('companies', 'partials/_company_card.html', get_all_companies, 'companies', 0)
+        total_count = cached_count('companies', get_companies_count)
         return render_template('main/companies.html', 
-                               companies=companies_list, 
+                               cards_html=cards_html, 
                                total_count=total_count)
     except Exception as e:
         print(f"Route Error: {e}")
         # ALWAYS pass total_count=0 so the template/JS doesn't break
-        return render_template('main/companies.html', companies=[], total_count=0)
+        return render_template('main/companies.html', cards_html='', total_count=0)
     
 @app.route('/load-more-companies')
+@conditional_page(('companies',))
 def load_more():
-    offset = int(request.args.get('offset', 0))
-    limit = 20
-    companies_list = get_all_companies(limit=limit, offset=offset)
     # We render ONLY the partial file, not the whole page!
-    return render_template('partials/_company_card.html', companies=companies_list)
+    return listing_cards('companies', 'partials/_company_card.html', get_all_companies, 'companies', get_offset())
 
 @app.route('/jobs')
+@conditional_page(('jobs',))
+@cache_page('jobs')
 def jobs():
     try:
-        limit = 20
-        # Call the manager functions
-        jobs_list = get_public_jobs(limit=limit, offset=0)
-        total_count = get_jobs_count()
+        # Call the manager functions (through the fragment cache)
+        cards_html = listing_cards('jobs', 'partials/_job_card.html', get_public_jobs, 'jobs', 0)
+        total_count = cached_count('jobs', get_jobs_count)
         
         return render_template('main/jobs.html', 
-                               jobs=jobs_list, 
+                               cards_html=cards_html, 
                                total_count=total_count)
     except Exception as e:
         print(f"Route Error: {e}")
         # Return empty list and 0 count to keep template safe
-        return render_template('main/jobs.html', jobs=[], total_count=0)
+        return render_template('main/jobs.html', cards_html='', total_count=0)
     
 @app.route('/load-more-jobs')
+@conditional_page(('jobs',))
 def load_more_jobs():
-    offset = int(request.args.get('offset', 0))
-    limit = 20
-    # Use your existing manager function
-    jobs_list = get_public_jobs(limit=limit, offset=offset)
-    
     # Render ONLY the individual job cards partial
-    return render_template('partials/_job_card.html', jobs=jobs_list)
-
- # 3. Create a background task that runs every hour
-def start_cleanup_scheduler(app):
-    def run_loop():
-        while True:
-            cleanup_old_chats(app)
-            # time.sleep(3600) # Wait 1 hour (3600 seconds) before checking again
-            time.sleep(1800) # reduce half hour
-           
-            
-    thread = threading.Thread(target=run_loop, daemon=True)
-    thread.start()    
-       
+    return listing_cards('jobs', 'partials/_job_card.html', get_public_jobs, 'jobs', get_offset())
+
+ # 3. Periodic background tasks
+# Every worker registers and starts the scheduler (works under gunicorn too);
+# leader election makes sure only one of them actually runs the tasks.
+def start_background_tasks(app):
+    if os.getenv('SCHEDULER_ENABLED', 'True').lower() != 'true':
+        return
+    scheduler.register('chat_cleanup', lambda: cleanup_old_chats(app), interval='30m', timeout='10m')
+    scheduler.register('chat_asset_refs', reconcile_chat_asset_refs, interval='6h', timeout='5m')
+    scheduler.register('job_expiry', archive_expired_jobs, interval='5m', timeout='5m')
+    scheduler.start()
+
+start_background_tasks(app)
+
+# Profiles are covered by their listing's generation (every profile write invalidates it)
+def profile_namespaces(role, member_id):
+    return ('members',) if role == 'individual' else ('companies',)
+
 @app.route('/profile/<role>/<member_id>')
+@conditional_page(profile_namespaces)
 def view_member_profile(role, member_id):
     # This calls your backbone function
     member_data = get_detailed_profile_data(member_id, role)
@@ -330,9 +388,15 @@ def session_expired_handler(e):
 # Run the application
 if __name__ == '__main__':
    
-    start_cleanup_scheduler(app) 
     DEBUG_MODE = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
    
-    # socketio.run handles EVERYTHING (both standard routes and chat)
-    # We use host='0.0.0.0' to allow network access if needed
-    socketio.run(app, host='0.0.0.0', port=5001, debug=DEBUG_MODE)
+    if SOCKETIO_MODE == 'asgi':
+        import uvicorn
+        from chat_async import create_asgi_application
+        # Built from this module's app: the 'asgi:application' import string would
+        # import app.py a second time. Reload needs `uvicorn asgi:application --reload`.
+        uvicorn.run(create_asgi_application(app), host='0.0.0.0', port=5001)
+    else:
+        # socketio.run handles EVERYTHING (both standard routes and chat)
+        # We use host='0.0.0.0' to allow network access if needed
+        socketio.run(app, host='0.0.0.0', port=5001, debug=DEBUG_MODE)
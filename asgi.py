@@ -0,0 +1,18 @@
+import os
+# This entry point is the ASGI mode, whatever .env says (read before app.py loads it)
+os.environ['SOCKETIO_MODE'] = 'asgi'
+from app import app
+from chat_async import create_asgi_application
+
+# --- ASGI Entry Point ---
+# Socket.IO on python-socketio's AsyncServer (aiomysql, no eventlet); every
+# other path goes to the Flask app, which runs on asgiref's thread pool.
+#
+#   pip install aiomysql uvicorn asgiref
+#   uvicorn asgi:application --host 0.0.0.0 --port 5001    # add --reload while developing
+#   SOCKETIO_MODE=asgi python app.py                       # same app, without reload
+#
+# One event loop per process: run several uvicorn workers behind sticky
+# sessions (like eventlet mode) for more than one core.
+
+application = create_asgi_application(app)
@@ -0,0 +1,380 @@
+import os
+import re
+import sys
+import json
+import gzip
+import shutil
+import hashlib
+import argparse
+from io import BytesIO
+from flask import request, url_for
+from markupsafe import Markup, escape
+
+# Pillow and brotli are optional: without them images are only fingerprinted
+# and static files only get a .gz sibling
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Static Asset Pipeline ---
+# `python assets.py build` minifies CSS/JS, re-encodes images into WebP/AVIF
+# width variants, writes everything to static/dist/ under content-hashed names
+# and records the mapping in static/dist/manifest.json. At runtime
+# init_assets(app) makes url_for('static', ...) emit the hashed URLs, which are
+# served with a one-year immutable Cache-Control.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+IMAGE_WIDTHS = [64, 128, 256, 512, 1024, 1536]
+IMAGE_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP'}
+IMAGE_QUALITY = {'AVIF': 55, 'WEBP': 80}
+# Preferred first: <picture> lists sources in this order
+PICTURE_FORMATS = ['avif', 'webp']
+
+SOURCE_EXTENSIONS = {'.css', '.js', '.png', '.jpg', '.jpeg', '.svg'}
+PRECOMPRESS_EXTENSIONS = {'.css', '.js', '.svg'}
+
+
+# ---------------------------------------------------------------------------
+# Minifiers (whitespace/comments only, never renames anything)
+# ---------------------------------------------------------------------------
+
+def minify_css(source):
+    """Drops comments and collapses whitespace; quoted strings and data URIs are left as-is."""
+    out = []
+    i, n = 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in '"\'':
+            end = i + 1
+            while end < n and source[end] != ch:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+        elif ch.isspace():
+            while i < n and source[i].isspace():
+                i += 1
+            out.append(' ')
+        else:
+            out.append(ch)
+            i += 1
+
+    css = ''.join(out)
+    # Only around characters where whitespace never matters (not ':' — '.a :hover' differs)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+# After one of these, a '/' starts a regex literal rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'delete', 'void', 'in', 'of', 'new', 'throw')
+
+
+def _regex_allowed(out):
+    text = ''.join(out[-12:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in _REGEX_PRECEDERS:
+        return True
+    return any(text.endswith(word) and not (text[:-len(word)][-1:].isalnum() or text[:-len(word)][-1:] in '_$')
+               for word in _REGEX_KEYWORDS)
+
+
+def minify_js(source):
+    """
+    Drops comments, indentation and blank lines. Newlines are kept so
+    automatic semicolon insertion behaves exactly as before; strings,
+    template literals and regex literals are copied untouched.
+    """
+    out = []
+    i, n = 0, len(source)
+    while i < n:
+        ch = source[i]
+        if ch in '"\'`':
+            end = i + 1
+            while end < n and source[end] != ch:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            out.append(' ')
+        elif ch == '/' and _regex_allowed(out):
+            end, in_class = i + 1, False
+            while end < n and (source[end] != '/' or in_class):
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif ch.isspace():
+            newline = False
+            while i < n and source[i].isspace():
+                newline = newline or source[i] == '\n'
+                i += 1
+            out.append('\n' if newline else ' ')
+        else:
+            out.append(ch)
+            i += 1
+
+    lines = (line.strip() for line in ''.join(out).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def _hashed_name(relative, data, extension=None, suffix=''):
+    root, ext = os.path.splitext(relative)
+    return f"{root}{suffix}.{_fingerprint(data)}{extension or ext}"
+
+
+def _write(dist_dir, relative, data):
+    path = os.path.join(dist_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if os.path.splitext(relative)[1] in PRECOMPRESS_EXTENSIONS:
+        # Picked up by CompressionMiddleware instead of compressing on every request
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, 9))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+    return relative
+
+
+def _encode(img, fmt):
+    buffer = BytesIO()
+    if fmt == 'PNG':
+        img.save(buffer, 'PNG', optimize=True)
+    else:
+        img.save(buffer, fmt, quality=IMAGE_QUALITY[fmt])
+    return buffer.getvalue()
+
+
+def _available_formats():
+    if Image is None:
+        return {}
+    return {ext: fmt for ext, fmt in IMAGE_FORMATS.items() if features.check(ext)}
+
+
+def _build_image(static_dir, relative, data, dist_dir, manifest):
+    """Fingerprints the original and writes every width x format variant."""
+    entry = {'file': _write(dist_dir, _hashed_name(relative, data), data), 'variants': []}
+    manifest['files'][relative] = entry['file']
+    if Image is None or relative.endswith('.svg'):
+        return
+
+    with Image.open(os.path.join(static_dir, relative)) as img:
+        img.load()
+        source = img.convert('RGBA') if img.mode in ('P', 'LA', 'RGBA') else img.convert('RGB')
+    width, height = source.size
+    widths = sorted({w for w in IMAGE_WIDTHS if w < width} | {width})
+    original_ext = os.path.splitext(relative)[1].lower()
+    formats = dict(_available_formats(), **{original_ext.lstrip('.'): 'PNG' if original_ext == '.png' else 'JPEG'})
+
+    for w in widths:
+        resized = source if w == width else source.resize((w, round(height * w / width)), Image.LANCZOS)
+        for ext, fmt in formats.items():
+            image = resized.convert('RGB') if fmt == 'JPEG' else resized
+            encoded = _encode(image, fmt)
+            name = _hashed_name(relative, encoded, extension=f'.{ext}', suffix=f'-{w}w')
+            entry['variants'].append({'format': ext, 'width': w, 'file': _write(dist_dir, name, encoded)})
+    manifest['images'][relative] = entry['variants']
+
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)(?!data:|https?:|//)([^\'")]+)\1\s*\)')
+
+
+def _rewrite_css_urls(relative, css, manifest):
+    """Points url(...) at fingerprinted files, and adds an image-set() with the modern formats."""
+    base = os.path.dirname(relative)
+
+    def resolve(url):
+        return os.path.normpath(os.path.join(base, url)).replace(os.sep, '/')
+
+    def replace_url(match):
+        target = resolve(match.group(2))
+        if target not in manifest['files']:
+            return match.group(0)
+        return f"url('{os.path.relpath(manifest['files'][target], base).replace(os.sep, '/')}')"
+
+    def replace_declaration(match):
+        declaration = match.group(0)
+        target = resolve(match.group(3))
+        rewritten = _CSS_URL.sub(replace_url, declaration)
+        variants = manifest['images'].get(target)
+        if not variants:
+            return rewritten
+        # Background images: the largest variant of each format, original as the fallback
+        options = []
+        for ext in PICTURE_FORMATS + [os.path.splitext(target)[1].lstrip('.')]:
+            candidates = [v for v in variants if v['format'] == ext]
+            if candidates:
+                best = max(candidates, key=lambda v: v['width'])
+                url = os.path.relpath(best['file'], base).replace(os.sep, '/')
+                options.append(f"url('{url}') type('image/{ext}')")
+        return f"{rewritten};background-image:image-set({','.join(options)})"
+
+    css = re.sub(r'background-image:\s*url\(\s*([\'"]?)(?!data:)(([^\'")]+))\1\s*\)', replace_declaration, css)
+    return _CSS_URL.sub(replace_url, css)
+
+
+def build(static_dir=STATIC_DIR):
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {'files': {}, 'images': {}}
+
+    sources = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in files:
+            if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                sources.append(os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/'))
+
+    # 1. Images first, so the stylesheets can reference their fingerprinted names
+    for relative in sorted(s for s in sources if not s.endswith(('.css', '.js'))):
+        with open(os.path.join(static_dir, relative), 'rb') as f:
+            _build_image(static_dir, relative, f.read(), dist_dir, manifest)
+
+    # 2. Stylesheets and scripts
+    for relative in sorted(s for s in sources if s.endswith(('.css', '.js'))):
+        with open(os.path.join(static_dir, relative), encoding='utf-8') as f:
+            text = f.read()
+        if relative.endswith('.css'):
+            text = minify_css(_rewrite_css_urls(relative, text, manifest))
+        else:
+            text = minify_js(text)
+        data = text.encode('utf-8')
+        manifest['files'][relative] = _write(dist_dir, _hashed_name(relative, data), data)
+
+    for relative, hashed in manifest['files'].items():
+        manifest['files'][relative] = f"{DIST_DIRNAME}/{hashed}"
+    for variants in manifest['images'].values():
+        for variant in variants:
+            variant['file'] = f"{DIST_DIRNAME}/{variant['file']}"
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def _report(manifest, static_dir=STATIC_DIR):
+    for relative, hashed in sorted(manifest['files'].items()):
+        # Images: the smallest full-width encoding (what a large screen downloads)
+        variants = manifest['images'].get(relative, [])
+        full_width = max((v['width'] for v in variants), default=None)
+        sizes = [os.path.getsize(os.path.join(static_dir, v['file'])) for v in variants if v['width'] == full_width]
+        before = os.path.getsize(os.path.join(static_dir, relative))
+        after = min(sizes or [os.path.getsize(os.path.join(static_dir, hashed))])
+        print(f"{relative:40} {before:>9,} -> {after:>9,} bytes")
+
+
+# ---------------------------------------------------------------------------
+# Runtime
+# ---------------------------------------------------------------------------
+
+_manifest = {'files': {}, 'images': {}}
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Reads the build manifest; without one (development) the original files are served."""
+    path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            _manifest.update(json.load(f))
+        print(f"Assets: {len(_manifest['files'])} fingerprinted files")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Assets Manifest Error: {e}")
+
+
+def asset_variant(filename, width, fmt=None):
+    """Path (relative to static/) of the smallest variant at least `width` px wide."""
+    fmt = fmt or os.path.splitext(filename)[1].lstrip('.')
+    candidates = sorted((v for v in _manifest['images'].get(filename, []) if v['format'] == fmt),
+                        key=lambda v: v['width'])
+    for variant in candidates:
+        if variant['width'] >= width:
+            return variant['file']
+    return candidates[-1]['file'] if candidates else _manifest['files'].get(filename, filename)
+
+
+def picture(filename, sizes, **attrs):
+    """<picture> with AVIF/WebP srcsets (from the manifest) and the original as the <img> fallback."""
+    attributes = ''.join(f' {key.rstrip("_").replace("_", "-")}="{escape(value)}"' for key, value in attrs.items())
+    img = f'<img src="{url_for("static", filename=filename)}"{attributes}>'
+    variants = _manifest['images'].get(filename)
+    if not variants:
+        return Markup(img)
+
+    sources = []
+    for fmt in PICTURE_FORMATS:
+        srcset = ', '.join(f"{url_for('static', filename=v['file'])} {v['width']}w"
+                           for v in variants if v['format'] == fmt)
+        if srcset:
+            sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{escape(sizes)}">')
+    return Markup(f"<picture>{''.join(sources)}{img}</picture>")
+
+
+def init_assets(app):
+    load_manifest(app.static_folder)
+    dist_prefix = f"{app.static_url_path}/{DIST_DIRNAME}/"
+
+    @app.url_defaults
+    def fingerprinted_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in _manifest['files']:
+            values['filename'] = _manifest['files'][values['filename']]
+
+    @app.after_request
+    def immutable_assets(response):
+        # Fingerprinted names change with their content, so they can be cached forever
+        if response.status_code == 200 and request.path.startswith(dist_prefix):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    app.jinja_env.globals.update(picture=picture, asset_variant=asset_variant)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="TechNest static asset pipeline")
+    parser.add_argument('command', choices=['build', 'clean'])
+    args = parser.parse_args()
+
+    if args.command == 'clean':
+        shutil.rmtree(os.path.join(STATIC_DIR, DIST_DIRNAME), ignore_errors=True)
+        print("Assets: static/dist removed")
+        sys.exit(0)
+
+    _report(build())
@@ -0,0 +1,95 @@
+import os
+import ssl
+import time
+import asyncio
+from functools import wraps
+from db_manager import DB_CONFIG
+from metrics import record_query, db_pool_wait
+
+# aiomysql is optional: only the ASGI Socket.IO mode (SOCKETIO_MODE=asgi) needs it
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+# --- Async Data Access ---
+# asyncio counterpart of db_manager's pool for coroutine handlers (chat_async).
+# Same database settings as DB_CONFIG; the Flask routes keep using the
+# blocking pool. The pool is created on first use inside the running loop.
+ASYNC_DB_POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', 2))
+ASYNC_DB_POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', 10))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+if aiomysql is not None:
+    class InstrumentedAsyncCursor(aiomysql.DictCursor):
+        """DictCursor that reports every statement's duration to the metrics registry."""
+
+        async def execute(self, query, args=None):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = await super().execute(query, args)
+                failed = False
+                return result
+            finally:
+                record_query(time.perf_counter() - started, failed)
+
+
+def _ssl_context():
+    # Encrypted but unverified, like ssl_mode REQUIRED in DB_CONFIG
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+async def get_pool():
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            if aiomysql is None:
+                raise RuntimeError("aiomysql is not installed (pip install aiomysql)")
+            _pool = await aiomysql.create_pool(
+                minsize=ASYNC_DB_POOL_MIN,
+                maxsize=ASYNC_DB_POOL_MAX,
+                host=DB_CONFIG['host'],
+                port=DB_CONFIG['port'],
+                user=DB_CONFIG['user'],
+                password=DB_CONFIG['password'],
+                db=DB_CONFIG['database'],
+                charset=DB_CONFIG['charset'],
+                cursorclass=InstrumentedAsyncCursor,
+                ssl=_ssl_context() if DB_CONFIG.get('ssl') else None,
+                init_command=DB_CONFIG['init_command'],
+                autocommit=False,
+            )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+def with_async_db(f):
+    """Coroutine version of db_manager.with_db: injects a pooled connection, commits or rolls back."""
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        pool = await get_pool()
+        started = time.perf_counter()
+        async with pool.acquire() as conn:
+            db_pool_wait.observe(time.perf_counter() - started)
+            try:
+                result = await f(conn, *args, **kwargs)
+                await conn.commit()
+                return result
+            except Exception as e:
+                await conn.rollback()
+                print(f"Database Error in {f.__name__}: {e}")
+                raise e
+    return decorated_function
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
 from datetime import datetime, timedelta
 from mail_service import send_otp_email, generate_otp
-from db_manager import search_suggestions
+from db_manager import search_suggestions, resolve_member
 import uuid
 from werkzeug.security import generate_password_hash
 from db_manager import save_individual_transaction, save_company_transaction, get_user_for_login
@@ -80,53 +80,9 @@ def generate_member_id(prefix):
     unique_hex = uuid.uuid4().hex[:6].lower()
     return f"{prefix}-{unique_hex}"
 
-import io
-import cloudinary.uploader
-
-def save_to_cloudinary(file_obj, subfolder, member_id=None):
-    """
-    Robust upload that reads file into memory to prevent 0-byte/corrupt uploads.
-    """
-    if not file_obj:
-        return None, None
-
-    try:
-        # 1. CRITICAL: Read the file into memory explicitly.
-        # This decouples it from the Flask request stream and prevents "pointer" errors.
-        file_obj.seek(0)
-        file_data = file_obj.read()
-        
-        # Safety Check: Did we actually get data?
-        if len(file_data) == 0:
-            print("!!! ERROR: File is empty (0 bytes).")
-            return None, None
-
-        # 2. Setup Folder Logic (Simplified)
-        if subfolder == 'chat':
-            folder = "technest/uploads/chat_files"
-            public_id = None   # Random ID for chat to prevent collisions
-            overwrite = False
-        else:
-            folder = f"technest/uploads/{subfolder}"
-            public_id = str(member_id) # Force string
-            overwrite = True   # Overwrite for profiles/logos
-
-        # 3. UPLOAD using io.BytesIO
-        # We wrap 'file_data' in BytesIO so it acts like a fresh new file
-        upload_result = cloudinary.uploader.upload(
-            io.BytesIO(file_data), 
-            folder=folder,
-            public_id=public_id,
-            overwrite=overwrite,
-            resource_type="auto", # 'auto' handles PDF, JPG, PNG correctly
-            filename=file_obj.filename # Helps Cloudinary detect MIME type
-        )
-
-        return upload_result['secure_url'], upload_result['public_id']
-
-    except Exception as e:
-        print(f"Cloudinary Upload Error: {e}")
-        return None, None
+from upload_queue import queue_media_upload, validate_media_upload
+from fragment_cache import invalidate
+from tracing import span
 
 # ========================================================
 # 1. INDIVIDUAL PROFILE ROUTE
@@ -152,13 +108,12 @@ def individual_form():
             }
 
            # --- Cloudinary Upload Logic ---
-            pic_url = None
-            pic_public_id = None
+            # The picture is queued AFTER the account is saved; the worker fills in pic_path
             file = request.files.get('profile_pic')
-
-            if file and file.filename != '':
-                # Upload to Cloudinary using member_id as the Public ID
-                pic_url, pic_public_id = save_to_cloudinary(file, 'profiles', member_id)
+            upload_error = validate_media_upload(file) if file and file.filename != '' else None
+            if upload_error:
+                flash(upload_error, "danger")
+                return redirect(url_for('auth.individual_form'))
             # 1. Get the text from the form
             about_text = request.form.get('about', '')[:200]
     
@@ -176,8 +131,8 @@ def individual_form():
                 'experience': request.form.get('experience'), # NEW
                 'pro_id': request.form.get('pro_id'), # Hidden input
                 'tagline': request.form.get('tagline'),
-                'pic_path': pic_url,
-                'public_id': pic_public_id,
+                'pic_path': None,
+                'public_id': None,
                 'linkedin': request.form.get('linkedin_link'),
                 'other_link': request.form.get('other_link')
             }
@@ -188,6 +143,10 @@ def individual_form():
 
             # 5. COMMIT TO DATABASE (Atomic Transaction)
             if save_individual_transaction(auth_data, user_data, skill_ids):
+                # Upload to Cloudinary in the background using member_id as the Public ID
+                if file and file.filename != '':
+                    queue_media_upload(file, 'profile', member_id)
+                invalidate('members')
                 # Success! Clean up session
                 session.pop('temp_user_data', None)
                 flash("Account created successfully! Please login.", "success")
@@ -223,13 +182,12 @@ def company_form():
             }
 
             # 2. Handle Cloudinary Upload (Logo)
-            logo_url = None
-            logo_public_id = None
+            # The logo is queued AFTER the account is saved; the worker fills in company_logo
             file = request.files.get('company_logo')
-            
-            if file and file.filename != '':
-                # Subfolder is 'logos', using member_id as the filename
-                logo_url, logo_public_id = save_to_cloudinary(file, 'logos', member_id)
+            upload_error = validate_media_upload(file) if file and file.filename != '' else None
+            if upload_error:
+                flash(upload_error, "danger")
+                return redirect(url_for('auth.company_form'))
 
             about_text = request.form.get('about', '')[:200]
             # 3. Prepare Company Data
@@ -242,8 +200,8 @@ def company_form():
                 'address': request.form.get('address'),
                 'map_url': request.form.get('google_map_url'),
                 'about': request.form.get('about'),
-                'logo_path': logo_url,
-                'public_id': logo_public_id,
+                'logo_path': None,
+                'public_id': None,
                 'web_url': request.form.get('web_url'),
                 'linkedin': request.form.get('linkedin_url'),
                 'contact_no': "+92" + request.form.get('contact_no'),
@@ -257,6 +215,10 @@ def company_form():
 
             # 5. COMMIT TO DATABASE
             if save_company_transaction(auth_data, comp_data, service_ids):
+                # Subfolder is 'logos', using member_id as the filename
+                if file and file.filename != '':
+                    queue_media_upload(file, 'logo', member_id)
+                invalidate('companies')
                 session.pop('temp_user_data', None)
                 flash("Company profile created! Please login.", "success")
                 return redirect(url_for('login'))
@@ -342,6 +304,8 @@ def login():
             session['user_id'] = user['member_id']
             session['role'] = user['role']
             session['logged_in'] = True
+            # Resolve the numeric profile ids once; dashboard routes read them from the cache
+            resolve_member(user['member_id'], user['role'])
             # --- REMEMBER ME LOGIC ---
             if remember:
                 # This makes the cookie stay even after the browser closes
@@ -403,7 +367,8 @@ def send_reset_email(user_email, reset_url):
     msg.html = render_template('emails/reset_email.html', reset_url=reset_url)
     
     try:
-        mail.send(msg)
+        with span('mail.send'):
+            mail.send(msg)
         return True
     except Exception as e:
         print(f"Mail Error: {e}")
@@ -0,0 +1,81 @@
+import re
+from functools import lru_cache
+from urllib.parse import quote
+from flask import Blueprint, Response, abort
+from markupsafe import escape
+from assets import IMMUTABLE_MAX_AGE
+
+# --- Avatars ---
+# users.avatar_url / companies.avatar_url hold the image every page shows: the
+# uploaded picture/logo, or a local initials SVG when there is none. The column
+# is written together with the row (signup, profile edit, upload worker), so
+# read paths select it as-is instead of resolving a fallback for every row.
+#
+# Initials avatars are a pure function of their URL, so they are served with
+# the same one-year immutable Cache-Control as fingerprinted assets. If the
+# artwork below changes, change AVATAR_PATH too.
+
+AVATAR_PATH = '/avatar'
+AVATAR_SOURCES = {
+    # role: (table, uploaded picture column, name columns)
+    'individual': ('users', 'pic_path', ('first_name', 'second_name')),
+    'company': ('companies', 'company_logo', ('company_name',)),
+}
+AVATAR_COLORS = {'individual': '#0d6efd', 'company': '#0D8ABC'}
+DEFAULT_NAMES = {'individual': 'User', 'company': 'Company'}
+
+avatars_bp = Blueprint('avatars', __name__)
+
+
+def initials(name):
+    """Up to two uppercase initials, e.g. 'Ali Raza' -> 'AR'."""
+    words = re.findall(r'[^\W_]+', name or '')
+    return ''.join(word[0] for word in words[:2]).upper()
+
+
+def avatar_url(picture, name, role):
+    """The uploaded picture/logo if there is one, else the local initials avatar."""
+    if picture and str(picture).startswith(('http://', 'https://')):
+        return picture
+    letters = initials(name) or initials(DEFAULT_NAMES[role])
+    return f"{AVATAR_PATH}/{role}/{quote(letters)}.svg"
+
+
+def row_avatar_url(row, role):
+    """avatar_url() for a users/companies row (dict with the AVATAR_SOURCES columns)."""
+    _, picture_col, name_cols = AVATAR_SOURCES[role]
+    name = ' '.join(row.get(col) or '' for col in name_cols)
+    return avatar_url(row.get(picture_col), name, role)
+
+
+def refresh_avatar(cursor, role, member_id):
+    """Recomputes avatar_url from the stored row. Call after changing its picture or name."""
+    table, picture_col, name_cols = AVATAR_SOURCES[role]
+    cursor.execute(f"SELECT {picture_col}, {', '.join(name_cols)} FROM {table} WHERE member_id = %s",
+                   (member_id,))
+    row = cursor.fetchone()
+    if row:
+        cursor.execute(f"UPDATE {table} SET avatar_url = %s WHERE member_id = %s",
+                       (row_avatar_url(row, role), member_id))
+
+
+@lru_cache(maxsize=2048)
+def render_initials_svg(letters, color):
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="128" height="128" viewBox="0 0 128 128">'
+        f'<rect width="128" height="128" fill="{color}"/>'
+        '<text x="50%" y="50%" dy=".35em" fill="#fff" text-anchor="middle" '
+        'font-family="Segoe UI,Helvetica,Arial,sans-serif" font-size="52" font-weight="600">'
+        f'{escape(letters)}</text></svg>'
+    )
+
+
+@avatars_bp.route(f'{AVATAR_PATH}/<role>/<letters>.svg')
+def initials_avatar(role, letters):
+    if role not in AVATAR_COLORS or not 0 < len(letters) <= 2:
+        abort(404)
+    response = Response(render_initials_svg(letters, AVATAR_COLORS[role]), mimetype='image/svg+xml')
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,514 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# --- Offline Benchmark Suite ---
+# Boots the real app against a local SQLite stand-in that speaks enough of
+# pymysql's API and MySQL's dialect for the hot paths, seeds it with a
+# synthetic community, then times data-access functions (micro) and full
+# routes through the Flask test client (macro).
+#
+#   python benchmark.py --members 5000 --jobs 2000 --json results.json
+#   python benchmark.py --baseline results.json --max-regression 0.25
+#
+# Numbers are for comparing two versions of our code on the same machine,
+# not for predicting production latency (no network hop, different engine).
+
+# ---------------------------------------------------------------------------
+# 1. SQLite stand-in for pymysql
+# ---------------------------------------------------------------------------
+
+# Indexes follow migrations/0002_hot_path_indexes.sql
+SCHEMA = """
+    CREATE TABLE auth (
+        member_id TEXT PRIMARY KEY, email TEXT UNIQUE, password_hash TEXT, role TEXT,
+        reset_token TEXT, reset_expires TIMESTAMP, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE INDEX idx_auth_reset_token ON auth (reset_token);
+    CREATE TABLE profession (pro_id INTEGER PRIMARY KEY AUTOINCREMENT, pro_name TEXT, category_id INTEGER);
+    CREATE TABLE profession_category (category_id INTEGER PRIMARY KEY AUTOINCREMENT, category_name TEXT);
+    CREATE TABLE reference_data_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0);
+    CREATE TABLE skills_list (skill_id INTEGER PRIMARY KEY AUTOINCREMENT, skill_name TEXT);
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT, member_id TEXT UNIQUE, first_name TEXT, second_name TEXT,
+        gender TEXT, email TEXT, phone_no TEXT, city TEXT, DOB TEXT, education TEXT, experience TEXT,
+        pro_id INTEGER, tagline TEXT, pic_path TEXT, profile_public_id TEXT, linkedin_link TEXT, other_link TEXT,
+        skills_json TEXT, avatar_url TEXT);
+    CREATE INDEX idx_users_name ON users (first_name, second_name);
+    CREATE INDEX idx_users_pro ON users (pro_id);
+    CREATE TABLE user_skills (user_id INTEGER, skill_id INTEGER, PRIMARY KEY (user_id, skill_id));
+    CREATE INDEX idx_user_skills_skill ON user_skills (skill_id, user_id);
+    CREATE TABLE companies (
+        comp_id INTEGER PRIMARY KEY AUTOINCREMENT, member_id TEXT UNIQUE, company_name TEXT, owner_name TEXT,
+        established_year INTEGER, employee_range TEXT, city TEXT, address TEXT, google_map_url TEXT, about TEXT,
+        company_logo TEXT, logo_public_id TEXT, email TEXT, web_url TEXT, linkedin_url TEXT, contact_no TEXT,
+        services_json TEXT, avatar_url TEXT);
+    CREATE INDEX idx_companies_name ON companies (company_name);
+    CREATE TABLE comp_services (comp_id INTEGER, pro_id INTEGER, PRIMARY KEY (comp_id, pro_id));
+    CREATE INDEX idx_comp_services_pro ON comp_services (pro_id, comp_id);
+    CREATE TABLE jobs (
+        job_id INTEGER PRIMARY KEY AUTOINCREMENT, comp_id INTEGER, job_role TEXT, job_description TEXT,
+        job_type TEXT, external_link TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP, is_active INTEGER NOT NULL DEFAULT 1, skills_json TEXT);
+    CREATE INDEX idx_jobs_active_created ON jobs (is_active, created_at);
+    CREATE INDEX idx_jobs_comp_active ON jobs (comp_id, is_active, created_at);
+    CREATE INDEX idx_jobs_active_expires ON jobs (is_active, expires_at);
+    CREATE TABLE job_skills (job_id INTEGER, skill_id INTEGER, PRIMARY KEY (job_id, skill_id));
+    CREATE INDEX idx_job_skills_skill ON job_skills (skill_id, job_id);
+    CREATE TABLE jobs_archive AS SELECT *, CURRENT_TIMESTAMP AS archived_at FROM jobs WHERE 0;
+    CREATE TABLE job_skills_archive AS SELECT * FROM job_skills WHERE 0;
+    CREATE TABLE notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, type TEXT, message TEXT,
+        user_role TEXT DEFAULT 'individual', is_read INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE INDEX idx_notifications_unread ON notifications (user_id, user_role, is_read);
+    CREATE INDEX idx_notifications_recent ON notifications (user_id, user_role, created_at);
+    CREATE TABLE news_posts (
+        news_id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, content TEXT, category TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE INDEX idx_news_created ON news_posts (created_at);
+    CREATE TABLE community_chat (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, sender_id TEXT, sender_role TEXT, message TEXT,
+        file_path TEXT, file_name TEXT, file_public_id TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE INDEX idx_chat_created ON community_chat (created_at);
+    CREATE INDEX idx_chat_file ON community_chat (file_public_id);
+    CREATE TABLE chat_assets (
+        content_hash TEXT PRIMARY KEY, public_id TEXT UNIQUE, url TEXT, resource_type TEXT DEFAULT 'image',
+        bytes INTEGER DEFAULT 0, ref_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE media_uploads (
+        upload_id INTEGER PRIMARY KEY AUTOINCREMENT, member_id TEXT, target TEXT, spool_path TEXT,
+        file_name TEXT, status TEXT DEFAULT 'pending', attempts INTEGER DEFAULT 0, last_error TEXT,
+        result_url TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE admins (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, password_hash TEXT);
+"""
+
+DATABASE_NAME = 'technest_bench'
+_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+sqlite3.register_adapter(datetime, lambda value: value.strftime(_DATETIME_FORMAT))
+sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(str(value)).date()
+
+
+def _datediff(a, b):
+    a, b = _to_date(a), _to_date(b)
+    return None if a is None or b is None else (a - b).days
+
+
+_PLACEHOLDER = re.compile(r'%s|%%')
+_SEPARATOR = re.compile(r'\s+SEPARATOR\s+', re.IGNORECASE)
+_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\b', re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE)
+_DDL = re.compile(r'^\s*(CREATE|ALTER|DROP)\b', re.IGNORECASE)
+_NOW_MINUS_INTERVAL = re.compile(r'NOW\(\)\s*-\s*INTERVAL\s+%s\s+(MINUTE|HOUR|DAY)\b', re.IGNORECASE)
+
+
+def _interval(match):
+    return f"datetime(NOW(), '-' || %s || ' {match.group(1).lower()}s')"
+
+
+def translate(query, args):
+    """MySQL/pymysql statement -> (SQLite statement, flat parameter list)."""
+    params = []
+    query = _NOW_MINUS_INTERVAL.sub(_interval, query)
+    if args is not None:
+        values = iter(args)
+
+        def placeholder(match):
+            if match.group(0) == '%%':
+                return '%'
+            value = next(values)
+            if isinstance(value, (tuple, list, set)):
+                # pymysql renders `IN %s` with a tuple as (a, b, c)
+                value = list(value) or [None]
+                params.extend(value)
+                return '(' + ', '.join('?' * len(value)) + ')'
+            params.append(value)
+            return '?'
+        query = _PLACEHOLDER.sub(placeholder, query)
+
+    query = _SEPARATOR.sub(', ', query)
+    query = _FOR_UPDATE.sub('', query)
+    query = _INSERT_IGNORE.sub('INSERT OR IGNORE', query)
+    return query, params
+
+
+class StandInCursor:
+    """The subset of pymysql's DictCursor the app uses."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection._db.cursor()
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, query, args=None):
+        if _DDL.match(query):
+            # The stand-in owns the schema; runtime CREATE/ALTER statements are no-ops
+            self.rowcount, self._rows = 0, []
+            return 0
+        sql, params = translate(query, args)
+        self._cursor.execute(sql, params)
+        if self._cursor.description:
+            columns = [c[0] for c in self._cursor.description]
+            self._rows = [dict(zip(columns, row)) for row in self._cursor.fetchall()]
+            self.rowcount = len(self._rows)
+        else:
+            self._rows = []
+            self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+        return self.rowcount
+
+    def executemany(self, query, seq_of_args):
+        total = 0
+        for args in seq_of_args:
+            total += max(self.execute(query, args), 0)
+        self.rowcount = total
+        return total
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StandInConnection:
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._db.create_function('NOW', 0, lambda: datetime.now().strftime(_DATETIME_FORMAT))
+        self._db.create_function('DATEDIFF', 2, _datediff)
+        self._db.create_function('DATABASE', 0, lambda: DATABASE_NAME)
+        self._db.create_function('CONCAT', -1, lambda *parts: None if None in parts else ''.join(map(str, parts)))
+        self._db.execute("ATTACH DATABASE ':memory:' AS information_schema")
+        _mirror_information_schema(self._db)
+
+    def cursor(self, cursorclass=None):
+        return StandInCursor(self)
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def begin(self):
+        pass
+
+    def ping(self, reconnect=False):
+        return True
+
+    def autocommit(self, value):
+        self._db.isolation_level = None if value else ''
+
+    def close(self):
+        self._db.close()
+
+
+def _mirror_information_schema(db):
+    """Lets the app's information_schema lookups (schema checks at startup) find our tables."""
+    db.execute("CREATE TABLE information_schema.TABLES (TABLE_SCHEMA TEXT, TABLE_NAME TEXT)")
+    db.execute("CREATE TABLE information_schema.COLUMNS "
+               "(TABLE_SCHEMA TEXT, TABLE_NAME TEXT, COLUMN_NAME TEXT, ORDINAL_POSITION INTEGER)")
+    tables = [row[0] for row in db.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        db.execute("INSERT INTO information_schema.TABLES VALUES (?, ?)", (DATABASE_NAME, table))
+        for column in db.execute(f"PRAGMA main.table_info({table})"):
+            db.execute("INSERT INTO information_schema.COLUMNS VALUES (?, ?, ?, ?)",
+                       (DATABASE_NAME, table, column[1], column[0] + 1))
+    # Committed, or the pool's rollback on checkin would empty it again
+    db.commit()
+
+
+def create_database(path):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.commit()
+    db.close()
+
+
+# ---------------------------------------------------------------------------
+# 2. Synthetic dataset
+# ---------------------------------------------------------------------------
+
+FIRST_NAMES = ['Ali', 'Sara', 'Omar', 'Hina', 'Bilal', 'Ayesha', 'Usman', 'Zara', 'Hamza', 'Fatima', 'Ahmed', 'Maryam']
+LAST_NAMES = ['Khan', 'Ahmed', 'Malik', 'Hussain', 'Raza', 'Iqbal', 'Sheikh', 'Butt', 'Chaudhry', 'Qureshi']
+CITIES = ['Lahore', 'Karachi', 'Islamabad', 'Multan', 'Peshawar', 'Faisalabad']
+JOB_TYPES = ['Full-time', 'Part-time', 'Internship', 'Remote', 'Contract']
+
+
+def seed(path, members, companies, jobs, skills, professions, messages, notifications, rng):
+    """Fills the stand-in with a synthetic community. Returns handy ids for the benchmarks."""
+    db = sqlite3.connect(path)
+    now = datetime.now()
+
+    db.executemany("INSERT INTO skills_list (skill_name) VALUES (?)", [(f"Skill {i}",) for i in range(skills)])
+    db.executemany("INSERT INTO profession_category (category_name) VALUES (?)", [(f"Category {i}",) for i in range(8)])
+    db.execute("INSERT INTO reference_data_version (id, version) VALUES (1, 0)")
+    db.executemany("INSERT INTO profession (pro_name, category_id) VALUES (?, ?)",
+                   [(f"Profession {i}", i % 8 + 1) for i in range(professions)])
+
+    auth, users, user_skills = [], [], []
+    for i in range(members):
+        member_id = f"IND{i:06d}"
+        auth.append((member_id, f"user{i}@bench.local", 'x', 'individual'))
+        users.append((member_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"user{i}@bench.local",
+                      rng.choice(CITIES), str(rng.randint(0, 15)), rng.randint(1, professions),
+                      "Building things", None if i % 3 else f"https://res.cloudinary.com/bench/u{i}.webp"))
+        for skill_id in rng.sample(range(1, skills + 1), k=min(skills, rng.randint(2, 8))):
+            user_skills.append((i + 1, skill_id))
+
+    comp_rows, services = [], []
+    for i in range(companies):
+        member_id = f"COM{i:06d}"
+        auth.append((member_id, f"company{i}@bench.local", 'x', 'company'))
+        comp_rows.append((member_id, f"Company {i}", rng.choice(CITIES), "We hire.", f"company{i}@bench.local"))
+        for pro_id in rng.sample(range(1, professions + 1), k=min(professions, rng.randint(1, 4))):
+            services.append((i + 1, pro_id))
+
+    db.executemany("INSERT INTO auth (member_id, email, password_hash, role) VALUES (?, ?, ?, ?)", auth)
+    db.executemany("""INSERT INTO users (member_id, first_name, second_name, email, city, experience, pro_id,
+                      tagline, pic_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", users)
+    db.executemany("INSERT OR IGNORE INTO user_skills (user_id, skill_id) VALUES (?, ?)", user_skills)
+    db.executemany("INSERT INTO companies (member_id, company_name, city, about, email) VALUES (?, ?, ?, ?, ?)",
+                   comp_rows)
+    db.executemany("INSERT OR IGNORE INTO comp_services (comp_id, pro_id) VALUES (?, ?)", services)
+
+    job_rows, job_skills = [], []
+    for i in range(jobs):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 9))
+        job_rows.append((rng.randint(1, companies), f"Role {i}", "Job description " * 10, rng.choice(JOB_TYPES),
+                         "https://example.com/apply", created, created + timedelta(days=10)))
+        for skill_id in rng.sample(range(1, skills + 1), k=min(skills, rng.randint(1, 5))):
+            job_skills.append((i + 1, skill_id))
+    db.executemany("""INSERT INTO jobs (comp_id, job_role, job_description, job_type, external_link, created_at,
+                      expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)""", job_rows)
+    db.executemany("INSERT OR IGNORE INTO job_skills (job_id, skill_id) VALUES (?, ?)", job_skills)
+
+    chat = []
+    for i in range(messages):
+        individual = rng.random() < 0.8
+        sender = f"IND{rng.randrange(members):06d}" if individual else f"COM{rng.randrange(companies):06d}"
+        chat.append((sender, 'individual' if individual else 'company', f"Message {i}",
+                     now - timedelta(seconds=messages - i)))
+    db.executemany("INSERT INTO community_chat (sender_id, sender_role, message, created_at) VALUES (?, ?, ?, ?)", chat)
+
+    db.executemany("INSERT INTO notifications (user_id, type, message, user_role) VALUES (?, ?, ?, ?)",
+                   [(rng.randint(1, members), 'job_match', f"Alert {i}", 'individual') for i in range(notifications)])
+    db.execute("INSERT INTO admins (username, password_hash) VALUES ('bench', 'x')")
+    db.commit()
+    db.close()
+
+    return {'individual': 'IND000001', 'company': 'COM000001', 'admin_id': 1}
+
+
+# ---------------------------------------------------------------------------
+# 3. Boot the app against the stand-in
+# ---------------------------------------------------------------------------
+
+def boot_app(db_path, with_cache=False, trace_rate=0.0):
+    """Imports app with pymysql.connect pointed at the stand-in database."""
+    import pymysql
+    pymysql.connect = lambda *args, **kwargs: StandInConnection(db_path)
+
+    # Defaults only: an explicit environment still wins
+    os.environ.setdefault('DB_PORT', '3306')
+    os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+    os.environ['SCHEDULER_ENABLED'] = 'false'
+    os.environ.setdefault('TRACE_SAMPLE_RATE', str(trace_rate))
+    if not with_cache:
+        # A zero-byte LRU stores nothing: every request does the full work
+        os.environ.setdefault('FRAGMENT_CACHE_MAX_BYTES', '0')
+
+    import app as app_module
+    app_module.app.config['SESSION_COOKIE_SECURE'] = False
+    return app_module
+
+
+# ---------------------------------------------------------------------------
+# 4. Benchmarks
+# ---------------------------------------------------------------------------
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(func, iterations, warmup):
+    for _ in range(warmup):
+        func()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(_percentile(timings, 0.50) * 1000, 3),
+        'p99_ms': round(_percentile(timings, 0.99) * 1000, 3),
+    }
+
+
+def _client(app, session_data=None):
+    client = app.test_client()
+    if session_data:
+        with client.session_transaction() as sess:
+            sess.update(session_data)
+    return client
+
+
+def _get(client, path, expected=200):
+    def run():
+        response = client.get(path)
+        if response.status_code != expected:
+            raise RuntimeError(f"GET {path} returned {response.status_code}")
+    return run
+
+
+def build_benchmarks(app_module, ids, members, rng):
+    import db_manager
+    import chat
+    app = app_module.app
+
+    anonymous = _client(app)
+    individual = _client(app, {'logged_in': True, 'user_id': ids['individual'], 'role': 'individual'})
+    company = _client(app, {'logged_in': True, 'user_id': ids['company'], 'role': 'company'})
+    admin = _client(app, {'admin_id': ids['admin_id'], 'admin_name': 'bench'})
+
+    pages = max(1, min(members, 2000) // 20)
+
+    def news_fan_out():
+        response = admin.post('/admin/manage-news', data={
+            'title': 'Benchmark news', 'content': 'Body', 'category': 'Tech'})
+        if response.status_code != 302:
+            raise RuntimeError(f"news fan-out returned {response.status_code}")
+
+    return {
+        # micro: data access only
+        'micro.get_all_members': lambda: db_manager.get_all_members(limit=20, offset=rng.randrange(pages) * 20),
+        'micro.get_public_jobs': lambda: db_manager.get_public_jobs(limit=20, offset=0),
+        'micro.get_chat_history': chat.get_chat_history,
+        'micro.get_detailed_profile_data': lambda: db_manager.get_detailed_profile_data(ids['individual'], 'individual'),
+        # macro: full request incl. templates, hooks and middleware
+        'macro.members_page': _get(anonymous, '/members'),
+        'macro.jobs_page': _get(anonymous, '/jobs'),
+        'macro.job_feed': _get(individual, '/dashboard/job-feed'),
+        'macro.find_members': _get(individual, '/dashboard/find-members'),
+        'macro.find_members_company': _get(company, '/dashboard/find-members'),
+        'macro.news_fan_out': news_fan_out,
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Names whose p50 or ops/sec regressed past the threshold against the baseline."""
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        slower = current['p50_ms'] > previous['p50_ms'] * (1 + max_regression)
+        fewer = current['ops_per_sec'] < previous['ops_per_sec'] / (1 + max_regression)
+        if slower or fewer:
+            failures.append(f"{name}: p50 {previous['p50_ms']} -> {current['p50_ms']} ms, "
+                            f"{previous['ops_per_sec']} -> {current['ops_per_sec']} ops/s")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TechNest offline benchmarks")
+    parser.add_argument('--members', type=int, default=2000)
+    parser.add_argument('--companies', type=int, default=200)
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--skills', type=int, default=150)
+    parser.add_argument('--professions', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--notifications', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', help="comma-separated benchmark names (prefix match)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--with-cache', action='store_true', help="keep the fragment cache enabled")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="results file from a previous run to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    db_path = os.path.join(tempfile.mkdtemp(prefix='technest-bench-'), 'bench.sqlite')
+    create_database(db_path)
+    started = time.perf_counter()
+    ids = seed(db_path, args.members, args.companies, args.jobs, args.skills, args.professions,
+               args.messages, args.notifications, rng)
+    print(f"Seeded {args.members} members, {args.companies} companies, {args.jobs} jobs, "
+          f"{args.messages} messages in {time.perf_counter() - started:.1f}s ({db_path})")
+
+    app_module = boot_app(db_path, with_cache=args.with_cache)
+    import migrate
+    migrate.main(['backfill'])  # the seed writes link rows and pictures only, as a deploy would
+    benchmarks = build_benchmarks(app_module, ids, args.members, rng)
+    if args.only:
+        prefixes = [p.strip() for p in args.only.split(',')]
+        benchmarks = {n: f for n, f in benchmarks.items() if any(n.startswith(p) or n.split('.', 1)[1].startswith(p)
+                                                                  for p in prefixes)}
+
+    results = {}
+    print(f"\n{'benchmark':32} {'ops/sec':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, func in benchmarks.items():
+        results[name] = measure(func, args.iterations, args.warmup)
+        r = results[name]
+        print(f"{name:32} {r['ops_per_sec']:>10} {r['p50_ms']:>10} {r['p99_ms']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'params': vars(args), 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f)['results'], args.max_regression)
+        if failures:
+            print("\nRegressions:")
+            for line in failures:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.max_regression:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
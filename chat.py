@@ -4,14 +4,43 @@ from flask import Blueprint, request, session, current_app, url_for, render_temp
 from flask_socketio import emit
 from werkzeug.utils import secure_filename
 from db_manager import get_db_connection
-from auth import save_to_cloudinary
+from upload_service import upload_to_cloudinary, validate_upload, hash_upload, get_upload_size
 # import pymysql # Add this
 import cloudinary.uploader
+import cloudinary.api
+import os
+import time
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pymysql.cursors import DictCursor # And this
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from db_manager import with_db
+from avatars import avatar_url
+from query_profiles import select_list
+from metrics import track_event
+from tracing import span, trace_root, traced
 # 1. Create a Blueprint for HTTP routes (like file uploads)
 chat_bp = Blueprint('chat', __name__)
 
+# Sender lookup, shared with chat_async's coroutines
+SENDER_QUERIES = {
+    'individual': "SELECT first_name AS name, pic_path AS pic, avatar_url FROM users WHERE member_id = %s",
+    'company': "SELECT company_name AS name, company_logo AS pic, avatar_url FROM companies WHERE member_id = %s",
+}
+
+def sender_query(role):
+    return SENDER_QUERIES['individual' if role == 'individual' else 'company']
+
+def sender_details(row, member_id, role):
+    """(name, display_pic, member_id, db_pic_val) from a SENDER_QUERIES row, or the defaults if None."""
+    name = "User" if role == 'individual' else "Company"
+    display_pic = avatar_url(None, name, role)
+    if not row:
+        return name, display_pic, member_id, None
+    # avatar_url is resolved when the row is written (see avatars.py)
+    return row.get('name') or name, row.get('avatar_url') or display_pic, member_id, row.get('pic')
+
 @with_db
 def get_sender_details(conn, member_id, role):
     """
@@ -20,56 +49,85 @@ def get_sender_details(conn, member_id, role):
     """
     # 1. Use the 'conn' injected by the decorator
     with conn.cursor() as cursor:
-        # Defaults
-        name = "User" if role == 'individual' else "Company"
-        db_pic_val = None 
-        
         try:
-            if role == 'individual':
-                cursor.execute("SELECT first_name, pic_path FROM users WHERE member_id = %s", (member_id,))
-                res = cursor.fetchone()
-                if res:
-                    name = res.get('first_name') or "User"
-                    db_pic_val = res.get('pic_path')
-            else:
-                cursor.execute("SELECT company_name, company_logo FROM companies WHERE member_id = %s", (member_id,))
-                res = cursor.fetchone()
-                if res:
-                    name = res.get('company_name') or "Company"
-                    db_pic_val = res.get('company_logo')
-            
-            # 2. Handle Image Logic (Cloudinary vs UI-Avatars)
-            if db_pic_val and str(db_pic_val).startswith('http'):
-                # It's a Cloudinary URL, use it directly
-                display_pic = db_pic_val
-            else:
-                # Fallback to UI-Avatars
-                # Clean name for URL (removes spaces/special characters)
-                clean_name = name.replace(" ", "+")
-                bg_color = "0d6efd" if role == 'individual' else "0D8ABC"
-                display_pic = f"https://ui-avatars.com/api/?name={clean_name}&background={bg_color}&color=fff"
-            
-            return name, display_pic, member_id, db_pic_val
-            
+            cursor.execute(sender_query(role), (member_id,))
+            return sender_details(cursor.fetchone(), member_id, role)
         except Exception as e:
             print(f"Error in get_sender_details: {e}")
             # Safe fallbacks if query fails
-            return name, f"https://ui-avatars.com/api/?name={role}", member_id, None
+            return sender_details(None, member_id, role)
+
+# 2. Message persistence and broadcast payload (also used by chat_async)
+INSERT_MESSAGE_SQL = """INSERT INTO community_chat 
+        (sender_id, sender_role, message, file_path, file_name, file_public_id) 
+        VALUES (%s, %s, %s, %s, %s, %s)"""
+# One more message references this attachment (see chat_assets)
+ATTACHMENT_REF_SQL = """
+    UPDATE chat_assets SET ref_count = ref_count + 1, last_used_at = NOW()
+    WHERE public_id = %s
+"""
+
+def message_fields(data):
+    """(message_text, file_path, file_name, file_token) from a send_community_msg payload."""
+    return (data.get('message', '').strip(), data.get('file_path', None),
+            data.get('file_name', None), data.get('file_token', None))
+
+# Attachment tokens: /chat/upload signs (uploader, public_id, url) so a message can
+# only reference (and bump ref_count on) an asset its own sender uploaded
+ATTACHMENT_TOKEN_MAX_AGE = int(os.getenv('ATTACHMENT_TOKEN_MAX_AGE', 24 * 3600))  # seconds
+
+def _attachment_serializer(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt='chat-attachment')
+
+def attachment_token(secret_key, member_id, public_id, file_path):
+    return _attachment_serializer(secret_key).dumps([member_id, public_id, file_path])
+
+def attachment_public_id(secret_key, token, member_id, file_path):
+    """The public_id a message may reference, or None (no/forged/expired token, other uploader or file)."""
+    if not token or not member_id:
+        return None
+    try:
+        owner, public_id, signed_path = _attachment_serializer(secret_key).loads(token, max_age=ATTACHMENT_TOKEN_MAX_AGE)
+    except (BadSignature, ValueError, TypeError):
+        return None
+    return public_id if owner == member_id and signed_path == file_path else None
+
+def message_payload(display_name, avatar, role, sender_m_id, message_text, file_path, file_name, time_text=None):
+    """The receive_community_msg event body."""
+    if time_text is None:
+        pakistan_time = datetime.utcnow() + timedelta(hours=5)
+        time_text = pakistan_time.strftime('%I:%M %p') # Now uses PKT
+    return {
+        'name': display_name,
+        'avatar': avatar,
+        'role': role,
+        'message': message_text,
+        'sender_member_id': sender_m_id,
+        'file_path': file_path,
+        'file_name': file_name,
+        'time': time_text,
+    }
+
+def history_payloads(messages):
+    """get_chat_history() rows in the receive_community_msg shape (load_community_history ack)."""
+    return [message_payload(msg['display_name'], msg['avatar'], msg['sender_role'], msg['sender_member_id'],
+                            msg['message'], msg['file_path'], msg['file_name'], msg['formatted_time'])
+            for msg in messages]
+
 # 3. SocketIO Event Registration
 # We wrap these in a function so app.py can pass the 'socketio' instance here
 def init_chat_socket(socketio):
-    
     @socketio.on('send_community_msg')
+    @track_event('send_community_msg')
+    @trace_root('socket', 'send_community_msg')
     @with_db
     def handle_message(conn, data): # conn is injected here by the decorator
         member_id = session.get('user_id')
         role = session.get('role')
         
         # Get text message AND file data from the 'data' dictionary
-        message_text = data.get('message', '').strip()
-        file_path = data.get('file_path', None) 
-        file_name = data.get('file_name', None) 
-        file_public_id = data.get('file_public_id', None)
+        message_text, file_path, file_name, file_token = message_fields(data)
+        file_public_id = attachment_public_id(current_app.secret_key, file_token, member_id, file_path)
 
         # Get user details for the broadcast
         # Note: get_sender_details is also decorated, so it manages its own connection
@@ -78,95 +136,126 @@ def init_chat_socket(socketio):
         # Save to Database
         try:
             with conn.cursor() as cursor:
-                sql = """INSERT INTO community_chat 
-                        (sender_id, sender_role, message, file_path, file_name, file_public_id) 
-                        VALUES (%s, %s, %s, %s, %s, %s)"""
-                cursor.execute(sql, (member_id, role, message_text, file_path, file_name, file_public_id))
+                cursor.execute(INSERT_MESSAGE_SQL, (member_id, role, message_text, file_path, file_name, file_public_id))
+                if file_public_id:
+                    cursor.execute(ATTACHMENT_REF_SQL, (file_public_id,))
                 # conn.commit() is handled automatically by @with_db on success
         except Exception as e:
             print(f"Database Save Error in Socket: {e}")
             # The decorator will handle the rollback automatically
-        pakistan_time = datetime.utcnow() + timedelta(hours=5)
         # BROADCAST: This sends the data back to the JavaScript
-        emit('receive_community_msg', {
-            'name': display_name,
-            'avatar': avatar,
-            'role': role,
-            'message': message_text,
-            'sender_member_id': sender_m_id,
-            'file_path': file_path,
-            'file_name': file_name,
-            'time': pakistan_time.strftime('%I:%M %p') # Now uses PKT
-        }, broadcast=True)
+        emit('receive_community_msg', message_payload(
+            display_name, avatar, role, sender_m_id, message_text, file_path, file_name), broadcast=True)
+
+    @socketio.on('load_community_history')
+    @track_event('load_community_history')
+    def handle_history():
+        # Acknowledged with the latest messages, e.g. to refill the view after a reconnect
+        return history_payloads(get_chat_history())
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'docx', 'zip', 'txt', 'rar'}
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-           
+
+# --- Attachment Deduplication ---
+# One row per distinct file content (SHA-256). ref_count = number of chat
+# messages pointing at the asset; cleanup only destroys assets at zero.
+# The chat_assets table is created by migrations/0001_base_schema.sql.
+@with_db
+def find_chat_asset(conn, content_hash):
+    """Returns the existing asset for this content (and marks it as recently used), or None."""
+    with conn.cursor() as cursor:
+        # Touching last_used_at keeps cleanup away until the message is sent
+        cursor.execute("UPDATE chat_assets SET last_used_at = NOW() WHERE content_hash = %s", (content_hash,))
+        cursor.execute("""
+            SELECT public_id, url, resource_type FROM chat_assets WHERE content_hash = %s
+        """, (content_hash,))
+        return cursor.fetchone()
+
 @with_db
+def register_chat_asset(conn, content_hash, upload_result, size):
+    """Records a freshly uploaded asset. If the same content won a race, keeps that one instead."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT IGNORE INTO chat_assets (content_hash, public_id, url, resource_type, bytes)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (content_hash, upload_result['public_id'], upload_result['secure_url'],
+              upload_result.get('resource_type', 'image'), size))
+
+        if cursor.rowcount == 0:
+            # Someone uploaded identical content meanwhile: drop our duplicate copy
+            try:
+                with span('cloudinary.destroy'):
+                    cloudinary.uploader.destroy(upload_result['public_id'],
+                                                resource_type=upload_result.get('resource_type', 'image'))
+            except Exception as c_error:
+                print(f"Cloudinary Duplicate Cleanup Error: {c_error}")
+
+        cursor.execute("""
+            SELECT public_id, url, resource_type FROM chat_assets WHERE content_hash = %s
+        """, (content_hash,))
+        return cursor.fetchone()
+           
+# ONE QUERY to get messages AND sender details at once (The Speed Secret)
+CHAT_HISTORY_SQL = f"""
+    SELECT {select_list('chat_message')}
+    FROM community_chat m
+    LEFT JOIN users u ON m.sender_id = u.member_id AND m.sender_role = 'individual'
+    LEFT JOIN companies c ON m.sender_id = c.member_id AND m.sender_role = 'company'
+    ORDER BY m.created_at DESC LIMIT 50
+"""
+
+@with_db(readonly=True)
 def get_chat_history(conn):
     with conn.cursor() as cursor:
-        # 1. ONE QUERY to get messages AND sender details at once (The Speed Secret)
-        sql = """
-            SELECT 
-                m.*,
-                u.first_name AS u_name, u.pic_path AS u_pic, u.member_id AS u_mid,
-                c.company_name AS c_name, c.company_logo AS c_pic, c.member_id AS c_mid
-            FROM community_chat m
-            LEFT JOIN users u ON m.sender_id = u.member_id AND m.sender_role = 'individual'
-            LEFT JOIN companies c ON m.sender_id = c.member_id AND m.sender_role = 'company'
-            ORDER BY m.created_at DESC LIMIT 50
-        """
-        cursor.execute(sql)
-        messages = list(cursor.fetchall()) 
-        messages.reverse()
+        cursor.execute(CHAT_HISTORY_SQL)
+        return format_chat_history(cursor.fetchall())
+
+def format_chat_history(rows):
+    """Oldest-first messages with the display keys the chat template reads."""
+    messages = list(rows) 
+    messages.reverse()
         
-        for msg in messages:
-            # 2. Logic to determine display values (No DB calls here = Fast!)
-            if msg['sender_role'] == 'individual':
-                name = msg.get('u_name') or "User"
-                raw_file = msg.get('u_pic')
-                m_id = msg.get('u_mid')
-                bg_color = "0d6efd"
-            else:
-                name = msg.get('c_name') or "Company"
-                raw_file = msg.get('c_pic')
-                m_id = msg.get('c_mid')
-                bg_color = "0D8ABC"
-
-            # 3. Process Avatar URL
-            if raw_file and str(raw_file).startswith('http'):
-                full_pic_url = raw_file
+    for msg in messages:
+        # 2. Logic to determine display values (No DB calls here = Fast!)
+        if msg['sender_role'] == 'individual':
+            name = msg.get('u_name') or "User"
+            raw_file = msg.get('u_pic')
+            m_id = msg.get('u_mid')
+        else:
+            name = msg.get('c_name') or "Company"
+            raw_file = msg.get('c_pic')
+            m_id = msg.get('c_mid')
+
+        # 3. Avatar comes straight from the row (resolved at write time); deleted senders get initials
+        if not msg['avatar']:
+            msg['avatar'] = avatar_url(None, name, msg['sender_role'])
+
+        f_path = msg.get('file_path')
+        if f_path:
+            f_path = str(f_path) # Force to string
+            if f_path.startswith('http'):
+                # 1. If it's a Cloudinary link, use it
+                msg['file_path'] = f_path
+            elif f_path.strip() == "" or f_path == "None":
+                # 2. If it's empty, null it out so the HTML doesn't try to load it
+                msg['file_path'] = None
             else:
-                full_pic_url = f"https://ui-avatars.com/api/?name={name.replace(' ', '+')}&background={bg_color}&color=fff"
-            # Inside your for msg in messages loop:
-
-            f_path = msg.get('file_path')
-            if f_path:
-                f_path = str(f_path) # Force to string
-                if f_path.startswith('http'):
-                    # 1. If it's a Cloudinary link, use it
-                    msg['file_path'] = f_path
-                elif f_path.strip() == "" or f_path == "None":
-                    # 2. If it's empty, null it out so the HTML doesn't try to load it
-                    msg['file_path'] = None
-                else:
-                    None
-            # 4. Fill the msg object with your exact required keys
-            msg['display_name'] = name
-            msg['avatar'] = full_pic_url
-            msg['raw_file'] = raw_file
-            msg['sender_member_id'] = m_id # <--- This fixes your profile link!
-            msg['is_comp'] = (msg['sender_role'] == 'company')
-            msg['formatted_time'] = msg['created_at'].strftime('%I:%M %p')
-
-            # 5. Fix Chat File Paths (Cloudinary check)
-           
-        
-        return messages
-        
+                None
+        # 4. Fill the msg object with your exact required keys
+        msg['display_name'] = name
+        msg['raw_file'] = raw_file
+        msg['sender_member_id'] = m_id # <--- This fixes your profile link!
+        msg['is_comp'] = (msg['sender_role'] == 'company')
+        msg['formatted_time'] = msg['created_at'].strftime('%I:%M %p')
+
+        # 5. Fix Chat File Paths (Cloudinary check)
+       
+    
+    return messages
+    
 @chat_bp.route('/dashboard/community-chat')
 def community_chat_page():
     user_id = session.get('user_id')
@@ -219,20 +308,35 @@ def handle_chat_upload():
             'error': 'File type not allowed! Use PDF, ZIP, or Images.'
         }), 400
 
+    # Size from the spooled temp file + magic-byte sniffing (body is never loaded into memory)
+    upload_error = validate_upload(file, max_bytes=current_app.config.get('MAX_CONTENT_LENGTH'),
+                                   allowed_extensions=ALLOWED_EXTENSIONS)
+    if upload_error:
+        return jsonify({'success': False, 'error': upload_error}), 400
+
     member_id = session.get('user_id')
     
     try:
-        # 3. Call Cloudinary Wrapper
-        # We pass member_id because your save function needs it for logic
-        file_url, public_id = save_to_cloudinary(file, 'chat', member_id)
+        # 3. Deduplicate: identical content reuses the existing Cloudinary asset
+        content_hash = hash_upload(file)
+        asset = find_chat_asset(content_hash)
+
+        if not asset:
+            # New content: call Cloudinary Wrapper (size is read first; the upload closes the stream)
+            file_size = get_upload_size(file)
+            upload_result = upload_to_cloudinary(file, 'chat', member_id)
+            if upload_result:
+                asset = register_chat_asset(content_hash, upload_result, file_size)
         
-        if file_url and public_id:
+        if asset:
             # 4. Return Success
             return jsonify({
                 'success': True,
-                'file_path': file_url,      # The secure HTTPS link
-                'file_name': file.filename, # Original name for display
-                'file_public_id': public_id # Saved for deletion logic
+                'file_path': asset['url'],              # The secure HTTPS link
+                'file_name': file.filename,             # Original name for display
+                'file_public_id': asset['public_id'],   # Saved for deletion logic
+                # Sent back with the message; proves this member uploaded the asset
+                'file_token': attachment_token(current_app.secret_key, member_id, asset['public_id'], asset['url'])
             })
         else:
             return jsonify({'success': False, 'error': 'Cloudinary upload returned None'}), 500
@@ -241,53 +345,176 @@ def handle_chat_upload():
         print(f"UPLOAD ERROR: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
         
+# --- Chat Cleanup Pipeline ---
+CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', 500))  # messages per DELETE chunk
+CLOUDINARY_BULK_LIMIT = 100  # Admin API maximum public_ids per delete_resources call
+CLEANUP_WORKERS = int(os.getenv('CLEANUP_WORKERS', 4))
+
+# Files uploaded before deduplication have no chat_assets row and no known type
+LEGACY_RESOURCE_TYPE = 'legacy'
+
+@with_db
+def _delete_expired_chunk(conn, limit):
+    """
+    Deletes one chunk of expired messages (oldest first, via the created_at index)
+    and releases the attachment references they held, in one short transaction.
+    Legacy attachments are adopted into chat_assets at ref_count 0, so they are
+    destroyed (and retried) by the same pass as the rest. Returns rows_deleted.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT m.id, m.file_path, m.file_public_id, m.created_at, a.public_id AS tracked
+            FROM community_chat m
+            LEFT JOIN chat_assets a ON a.public_id = m.file_public_id
+            WHERE m.created_at < %s
+            ORDER BY m.created_at
+            LIMIT %s
+            FOR UPDATE
+        """, (limit, CLEANUP_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+
+        refs = Counter(r['file_public_id'] for r in rows if r.get('tracked'))
+        for public_id, count in refs.items():
+            cursor.execute("""
+                UPDATE chat_assets SET ref_count = GREATEST(ref_count - %s, 0)
+                WHERE public_id = %s
+            """, (count, public_id))
+
+        # Legacy files are owned by exactly one message: the row outlives the message until Cloudinary confirms
+        legacy = [r for r in rows if r['file_public_id'] and not r.get('tracked')]
+        if legacy:
+            cursor.executemany("""
+                INSERT IGNORE INTO chat_assets (content_hash, public_id, url, resource_type, ref_count, last_used_at)
+                VALUES (%s, %s, %s, %s, 0, %s)
+            """, [(hashlib.sha256(f"legacy:{r['file_public_id']}".encode('utf-8')).hexdigest(), r['file_public_id'],
+                   r['file_path'] or '', LEGACY_RESOURCE_TYPE, r['created_at']) for r in legacy])
+
+        # Exactly the rows locked above (created_at ties could pick others)
+        cursor.execute("DELETE FROM community_chat WHERE id IN %s", (tuple(r['id'] for r in rows),))
+        return cursor.rowcount
+
 @with_db
-def cleanup_old_chats(conn, app): # conn is injected by @with_db
-    """Deletes chat records and physical files older than 24 hours."""
+def _unreferenced_assets(conn, limit):
+    """Assets nobody references (and not touched since the limit), grouped by resource type."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT public_id, resource_type FROM chat_assets
+            WHERE ref_count <= 0 AND last_used_at < %s
+        """, (limit,))
+        grouped = {}
+        for row in cursor.fetchall():
+            grouped.setdefault(row['resource_type'], []).append(row['public_id'])
+        return grouped
+
+@with_db
+def _forget_assets(conn, public_ids):
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM chat_assets WHERE public_id IN %s AND ref_count <= 0", (tuple(public_ids),))
+
+def _bulk_destroy(public_ids, resource_type):
+    """Runs on the cleanup pool: one Admin API call. Returns (deleted, not_found) id lists."""
+    result = cloudinary.api.delete_resources(public_ids, resource_type=resource_type)
+    statuses = result.get('deleted', {})
+    deleted = [pid for pid in public_ids if statuses.get(pid) == 'deleted']
+    not_found = [pid for pid in public_ids if statuses.get(pid) == 'not_found']
+    return deleted, not_found
+
+@traced('cloudinary.delete_resources')
+def _destroy_batches(pool, grouped):
+    """Submits every (resource_type, batch) concurrently. Returns (gone_ids, errors)."""
+    futures = []
+    for resource_type, ids in grouped.items():
+        for i in range(0, len(ids), CLOUDINARY_BULK_LIMIT):
+            batch = ids[i:i + CLOUDINARY_BULK_LIMIT]
+            futures.append((batch, pool.submit(_bulk_destroy, batch, resource_type)))
+
+    gone, not_found, errors = [], [], 0
+    for batch, future in futures:
+        try:
+            deleted, missing = future.result()
+            gone += deleted
+            not_found += missing
+        except Exception as c_error:
+            errors += 1
+            print(f"Cloudinary Bulk Delete Error ({len(batch)} assets): {c_error}")
+    return gone, not_found, errors
+
+def cleanup_old_chats(app):
+    """
+    Deletes chat records older than 24 hours and the Cloudinary files nobody references anymore.
+    DB work happens in small chunks; Cloudinary deletes run in bulk on a bounded pool
+    with no DB connection held. Returns a run report.
+    """
     # We still need app_context if this is called from an external script
     with app.app_context():
         # 1. Calculate time threshold
         limit = datetime.now() - timedelta(hours=24)
-        
+        started = time.perf_counter()
+        report = {'messages_deleted': 0, 'assets_destroyed': 0, 'errors': 0}
+
         try:
-            with conn.cursor() as cursor:
-                # 2. Fetch public_ids BEFORE deleting rows
-                # Security: Filtering for NOT NULL ensures we don't call Cloudinary for text-only msgs
-                cursor.execute("""
-                    SELECT file_public_id 
-                    FROM community_chat 
-                    WHERE created_at < %s AND file_public_id IS NOT NULL
-                """, (limit,))
-                old_files = cursor.fetchall()
-
-                print(f"Found {len(old_files)} files to delete from Cloud.")
-
-                # 3. Loop through and delete from Cloudinary
-                for f in old_files:
-                    public_id = f.get('file_public_id')
-                    if not public_id:
-                        continue
-                        
-                    try:
-                        # Attempt 1: Image type
-                        result = cloudinary.uploader.destroy(public_id, resource_type="image")
-                        
-                        # Attempt 2: Raw type (PDFs, ZIPs, etc.)
-                        if result.get('result') != 'ok':
-                            cloudinary.uploader.destroy(public_id, resource_type="raw")
-                            
-                        print(f"Deleted Cloudinary Asset: {public_id}")
-                    except Exception as c_error:
-                        print(f"Cloudinary Delete Error for {public_id}: {c_error}")
-
-                # 4. Delete database records
-                # This is atomic: if this fails, the decorator won't commit
-                cursor.execute("DELETE FROM community_chat WHERE created_at < %s", (limit,))
-                
-                # Manual conn.commit() is no longer needed; handled by @with_db
-                print(f"Cleanup finished. Database cleared for records older than {limit}")
-                
+            # 2. Delete expired messages chunk by chunk, releasing attachment references
+            while True:
+                deleted = _delete_expired_chunk(limit)
+                report['messages_deleted'] += deleted
+                if deleted < CLEANUP_BATCH_SIZE:
+                    break
+
+            # 3. Bulk delete unreferenced assets from Cloudinary, concurrently
+            grouped = _unreferenced_assets(limit)
+            legacy_ids = grouped.pop(LEGACY_RESOURCE_TYPE, [])
+            print(f"Found {sum(map(len, grouped.values())) + len(legacy_ids)} files to delete from Cloud.")
+
+            with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as pool:
+                gone, already_gone, errors = _destroy_batches(pool, grouped)
+                report['errors'] += errors
+
+                # Legacy files have no recorded type: try image first, then raw (PDFs, ZIPs, etc.)
+                if legacy_ids:
+                    legacy_gone, missing, errors = _destroy_batches(pool, {'image': legacy_ids})
+                    raw_gone, raw_missing, raw_errors = _destroy_batches(pool, {'raw': missing})
+                    gone += legacy_gone + raw_gone
+                    already_gone += raw_missing
+                    report['errors'] += errors + raw_errors
+
+            # 4. Forget destroyed assets (not_found counts as gone: Cloudinary no longer has it)
+            #    Failed destroys keep their row and are retried on the next run
+            forget = gone + already_gone
+            for i in range(0, len(forget), CLOUDINARY_BULK_LIMIT):
+                _forget_assets(forget[i:i + CLOUDINARY_BULK_LIMIT])
+            report['assets_destroyed'] += len(gone)
+
         except Exception as e:
             print(f"Cleanup failed during DB operation: {e}")
-            # Decorator handles rollback automatically
             raise e
+
+        # 5. Run report
+        elapsed = time.perf_counter() - started
+        items = report['messages_deleted'] + report['assets_destroyed']
+        report['seconds'] = round(elapsed, 3)
+        report['items_per_sec'] = round(items / elapsed, 1) if elapsed else 0.0
+        print(f"Cleanup finished: {report['messages_deleted']} messages, {report['assets_destroyed']} assets, "
+              f"{report['errors']} errors in {report['seconds']}s ({report['items_per_sec']} items/s). "
+              f"Records older than {limit} cleared.")
+        return report
+
+@with_db
+def reconcile_chat_asset_refs(conn):
+    """Recomputes chat_assets.ref_count from the messages that actually exist (repairs drift)."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE chat_assets a
+            LEFT JOIN (
+                SELECT file_public_id, COUNT(*) AS refs
+                FROM community_chat
+                WHERE file_public_id IS NOT NULL
+                GROUP BY file_public_id
+            ) m ON m.file_public_id = a.public_id
+            SET a.ref_count = COALESCE(m.refs, 0)
+            WHERE a.ref_count <> COALESCE(m.refs, 0)
+        """)
+        if cursor.rowcount:
+            print(f"Reconciled reference counts on {cursor.rowcount} chat assets")
+        return cursor.rowcount
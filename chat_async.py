@@ -0,0 +1,110 @@
+import asyncio
+from http.cookies import SimpleCookie
+import socketio
+from async_db import with_async_db, close_pool
+from chat import (sender_query, sender_details, message_fields, message_payload, history_payloads,
+                  format_chat_history, attachment_public_id, CHAT_HISTORY_SQL, INSERT_MESSAGE_SQL,
+                  ATTACHMENT_REF_SQL)
+from metrics import track_event
+
+# asgiref is optional: only the ASGI mode serves Flask through it
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+# --- Async Community Chat ---
+# The ASGI counterpart of chat.init_chat_socket (SOCKETIO_MODE=asgi, served by
+# asgi.py): a python-socketio AsyncServer whose handlers await aiomysql
+# instead of blocking PyMySQL on eventlet green threads. Same events, payloads
+# and SQL as the eventlet handlers; chat.py owns the queries and row shaping.
+
+
+@with_async_db
+async def get_sender_details_async(conn, member_id, role):
+    """Returns: name, display_pic, member_id, db_pic_val (see chat.get_sender_details)."""
+    async with conn.cursor() as cursor:
+        try:
+            await cursor.execute(sender_query(role), (member_id,))
+            return sender_details(await cursor.fetchone(), member_id, role)
+        except Exception as e:
+            print(f"Error in get_sender_details_async: {e}")
+            return sender_details(None, member_id, role)
+
+
+@with_async_db
+async def get_chat_history_async(conn):
+    async with conn.cursor() as cursor:
+        await cursor.execute(CHAT_HISTORY_SQL)
+        return format_chat_history(await cursor.fetchall())
+
+
+@with_async_db
+async def save_message_async(conn, member_id, role, message_text, file_path, file_name, file_public_id):
+    async with conn.cursor() as cursor:
+        await cursor.execute(INSERT_MESSAGE_SQL, (member_id, role, message_text, file_path, file_name, file_public_id))
+        if file_public_id:
+            await cursor.execute(ATTACHMENT_REF_SQL, (file_public_id,))
+
+
+async def _save_quietly(*fields):
+    # A failed save must not stop the broadcast (same as the eventlet handler)
+    try:
+        await save_message_async(*fields)
+    except Exception as e:
+        print(f"Database Save Error in Socket: {e}")
+
+
+def flask_session(app, environ):
+    """The Flask session from the handshake's cookie ({} if missing, forged or expired)."""
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        morsel = SimpleCookie(environ.get('HTTP_COOKIE', '')).get(app.config['SESSION_COOKIE_NAME'])
+        if morsel is None or serializer is None:
+            return {}
+        return serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return {}
+
+
+def create_async_socketio(app):
+    """AsyncServer with the community chat events registered."""
+    # Engine.IO's default polling compression applies here as well
+    sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+
+    @sio.event
+    async def connect(sid, environ):
+        # Read once per connection; handlers use the Socket.IO session afterwards
+        await sio.save_session(sid, flask_session(app, environ))
+
+    @sio.on('send_community_msg')
+    @track_event('send_community_msg')
+    async def handle_message(sid, data):
+        session = await sio.get_session(sid)
+        member_id = session.get('user_id')
+        role = session.get('role')
+        message_text, file_path, file_name, file_token = message_fields(data)
+        file_public_id = attachment_public_id(app.secret_key, file_token, member_id, file_path)
+
+        # Sender lookup and the insert are independent, so they run concurrently
+        (display_name, avatar, sender_m_id, _), _ = await asyncio.gather(
+            get_sender_details_async(member_id, role),
+            _save_quietly(member_id, role, message_text, file_path, file_name, file_public_id),
+        )
+        await sio.emit('receive_community_msg', message_payload(
+            display_name, avatar, role, sender_m_id, message_text, file_path, file_name))
+
+    @sio.on('load_community_history')
+    @track_event('load_community_history')
+    async def handle_history(sid):
+        return history_payloads(await get_chat_history_async())
+
+    return sio
+
+
+def create_asgi_application(app):
+    """Socket.IO on the AsyncServer, every other path to the Flask app (on asgiref's thread pool)."""
+    if WsgiToAsgi is None:
+        raise RuntimeError("asgiref is not installed (pip install asgiref)")
+    sio = create_async_socketio(app)
+    return socketio.ASGIApp(sio, other_asgi_app=WsgiToAsgi(app), on_shutdown=close_pool)
@@ -2,11 +2,12 @@
 from flask import Blueprint, render_template, session, redirect, url_for
 from pymysql.cursors import DictCursor
 from chat import get_sender_details, with_db
+from db_manager import resolve_member
 
 companies_bp = Blueprint('companies', __name__)
 
 @companies_bp.route('/dashboard/find-companies')
-@with_db
+@with_db(readonly=True)
 def find_companies(conn): # conn is injected by @with_db
     user_id = session.get('user_id')
     role = session.get('role')
@@ -21,14 +22,13 @@ def find_companies(conn): # conn is injected by @with_db
         with conn.cursor() as cursor:
             # --- CASE 1: INDIVIDUAL LOOKING FOR SERVICES ---
             if role == 'individual':
-                cursor.execute("SELECT pro_id FROM users WHERE member_id = %s", (user_id,))
-                user_data = cursor.fetchone()
+                user_data = resolve_member(user_id, role, cursor)
 
                 if user_data and user_data.get('pro_id'):
                     user_pro_id = user_data['pro_id']
 
                     query = """
-                        SELECT c.member_id, c.company_name, c.company_logo, c.city, 
+                        SELECT c.member_id, c.company_name, c.avatar_url, c.city, 
                                c.established_year, c.employee_range
                         FROM companies c
                         JOIN comp_services cs ON c.comp_id = cs.comp_id
@@ -39,21 +39,19 @@ def find_companies(conn): # conn is injected by @with_db
 
             # --- CASE 2: COMPANY LOOKING FOR PARTNERS (B2B) ---
             elif role == 'company':
-                cursor.execute("""
-                    SELECT cs.pro_id, c.comp_id 
-                    FROM comp_services cs 
-                    JOIN companies c ON cs.comp_id = c.comp_id 
-                    WHERE c.member_id = %s
-                """, (user_id,))
-                services_data = cursor.fetchall()
+                company_data = resolve_member(user_id, role, cursor)
+                services_data = []
+                if company_data:
+                    my_comp_id = company_data['comp_id']
+                    cursor.execute("SELECT pro_id FROM comp_services WHERE comp_id = %s", (my_comp_id,))
+                    services_data = cursor.fetchall()
                 
                 if services_data:
                     service_ids = [row['pro_id'] for row in services_data]
-                    my_comp_id = services_data[0]['comp_id']
 
                     # Securely handle the IN clause
                     query = """
-                        SELECT DISTINCT c.member_id, c.company_name, c.company_logo, c.city, 
+                        SELECT DISTINCT c.member_id, c.company_name, c.avatar_url, c.city, 
                                         c.established_year, c.employee_range
                         FROM companies c
                         JOIN comp_services cs ON c.comp_id = cs.comp_id
@@ -62,15 +60,6 @@ def find_companies(conn): # conn is injected by @with_db
                     cursor.execute(query, (tuple(service_ids), my_comp_id))
                     matched_companies = cursor.fetchall()
 
-        # --- DATA POST-PROCESSING (Outside the cursor context) ---
-        for comp in matched_companies:
-            logo_val = comp.get('company_logo')
-            if logo_val and (logo_val.startswith('http://') or logo_val.startswith('https://')):
-                comp['logo_url'] = logo_val
-            else:
-                comp_name = comp.get('company_name', 'Company')
-                comp['logo_url'] = f"https://ui-avatars.com/api/?name={comp_name}&background=0D8ABC&color=fff"
-
         # Fetch layout details
         display_name, profile_url, _, _ = get_sender_details(user_id, role)
 
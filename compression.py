@@ -0,0 +1,228 @@
+import os
+import zlib
+from werkzeug.http import parse_accept_header
+from metrics import register_collector
+
+# Brotli is optional: without it everything is served as gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Response Compression ---
+# WSGI middleware around app.wsgi_app (outside Socket.IO): compresses text
+# responses with brotli or gzip, streams responses of unknown length chunk by
+# chunk, and serves prebuilt .br/.gz siblings of static files when they exist.
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 500))  # bytes
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))  # dynamic responses; static files are prebuilt at 11
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+}
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+stats = {'responses': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+
+@register_collector
+def compression_metrics():
+    return [
+        ('compression_responses_total', 'counter', 'Responses compressed on the fly', [({}, stats['responses'])]),
+        ('compression_bytes_total', 'counter', 'Bytes before/after on-the-fly compression',
+         [({'stage': 'in'}, stats['bytes_in']), ({'stage': 'out'}, stats['bytes_out'])]),
+    ]
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers, *names):
+    names = {n.lower() for n in names}
+    return [(k, v) for k, v in headers if k.lower() not in names]
+
+
+def _choose_encoding(environ):
+    accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+class _Encoder:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.impl = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 writes a gzip header/trailer instead of raw zlib
+            self.impl = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.impl.process(data) if self.encoding == 'br' else self.impl.compress(data)
+
+    def flush(self):
+        """Emits everything buffered so far (keeps streamed pages progressive)."""
+        return self.impl.flush() if self.encoding == 'br' else self.impl.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.impl.finish() if self.encoding == 'br' else self.impl.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, wsgi_app, static_folder=None, static_url_path='/static',
+                 socketio_path='/socket.io', websocket_deflate=True):
+        self.wsgi_app = wsgi_app
+        self.static_folder = static_folder
+        self.static_url_path = static_url_path.rstrip('/') + '/'
+        self.socketio_path = socketio_path
+        self.websocket_deflate = websocket_deflate
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        # Engine.IO compresses its own polling responses. Websockets use
+        # permessage-deflate, which eventlet negotiates whenever the client offers it.
+        if path.startswith(self.socketio_path):
+            if not self.websocket_deflate:
+                environ.pop('HTTP_SEC_WEBSOCKET_EXTENSIONS', None)
+            return self.wsgi_app(environ, start_response)
+
+        encoding = _choose_encoding(environ)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+
+        state = {'written': []}
+
+        def capture_start_response(status, headers, exc_info=None):
+            plan = self._plan(environ, path, status, headers, encoding)
+            state['plan'] = plan
+            if plan is None:
+                return start_response(status, headers, exc_info)
+            if plan['buffered'] and 'static_file' not in plan:
+                # Headers go out once the compressed length is known
+                state['start'] = (status, exc_info)
+                return state['written'].append
+            return start_response(status, plan['headers'], exc_info)
+
+        body = self.wsgi_app(environ, capture_start_response)
+        plan = state.get('plan')
+        if plan is None:
+            return body
+        if 'static_file' in plan:
+            return self._serve_precompressed(environ, body, plan['static_file'])
+        if plan['buffered']:
+            compressed = self._compress_buffered(state['written'], body, encoding)
+            status, exc_info = state['start']
+            start_response(status, plan['headers'] + [('Content-Length', str(len(compressed)))], exc_info)
+            return [compressed]
+        return self._compress_streaming(body, encoding)
+
+    def _plan(self, environ, path, status, headers, encoding):
+        """Decides how (or whether) to encode a response, and rewrites its headers."""
+        code = int(status.split(' ', 1)[0])
+        mimetype = (_header(headers, 'Content-Type') or '').split(';')[0].strip().lower()
+        if (code != 200 or environ.get('REQUEST_METHOD') == 'HEAD'
+                or mimetype not in COMPRESSIBLE_TYPES
+                or _header(headers, 'Content-Encoding')
+                or 'no-transform' in (_header(headers, 'Cache-Control') or '')):
+            return None
+
+        length = _header(headers, 'Content-Length')
+        if length is not None and int(length) < COMPRESSION_MIN_SIZE:
+            return None
+
+        plan = {'buffered': length is not None}
+        static_file = self._precompressed_path(path, encoding)
+        if static_file:
+            plan['static_file'] = static_file
+            length = os.path.getsize(static_file)
+
+        new_headers = _without(headers, 'Content-Length', 'ETag')
+        etag = _header(headers, 'ETag')
+        if etag:
+            # The encoded bytes differ, so only a weak validator is still truthful
+            new_headers.append(('ETag', etag if etag.startswith('W/') else f'W/{etag}'))
+        vary = _header(headers, 'Vary')
+        new_headers = _without(new_headers, 'Vary')
+        new_headers.append(('Vary', f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'))
+        new_headers.append(('Content-Encoding', encoding))
+        if static_file:
+            new_headers.append(('Content-Length', str(length)))
+        plan['headers'] = new_headers
+        return plan
+
+    def _precompressed_path(self, path, encoding):
+        """The .br/.gz sibling of a static file, if it was built and is not older than the source."""
+        if not self.static_folder or not path.startswith(self.static_url_path):
+            return None
+        relative = path[len(self.static_url_path):]
+        source = os.path.realpath(os.path.join(self.static_folder, relative))
+        if not source.startswith(os.path.realpath(self.static_folder) + os.sep):
+            return None
+        candidate = source + PRECOMPRESSED_SUFFIXES[encoding]
+        try:
+            if os.path.getmtime(candidate) >= os.path.getmtime(source):
+                return candidate
+        except OSError:
+            pass
+        return None
+
+    def _serve_precompressed(self, environ, body, static_file):
+        _close(body)
+        handle = open(static_file, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        return file_wrapper(handle) if file_wrapper else _read_file(handle)
+
+    def _compress_buffered(self, written, body, encoding):
+        try:
+            data = b''.join(written) + b''.join(body)
+        finally:
+            _close(body)
+        encoder = _Encoder(encoding)
+        compressed = encoder.compress(data) + encoder.finish()
+        _count(len(data), len(compressed))
+        return compressed
+
+    def _compress_streaming(self, body, encoding):
+        encoder = _Encoder(encoding)
+        size_in = size_out = 0
+        try:
+            for chunk in body:
+                if not chunk:
+                    continue
+                size_in += len(chunk)
+                out = encoder.compress(chunk) + encoder.flush()
+                size_out += len(out)
+                yield out
+            out = encoder.finish()
+            size_out += len(out)
+            yield out
+        finally:
+            _close(body)
+            _count(size_in, size_out)
+
+
+def _count(size_in, size_out):
+    stats['responses'] += 1
+    stats['bytes_in'] += size_in
+    stats['bytes_out'] += size_out
+
+
+def _close(body):
+    if hasattr(body, 'close'):
+        body.close()
+
+
+def _read_file(handle, block_size=64 * 1024):
+    with handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            yield block
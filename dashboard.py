@@ -1,9 +1,12 @@
 from flask import Blueprint, render_template, session, redirect, url_for, flash, request, current_app, jsonify
 from functools import wraps
-from auth import  save_to_cloudinary
-from db_manager import get_user_dashboard_data, get_detailed_profile_data, get_db_connection, with_db
+from upload_queue import queue_media_upload, validate_media_upload, get_upload_status
+from fragment_cache import invalidate_after_request
+from db_manager import get_user_dashboard_data, get_detailed_profile_data, get_db_connection, with_db, sync_link_rows, parse_id_list, resolve_member, forget_member_ids
 import os
 from chat import get_sender_details
+from avatars import refresh_avatar
+from query_profiles import select_list
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -17,6 +20,13 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def member_profile_id(member_id, role, cursor=None):
+    """comp_id for companies, user_id for individuals (the id notifications are keyed by)."""
+    ids = resolve_member(member_id, role, cursor)
+    if not ids:
+        return None
+    return ids['comp_id'] if role == 'company' else ids['user_id']
+
 @dashboard_bp.route('/dashboard')
 @login_required
 @with_db
@@ -72,27 +82,19 @@ def profile():
         flash("Could not load profile data.", "danger")
         return redirect(url_for('dashboard.index'))
 
-    # --- CLOUD-READY IMAGE LOGIC ---
-    # Fetch the value from the DB (pic_path for users, company_logo for companies)
-    raw_img = user_data.get('pic_path') if role == 'individual' else user_data.get('company_logo')
-    
-    if raw_img and (raw_img.startswith('http://') or raw_img.startswith('https://')):
-        # Case A: It's a Cloudinary URL
-        profile_url = raw_img
-    else:
-        # Case B: No photo, generate avatar using the name
-        name_for_avatar = user_data.get('first_name') if role == 'individual' else user_data.get('company_name')
-        name_for_avatar = name_for_avatar or 'User'
-        
-        bg_color = "0d6efd" if role == 'individual' else "0D8ABC"
-        profile_url = f"https://ui-avatars.com/api/?name={name_for_avatar}&background={bg_color}&color=fff"
+    # Picture/logo or initials avatar, resolved when the profile was written
+    profile_url = user_data['profile_url']
+    # A picture/logo still with the upload worker: the page polls upload_status
+    job = get_upload_status(member_id)
+    upload_pending = bool(job) and job['status'] in ('pending', 'uploading')
 
     # --- RENDER LOGIC ---
     if role == 'individual':
         return render_template('dashboard/profile_individual.html', 
                                 member=user_data, 
                                 role=role, 
-                                profile_url=profile_url)
+                                profile_url=profile_url,
+                                upload_pending=upload_pending)
     
     elif role == 'company':
         services = user_data.get('services', [])
@@ -103,7 +105,8 @@ def profile():
                             role=role, 
                             profile_url=profile_url,
                             current_services=services,
-                            current_service_ids=service_ids)
+                            current_service_ids=service_ids,
+                            upload_pending=upload_pending)
 
     return redirect(url_for('dashboard.index'))
 
@@ -122,14 +125,13 @@ def update_profile_individual(conn):  # conn is injected by @with_db
     tagline = request.form.get('tagline', '').strip()
     skills_list = request.form.get('skills_list') 
 
-    new_pic_url = None
-    new_public_id = None
+    pic_queued = False
     
     try:
         with conn.cursor() as cursor:
             # 2. Fetch current record (Guaranteed DictCursor via your pool setup)
             cursor.execute("""
-                SELECT pic_path, profile_public_id, user_id, pro_id 
+                SELECT user_id, pro_id 
                 FROM users WHERE member_id = %s
             """, (member_id,))
             user_record = cursor.fetchone()
@@ -139,48 +141,45 @@ def update_profile_individual(conn):  # conn is injected by @with_db
                 return redirect(url_for('dashboard.profile'))
 
             # Extracting values from the dictionary result
-            old_pic_path = user_record.get('pic_path')
-            old_public_id = user_record.get('profile_public_id')
             internal_user_id = user_record.get('user_id')
             existing_pro_id = user_record.get('pro_id')
 
             # 3. Handle File Upload
+            # Queued for the background worker, which sets pic_path/profile_public_id when done
             if 'profile_pic' in request.files:
                 file = request.files['profile_pic']
                 if file and file.filename != '':
-                    # Optional: Check file size (Back-end safety)
-                    file.seek(0, os.SEEK_END)
-                    file_size = file.tell()
-                    file.seek(0)
-                    
-                    if file_size <= 2 * 1024 * 1024:
-                        new_pic_url, new_public_id = save_to_cloudinary(file, 'profiles', member_id)
+                    # Size, extension and magic bytes (back-end safety, body is not read)
+                    upload_error = validate_media_upload(file)
+                    if upload_error:
+                        flash(upload_error, "danger")
+                        return redirect(url_for('dashboard.profile'))
+
+                    pic_queued = queue_media_upload(file, 'profile', member_id, cursor) is not None
 
             # 4. Final Values Logic
-            final_pic = new_pic_url if new_pic_url else old_pic_path
-            final_p_id = new_public_id if new_public_id else old_public_id
             pro_id = int(raw_pro_id) if raw_pro_id and str(raw_pro_id).strip().isdigit() else existing_pro_id
 
             # 5. Update Database
             sql = """UPDATE users SET 
                         first_name=%s, second_name=%s, pro_id=%s, 
-                        education=%s, experience=%s, tagline=%s, 
-                        pic_path=%s, profile_public_id=%s 
+                        education=%s, experience=%s, tagline=%s 
                      WHERE member_id=%s"""
             cursor.execute(sql, (first_name, second_name, pro_id, education, 
-                                experience, tagline, final_pic, final_p_id, member_id))
+                                experience, tagline, member_id))
+            # Initials avatars follow the name (re-read under the row lock the UPDATE holds)
+            refresh_avatar(cursor, 'individual', member_id)
 
-            # 6. Skills Sync (Atomic within the same transaction)
+            # 6. Skills Sync (Atomic within the same transaction; only changed rows are written)
             if internal_user_id:
-                cursor.execute("DELETE FROM user_skills WHERE user_id = %s", (internal_user_id,))
-                if skills_list:
-                    # Clean and deduplicate IDs
-                    s_ids = {sid.strip() for sid in skills_list.split(',') if sid.strip().isdigit()}
-                    for s_id in s_ids:
-                        cursor.execute("INSERT INTO user_skills (user_id, skill_id) VALUES (%s, %s)", 
-                                       (internal_user_id, int(s_id)))
+                sync_link_rows(cursor, 'user_skills', internal_user_id, parse_id_list(skills_list))
 
+            invalidate_after_request('members')
+            if pro_id != existing_pro_id:
+                forget_member_ids(member_id)
             flash("Profile updated successfully!", "success")
+            if pic_queued:
+                flash("Your new picture is processing and will appear shortly.", "info")
 
     except Exception as e:
         print(f"Update Error: {e}")
@@ -204,14 +203,13 @@ def update_profile_company(conn):
     web_url = request.form.get('web_url', '').strip()
     services_list = request.form.get('service_ids') 
 
-    new_logo_name = None
-    new_public_id = None
+    logo_queued = False
     
     try:
         with conn.cursor() as cursor:
             # 2. Fetch current record
             cursor.execute("""
-                SELECT company_logo, logo_public_id, comp_id 
+                SELECT comp_id 
                 FROM companies WHERE member_id = %s
             """, (member_id,))
             comp_record = cursor.fetchone()
@@ -221,46 +219,38 @@ def update_profile_company(conn):
                 return redirect(url_for('dashboard.profile'))
 
             # Standardized dictionary access
-            old_logo_path = comp_record.get('company_logo')
-            old_public_id = comp_record.get('logo_public_id')
             comp_id = comp_record.get('comp_id')
 
             # 3. Handle Logo Upload
+            # Queued for the background worker, which sets company_logo/logo_public_id when done
             if 'company_logo' in request.files:
                 file = request.files['company_logo']
                 if file and file.filename != '':
-                    file.seek(0, os.SEEK_END)
-                    file_size = file.tell()
-                    file.seek(0)
-                    
-                    if file_size > 2 * 1024 * 1024:
-                        flash("File too large. Max 2MB allowed.", "danger")
+                    upload_error = validate_media_upload(file)
+                    if upload_error:
+                        flash(upload_error, "danger")
                         return redirect(url_for('dashboard.profile'))
 
-                    new_logo_name, new_public_id = save_to_cloudinary(file, 'logos', member_id)
+                    logo_queued = queue_media_upload(file, 'logo', member_id, cursor) is not None
 
             # 4. Update Company Table
-            final_logo = new_logo_name if new_logo_name else old_logo_path
-            final_public_id = new_public_id if new_public_id else old_public_id
-            
             sql = """UPDATE companies SET 
                         company_name=%s, owner_name=%s, employee_range=%s, 
-                        about=%s, web_url=%s, company_logo=%s, logo_public_id=%s 
+                        about=%s, web_url=%s 
                      WHERE comp_id=%s"""
             
             cursor.execute(sql, (company_name, owner_name, employee_range, 
-                                about, web_url, final_logo, final_public_id, comp_id))
+                                about, web_url, comp_id))
+            refresh_avatar(cursor, 'company', member_id)
 
             # 5. Sync Services (Atomic: if this fails, the company table update rolls back)
-            cursor.execute("DELETE FROM comp_services WHERE comp_id = %s", (comp_id,))
-            
-            if services_list:
-                s_ids = {sid.strip() for sid in services_list.split(',') if sid.strip().isdigit()}
-                for s_id in s_ids:
-                    cursor.execute("INSERT INTO comp_services (comp_id, pro_id) VALUES (%s, %s)", 
-                                   (comp_id, int(s_id)))
+            sync_link_rows(cursor, 'comp_services', comp_id, parse_id_list(services_list))
 
+            # Job cards show the company name/logo too
+            invalidate_after_request('companies', 'jobs')
             flash("Company profile updated successfully!", "success")
+            if logo_queued:
+                flash("Your new logo is processing and will appear shortly.", "info")
 
     except Exception as e:
         print(f"Company Update Error: {e}")
@@ -270,6 +260,23 @@ def update_profile_company(conn):
 
     return redirect(url_for('dashboard.profile'))
 
+@dashboard_bp.route('/api/upload-status')
+@login_required
+def upload_status():
+    """Polled by the profile page while a picture/logo upload is pending."""
+    member_id = session.get('user_id')
+    job = get_upload_status(member_id)
+    if not job:
+        return jsonify({'status': 'none'})
+
+    return jsonify({
+        'upload_id': job['upload_id'],
+        'target': job['target'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'url': job['result_url']
+    })
+
 @dashboard_bp.route('/api/unread-notifications')
 @login_required
 @with_db
@@ -279,16 +286,8 @@ def unread_notifications(conn): # Injected by decorator
     
     try:
         with conn.cursor() as cursor:
-            # 1. Get the correct numeric ID based on the role
-            if role == 'company':
-                cursor.execute("SELECT comp_id FROM companies WHERE member_id = %s", (m_id,))
-                res = cursor.fetchone()
-                # Use .get() to prevent KeyError if the record is missing
-                actual_id = res.get('comp_id') if res else None
-            else:
-                cursor.execute("SELECT user_id FROM users WHERE member_id = %s", (m_id,))
-                res = cursor.fetchone()
-                actual_id = res.get('user_id') if res else None
+            # 1. Get the correct numeric ID based on the role (cached, see resolve_member)
+            actual_id = member_profile_id(m_id, role, cursor)
 
             # 2. Return zero if no matching profile is found
             if not actual_id:
@@ -320,15 +319,8 @@ def notifications(conn): # conn is now managed by the decorator
     
     try:
         with conn.cursor() as cursor:
-            # 1. FIND THE PROPER INTEGER ID BASED ON ROLE
-            if role == 'company':
-                cursor.execute("SELECT comp_id FROM companies WHERE member_id = %s", (m_id,))
-                res = cursor.fetchone()
-                actual_id = res.get('comp_id') if res else None
-            else:
-                cursor.execute("SELECT user_id FROM users WHERE member_id = %s", (m_id,))
-                res = cursor.fetchone()
-                actual_id = res.get('user_id') if res else None
+            # 1. FIND THE PROPER INTEGER ID BASED ON ROLE (cached, see resolve_member)
+            actual_id = member_profile_id(m_id, role, cursor)
 
             if not actual_id:
                 return redirect(url_for('dashboard.index'))
@@ -343,15 +335,15 @@ def notifications(conn): # conn is now managed by the decorator
 
             # 3. FETCH NOTIFICATIONS
             if role == 'individual':
-                cursor.execute("""
-                    SELECT * FROM notifications 
+                cursor.execute(f"""
+                    SELECT {select_list('notification')} FROM notifications 
                     WHERE user_id = %s AND user_role = 'individual' 
                     ORDER BY created_at DESC
                 """, (actual_id,))
             else:
                 # Filter: Companies should not see job_match notifications
-                cursor.execute("""
-                    SELECT * FROM notifications 
+                cursor.execute(f"""
+                    SELECT {select_list('notification')} FROM notifications 
                     WHERE user_id = %s AND user_role = 'company' AND type != 'job_match' 
                     ORDER BY created_at DESC
                 """, (actual_id,))
@@ -380,15 +372,8 @@ def delete_notifications(conn): # Injected by decorator
     
     try:
         with conn.cursor() as cursor:
-            # 1. FIND THE PROPER INTEGER ID BASED ON ROLE
-            if role == 'company':
-                cursor.execute("SELECT comp_id FROM companies WHERE member_id = %s", (m_id,))
-                result = cursor.fetchone()
-                actual_id = result.get('comp_id') if result else None
-            else:
-                cursor.execute("SELECT user_id FROM users WHERE member_id = %s", (m_id,))
-                result = cursor.fetchone()
-                actual_id = result.get('user_id') if result else None
+            # 1. FIND THE PROPER INTEGER ID BASED ON ROLE (cached, see resolve_member)
+            actual_id = member_profile_id(m_id, role, cursor)
 
             # 2. PERFORM DELETION (Scoped to ID AND Role for security)
             if actual_id:
@@ -1,54 +1,513 @@
 import pymysql
+import json
 from datetime import datetime
 import os
+import time
+import re
+import threading
+from itertools import count
 from functools import wraps
+from flask import has_request_context, session
 from dbutils.pooled_db import PooledDB
+from metrics import record_query, db_pool_wait, register_collector, counter
+import query_monitor
+from fragment_cache import cached_value, last_modified, forget_after_request
+from avatars import AVATAR_SOURCES, avatar_url, row_avatar_url
+from query_profiles import select_list
+import tracing
 
 
 from dotenv import load_dotenv
 load_dotenv()
 # --- 1. Central Connection Helper ---
-# 1. Initialize the Pool ONCE (This lives as long as your Flask app runs)
-db_pool = PooledDB(
-    creator=pymysql,
-    maxconnections=10,    # Max parallel connections
-    mincached=2,         # Keep at least 2 connections "warm" at all times
-    blocking=True,
+class InstrumentedCursor(pymysql.cursors.DictCursor):
+    """DictCursor that reports every statement's duration to the metrics registry."""
+
+    def execute(self, query, args=None):
+        # executemany() also ends up here, once per batch
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, args)
+            failed = False
+            if WRITE_STATEMENT.match(query):
+                note_write()
+            return result
+        finally:
+            duration = time.perf_counter() - started
+            record_query(duration, failed)
+            # Slow-query log and N+1 detection
+            query_monitor.observe(self, query, args, duration)
+            if tracing.current_trace() is not None:
+                tracing.record_span('sql', duration, sql=query_monitor.normalize_sql(query)[:200])
+
+# Connection settings shared by the pool and dedicated connections (e.g. the scheduler lock)
+DB_CONFIG = dict(
     host=os.getenv('DB_HOST'),
     port=int(os.getenv('DB_PORT')),
     user=os.getenv('DB_USER'),
     password=os.getenv('DB_PASSWORD'),
     database=os.getenv('DB_NAME'),
     charset='utf8mb4',
-    cursorclass=pymysql.cursors.DictCursor,
+    cursorclass=InstrumentedCursor,
     ssl={'ssl_mode': 'REQUIRED'},
     init_command="SET time_zone = '+05:00'"
 )
-def with_db(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        conn = db_pool.connection() # Instant grab from pool
+# 1. Initialize the Pool ONCE (This lives as long as your Flask app runs)
+db_pool = PooledDB(
+    creator=pymysql,
+    maxconnections=10,    # Max parallel connections
+    mincached=2,         # Keep at least 2 connections "warm" at all times
+    blocking=True,
+    **DB_CONFIG
+)
+@register_collector
+def pool_metrics():
+    # DBUtils keeps these private; read them defensively
+    idle = len(getattr(db_pool, '_idle_cache', []))
+    in_use = getattr(db_pool, '_connections', 0)
+    return [('db_pool_connections', 'gauge', 'Pooled DB connections',
+             [({'state': 'idle'}, idle), ({'state': 'in_use'}, in_use)])]
+
+def checkout_connection():
+    started = time.perf_counter()
+    conn = db_pool.connection()
+    wait = time.perf_counter() - started
+    db_pool_wait.observe(wait)
+    tracing.record_span('db.pool_checkout', wait)
+    return conn
+
+# --- Read Replicas ---
+# With DB_REPLICA_HOSTS set, helpers declared @with_db(readonly=True) check out
+# from a replica pool instead of the primary. They stay on the primary when:
+#   1. the visitor wrote something in the last DB_REPLICA_STICKY_SECONDS
+#      (read-your-writes: the session remembers the write, see note_write)
+#   2. the helper's fragment-cache namespace was invalidated within
+#      DB_REPLICA_MAX_LAG, so a freshly bumped listing isn't re-cached stale
+#   3. every replica lags more than DB_REPLICA_MAX_LAG, isn't replicating, or
+#      can't be reached (re-checked every REPLICA_CHECK_SECONDS)
+DB_REPLICA_HOSTS = [h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()]  # host[:port],...
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 2))  # seconds
+DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+REPLICA_CHECK_SECONDS = float(os.getenv('REPLICA_CHECK_SECONDS', 5))
+
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+db_reads = counter('db_reads_total', 'Read-only helper checkouts by target and reason', ('target', 'reason'))
+
+
+class Replica:
+    """One read replica: its own pool plus the replication lag seen at the last check."""
+
+    def __init__(self, address):
+        host, _, port = address.partition(':')
+        self.name = address
+        self.pool = PooledDB(
+            creator=pymysql,
+            maxconnections=10,
+            mincached=0,         # Connect lazily: a replica that is down must not block startup
+            blocking=True,
+            **dict(DB_CONFIG, host=host, port=int(port or DB_CONFIG['port']), connect_timeout=2)
+        )
+        self.lag = None          # seconds behind the primary, None = unknown / not replicating
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def healthy(self):
+        return self.lag is not None and self.lag <= DB_REPLICA_MAX_LAG
+
+    def check_due(self):
+        return time.time() - self.checked_at >= REPLICA_CHECK_SECONDS
+
+    def _set_lag(self, lag, reason=None):
+        was_healthy = self.healthy()
+        self.lag, self.checked_at = lag, time.time()
+        if was_healthy and not self.healthy():
+            print(f"Replica {self.name} unavailable, reading from primary: {reason or f'{lag}s behind'}")
+        elif not was_healthy and self.healthy():
+            print(f"Replica {self.name} back in rotation ({lag}s behind)")
+
+    def check(self, conn):
+        """Re-reads the replication lag, at most once per REPLICA_CHECK_SECONDS across threads."""
+        if not self.lock.acquire(blocking=False):
+            return
         try:
-            # Inject 'conn' as the first argument
-            result = f(conn, *args, **kwargs)
-            conn.commit()
-            return result
+            with conn.cursor() as cursor:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except pymysql.err.ProgrammingError:
+                    cursor.execute("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+                status = cursor.fetchone()
+            if not status:
+                self._set_lag(None, "not a replica")
+                return
+            lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+            # NULL while the SQL thread is stopped or broken
+            self._set_lag(lag, None if lag is not None else "replication stopped")
         except Exception as e:
-            conn.rollback()
-            print(f"Database Error in {f.__name__}: {e}")
-            raise e
+            self._set_lag(None, e)
         finally:
-            conn.close() # Sends back to pool
-    return decorated_function
+            self.lock.release()
+
+    def mark_down(self, error):
+        self._set_lag(None, error)
+
+
+replicas = [Replica(address) for address in DB_REPLICA_HOSTS]
+_replica_turn = count()
+
+
+@register_collector
+def replica_metrics():
+    if not replicas:
+        return []
+    return [('db_replica_lag_seconds', 'gauge', 'Replication lag at the last check (-1 = unavailable)',
+             [({'replica': r.name}, r.lag if r.lag is not None else -1) for r in replicas])]
+
+
+def note_write():
+    """Called for every write statement: keeps this visitor's reads on the primary for a while."""
+    if replicas and has_request_context():
+        session['db_primary_until'] = time.time() + DB_REPLICA_STICKY_SECONDS
+
+
+def _primary_reason(cache_namespace):
+    """Why a read-only helper must use the primary right now, or None if a replica may serve it."""
+    if not replicas:
+        return 'no_replicas'
+    if has_request_context() and session.get('db_primary_until', 0) > time.time():
+        return 'read_your_writes'
+    if cache_namespace:
+        modified = last_modified(cache_namespace)
+        if modified and time.time() - modified < DB_REPLICA_MAX_LAG:
+            return 'recent_write'
+    return None
+
+
+def checkout_read_connection(cache_namespace=None):
+    """A replica connection when one is healthy and the rules above allow it, else the primary."""
+    reason = _primary_reason(cache_namespace)
+    if reason is None:
+        reason = 'replica_lag'
+        start = next(_replica_turn)
+        for i in range(len(replicas)):
+            replica = replicas[(start + i) % len(replicas)]
+            if not (replica.healthy() or replica.check_due()):
+                continue
+            started = time.perf_counter()
+            try:
+                conn = replica.pool.connection()
+            except Exception as e:
+                replica.mark_down(e)
+                continue
+            tracing.record_span('db.pool_checkout', time.perf_counter() - started, replica=replica.name)
+            if replica.check_due():
+                replica.check(conn)
+            if replica.healthy():
+                db_reads.inc('replica', 'replica')
+                return conn
+            conn.close()
+    if reason != 'no_replicas':
+        db_reads.inc('primary', reason)
+    return checkout_connection()
+
+
+def with_db(f=None, *, readonly=False, cache_namespace=None):
+    """
+    Injects a pooled connection as the first argument; commits on success, rolls back on error.
+    @with_db(readonly=True) lets the helper run on a read replica. cache_namespace names the
+    fragment-cache namespace its results feed, so reads right after its invalidation stay on
+    the primary.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Instant grab from pool
+            conn = checkout_read_connection(cache_namespace) if readonly else checkout_connection()
+            try:
+                # Inject 'conn' as the first argument
+                with tracing.span(f"db:{f.__name__}"):
+                    result = f(conn, *args, **kwargs)
+                conn.commit()
+                return result
+            except Exception as e:
+                conn.rollback()
+                print(f"Database Error in {f.__name__}: {e}")
+                raise e
+            finally:
+                conn.close() # Sends back to pool
+        return decorated_function
+    return decorator(f) if f is not None else decorator
+
 def get_db_connection():
     """Grabs an INSTANT connection from the warm pool."""
-    return db_pool.connection()
+    return checkout_connection()
+
+def open_dedicated_connection():
+    """A connection outside the pool, for long-lived holders like the scheduler's leader lock."""
+    return pymysql.connect(autocommit=True, **DB_CONFIG)
+
+# --- Reference Data Cache ---
+# profession, skills_list and profession_category are tiny and change only
+# through the admin forms, so each process keeps them as id -> name dicts and
+# queries return ids only. Admin writes bump a version row in the same
+# transaction; every process re-reads that row at most every
+# REFERENCE_CHECK_SECONDS and reloads when it moved.
+REFERENCE_TABLES = {
+    # kind: (table, id column, name column)
+    'professions': ('profession', 'pro_id', 'pro_name'),
+    'skills': ('skills_list', 'skill_id', 'skill_name'),
+    'categories': ('profession_category', 'category_id', 'category_name'),
+}
+REFERENCE_CHECK_SECONDS = float(os.getenv('REFERENCE_CHECK_SECONDS', 30))
+
+_reference = {'version': None, 'checked_at': 0.0, 'stale': True, 'data': {}}
+_reference_lock = threading.Lock()
+
+def _select_reference_version(cursor):
+    cursor.execute("SELECT version FROM reference_data_version WHERE id = 1")
+    row = cursor.fetchone()
+    return row['version'] if row else 0
+
+def _select_reference_data(cursor):
+    data = {}
+    for kind, (table, id_col, name_col) in REFERENCE_TABLES.items():
+        cursor.execute(f"SELECT {id_col} AS id, {name_col} AS name FROM {table} ORDER BY {name_col}")
+        data[kind] = {row['id']: row['name'] for row in cursor.fetchall()}
+    return data
+
+def _reference_due(state):
+    return state['stale'] or time.monotonic() - state['checked_at'] > REFERENCE_CHECK_SECONDS
+
+def _refresh_reference(cursor):
+    """
+    Re-checks the version (and reloads on a change) with a connection the caller
+    already holds: the lock holder never waits on the pool, so threads queued on
+    the lock while holding pool connections can't starve it.
+    """
+    state = _reference
+    with _reference_lock:
+        if not _reference_due(state):
+            return
+        try:
+            version = _select_reference_version(cursor)
+            if state['stale'] or version != state['version']:
+                state['data'] = _select_reference_data(cursor)
+                state['version'] = version
+            state['stale'] = False
+        except Exception as e:
+            # Keep serving the last copy; try again on the next call
+            print(f"Reference Data Error: {e}")
+        state['checked_at'] = time.monotonic()
+
+@with_db
+def _refresh_reference_with_own_connection(conn):
+    with conn.cursor() as cursor:
+        _refresh_reference(cursor)
+
+def reference_data(kind, require=(), cursor=None):
+    """{id: name} for 'professions', 'skills' or 'categories' (ordered by name).
+
+    Ids in `require` that are missing (added moments ago by an admin, possibly
+    in another process) force one reload instead of waiting for the next check.
+    Callers inside a @with_db function must pass their cursor: a refresh then
+    runs on it instead of taking a second pool connection.
+    """
+    state = _reference
+    known = state['data'].get(kind, {})
+    if any(ref_id is not None and ref_id not in known for ref_id in require) and \
+            time.monotonic() - state['checked_at'] > 1:  # an orphaned id must not reload on every call
+        state['stale'] = True
+    if _reference_due(state):
+        if cursor is not None:
+            _refresh_reference(cursor)
+        else:
+            try:
+                _refresh_reference_with_own_connection()
+            except Exception as e:
+                print(f"Reference Data Error: {e}")
+                state['checked_at'] = time.monotonic()
+    return state['data'].get(kind, {})
+
+def reference_name(kind, ref_id, cursor=None):
+    return reference_data(kind, require=(ref_id,), cursor=cursor).get(ref_id) if ref_id is not None else None
+
+def bump_reference_version(cursor):
+    """Call inside the transaction that changed a reference table."""
+    cursor.execute("UPDATE reference_data_version SET version = version + 1 WHERE id = 1")
+    # This process reloads on its next read; the others within REFERENCE_CHECK_SECONDS
+    _reference['stale'] = True
+
+# --- Link-Table Sync ---
+# user_skills, comp_services and job_skills are (owner, id) pairs. Writes diff
+# the wanted ids against what is stored and apply only the difference: one
+# multi-row INSERT (executemany batches the VALUES) and one DELETE ... IN.
+LINK_TABLES = {
+    'user_skills': ('user_id', 'skill_id'),
+    'comp_services': ('comp_id', 'pro_id'),
+    'job_skills': ('job_id', 'skill_id'),
+}
+
+def parse_id_list(raw):
+    """'3, 7,x,3' -> [3, 7]: the comma-separated id strings our forms submit."""
+    if not raw:
+        return []
+    return sorted({int(part) for part in str(raw).split(',') if part.strip().isdigit()})
+
+def sync_link_rows(cursor, table, owner_id, ids, existing=True):
+    """Makes `table` hold exactly `ids` for owner_id. Pass existing=False for a new owner (skips the read)."""
+    # Table/Col names can't be %s, so only whitelisted link tables are accepted
+    owner_col, id_col = LINK_TABLES[table]
+    wanted = {int(i) for i in ids}
+
+    current = set()
+    if existing:
+        cursor.execute(f"SELECT {id_col} FROM {table} WHERE {owner_col} = %s", (owner_id,))
+        current = {row[id_col] for row in cursor.fetchall()}
+
+    added, removed = wanted - current, current - wanted
+    if removed:
+        cursor.execute(f"DELETE FROM {table} WHERE {owner_col} = %s AND {id_col} IN %s",
+                       (owner_id, tuple(sorted(removed))))
+    if added:
+        cursor.executemany(f"INSERT INTO {table} ({owner_col}, {id_col}) VALUES (%s, %s)",
+                           [(owner_id, i) for i in sorted(added)])
+    if added or removed or not existing:
+        refresh_link_summary(cursor, table, owner_id)
+    return added, removed
+
+# --- Denormalized Chips ---
+# Listings show skills/services as chips. Instead of joining the link table and
+# GROUP_CONCAT-ing on every read, each owner row carries a JSON copy of its
+# [[id, name], ...] pairs (ordered by name), rewritten whenever sync_link_rows
+# changes the links. link_summary.py adds the columns, backfills and verifies.
+LINK_SUMMARIES = {
+    # link table: (owner table, summary column, reference data kind)
+    'user_skills': ('users', 'skills_json', 'skills'),
+    'comp_services': ('companies', 'services_json', 'professions'),
+    'job_skills': ('jobs', 'skills_json', 'skills'),
+}
+
+def link_summary_items(cursor, table, owner_ids):
+    """{owner_id: [[id, name], ...]} for the given owners: ids from the link table, names from the reference cache."""
+    owner_col, id_col = LINK_TABLES[table]
+    items = {owner_id: [] for owner_id in owner_ids}
+    if not items:
+        return items
+    cursor.execute(f"SELECT {owner_col} AS owner_id, {id_col} AS id FROM {table} WHERE {owner_col} IN %s",
+                   (tuple(items),))
+    rows = cursor.fetchall()
+    names = reference_data(LINK_SUMMARIES[table][2], require={row['id'] for row in rows}, cursor=cursor)
+    for row in rows:
+        # Links to a name that no longer exists are dropped, as the old inner join did
+        if row['id'] in names:
+            items[row['owner_id']].append([row['id'], names[row['id']]])
+    for pairs in items.values():
+        pairs.sort(key=lambda pair: (pair[1].lower(), pair[0]))
+    return items
+
+def encode_summary(items):
+    return json.dumps(items, ensure_ascii=False, separators=(',', ':'))
+
+def refresh_link_summary(cursor, table, owner_id):
+    owner_table, column, _ = LINK_SUMMARIES[table]
+    owner_col, _ = LINK_TABLES[table]
+    items = link_summary_items(cursor, table, [owner_id])[owner_id]
+    cursor.execute(f"UPDATE {owner_table} SET {column} = %s WHERE {owner_col} = %s",
+                   (encode_summary(items), owner_id))
+
+def summary_items(value):
+    """Decodes a summary column; NULL (not backfilled yet) reads as no chips."""
+    if not value:
+        return []
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
 
 
+# --- Member Id Resolution ---
+# The session only holds member_id; notification and matching routes need the
+# numeric users/companies ids. They live in their own namespace: the ids never
+# change, so only an account deletion bumps it (misses are not cached, so a
+# signup needs nothing) and a profession change drops that member's entry.
+MEMBER_IDS_NAMESPACE = 'member_ids'
+
+def _select_member_ids(cursor, member_id, role):
+    if role == 'company':
+        cursor.execute("SELECT comp_id FROM companies WHERE member_id = %s", (member_id,))
+    else:
+        cursor.execute("SELECT user_id, pro_id FROM users WHERE member_id = %s", (member_id,))
+    return cursor.fetchone()
 
-# --- 2. Existing Search Function (Kept as is) ---
 @with_db
-def search_suggestions(conn, table_name, id_col, name_col, query):
+def _fetch_member_ids(conn, member_id, role):
+    try:
+        with conn.cursor() as cursor:
+            return _select_member_ids(cursor, member_id, role)
+    except Exception as e:
+        print(f"DB Error (resolve_member): {e}")
+        return None
+
+def resolve_member(member_id, role, cursor=None):
+    """
+    {'comp_id'} for companies, {'user_id', 'pro_id'} for individuals, or None if there is no profile.
+    Routes already inside @with_db pass their cursor so a miss doesn't take a second pooled connection.
+    """
+    if not member_id:
+        return None
+    if cursor is not None:
+        fetch = lambda: _select_member_ids(cursor, member_id, role)
+    else:
+        fetch = lambda: _fetch_member_ids(member_id, role)
+    return cached_value(MEMBER_IDS_NAMESPACE, f"ids:{member_id}", fetch)
+
+def forget_member_ids(member_id):
+    """For a write that changed a cached field (users.pro_id); applies after the commit."""
+    forget_after_request(MEMBER_IDS_NAMESPACE, f"ids:{member_id}")
+
+
+# --- Avatar Column ---
+# users/companies.avatar_url (see avatars.py). Rows still NULL (the column was
+# just added, or written by an older worker during a deploy) are filled by
+# `python migrate.py backfill`.
+AVATAR_BACKFILL_BATCH = 500
+AVATAR_TABLE_KEYS = {'users': 'user_id', 'companies': 'comp_id'}
+
+@with_db
+def _backfill_avatar_batch(conn, role, after_id):
+    """
+    Fills the next batch of NULL avatar_url rows after primary key `after_id`.
+    Returns (rows written, last key or None when done). Paging on the key means
+    a row that stays NULL is passed over instead of being selected again.
+    """
+    table, picture_col, name_cols = AVATAR_SOURCES[role]
+    key = AVATAR_TABLE_KEYS[table]
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {key} AS row_key, {picture_col}, {', '.join(name_cols)} FROM {table}
+            WHERE avatar_url IS NULL AND {key} > %s ORDER BY {key} LIMIT %s
+        """, (after_id, AVATAR_BACKFILL_BATCH))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0, None
+        cursor.executemany(f"UPDATE {table} SET avatar_url = %s WHERE {key} = %s AND avatar_url IS NULL",
+                           [(row_avatar_url(row, role), row['row_key']) for row in rows])
+        return cursor.rowcount, rows[-1]['row_key']
+
+def backfill_avatars():
+    total = 0
+    try:
+        for role in AVATAR_SOURCES:
+            after_id = 0
+            while after_id is not None:
+                written, after_id = _backfill_avatar_batch(role, after_id)
+                total += written
+    except Exception as e:
+        print(f"Avatar Backfill Error: {e}")
+    if total:
+        print(f"Backfilled avatar_url: {total} rows")
+    return total
+
+
+# --- 2. Existing Search Function ---
+def search_suggestions(table_name, id_col, name_col, query):
     # 1. SECURITY: Whitelist both Tables AND Columns
     allowed_tables = ['profession', 'skills_list']
     allowed_cols = ['pro_id', 'pro_name', 'skill_id', 'skill_name']
@@ -57,15 +516,16 @@ def search_suggestions(conn, table_name, id_col, name_col, query):
         print(f"Blocked suspicious search attempt on: {table_name}")
         return []
 
-    try:
-        with conn.cursor() as cursor:
-            # Table/Col names can't be %s, but we've whitelisted them above for safety
-            sql = f"SELECT {id_col} AS id, {name_col} AS name FROM {table_name} WHERE {name_col} LIKE %s LIMIT 5"
-            cursor.execute(sql, (f"%{query}%",))
-            return cursor.fetchall()
-    except Exception as e:
-        print(f"Search Error: {e}")
-        return []
+    # 2. Substring match (case-insensitive, like the old LIKE '%q%') against the reference cache
+    kind = 'professions' if table_name == 'profession' else 'skills'
+    needle = (query or '').lower()
+    matches = []
+    for ref_id, name in reference_data(kind).items():
+        if needle in name.lower():
+            matches.append({'id': ref_id, 'name': name})
+            if len(matches) == 5:
+                break
+    return matches
 
 @with_db
 def is_email_registered(conn, email):
@@ -104,8 +564,8 @@ def save_individual_transaction(conn, auth_data, user_data, skill_ids_list):
                 INSERT INTO users (
                     member_id, first_name, second_name, gender, email, phone_no, 
                     city, DOB, education, experience, pro_id, tagline, pic_path, profile_public_id,
-                    linkedin_link, other_link
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    linkedin_link, other_link, avatar_url
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
 
             cursor.execute(sql_user, (
@@ -124,18 +584,15 @@ def save_individual_transaction(conn, auth_data, user_data, skill_ids_list):
                 user_data['pic_path'],
                 user_data['public_id'],
                 user_data['linkedin'],
-                user_data['other_link']
+                user_data['other_link'],
+                avatar_url(user_data['pic_path'], f"{user_data['first_name']} {user_data['second_name']}", 'individual')
             ))
 
             # C. Get the generated user_id (Auto-increment PK from 'users' table)
             user_id = cursor.lastrowid
 
-            # D. Insert Skills (Loop)
-            if skill_ids_list:
-                sql_skills = "INSERT INTO user_skills (user_id, skill_id) VALUES (%s, %s)"
-                for skill_id in skill_ids_list:
-                    # Ensuring skill_id is an integer for the foreign key
-                    cursor.execute(sql_skills, (user_id, int(skill_id)))
+            # D. Insert Skills (one multi-row INSERT)
+            sync_link_rows(cursor, 'user_skills', user_id, skill_ids_list or [], existing=False)
 
         # NOTE: No conn.commit() needed; the decorator does it after this return
         return True
@@ -169,8 +626,8 @@ def save_company_transaction(conn, auth_data, comp_data, service_ids_list):
                 INSERT INTO companies (
                     member_id, company_name, owner_name, established_year, 
                     employee_range, city, address, google_map_url, about, 
-                    company_logo, logo_public_id, email, web_url, linkedin_url, contact_no
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    company_logo, logo_public_id, email, web_url, linkedin_url, contact_no, avatar_url
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
             cursor.execute(sql_comp, (
                 auth_data['member_id'],
@@ -187,18 +644,15 @@ def save_company_transaction(conn, auth_data, comp_data, service_ids_list):
                 auth_data['email'],
                 comp_data['web_url'],
                 comp_data['linkedin'],
-                comp_data['contact_no']
+                comp_data['contact_no'],
+                avatar_url(comp_data['logo_path'], comp_data['company_name'], 'company')
             ))
 
             # C. Get the generated comp_id (Auto-increment PK from companies table)
             comp_id = cursor.lastrowid
 
-            # D. Insert Services (Loop)
-            if service_ids_list:
-                sql_services = "INSERT INTO comp_services (comp_id, pro_id) VALUES (%s, %s)"
-                for pro_id in service_ids_list:
-                    # Ensuring pro_id is cast to int for database compatibility
-                    cursor.execute(sql_services, (comp_id, int(pro_id)))
+            # D. Insert Services (one multi-row INSERT)
+            sync_link_rows(cursor, 'comp_services', comp_id, service_ids_list or [], existing=False)
 
         # Return True if we reach here; decorator handles the commit
         return True
@@ -261,52 +715,39 @@ def update_password_and_clear_token(conn, email, hashed_password):
     except Exception as e:
         print(f"Error updating password: {e}")
 
-@with_db
+@with_db(readonly=True, cache_namespace='members')
 def get_all_members(conn, limit=20, offset=0):
     """Fetches all members with their skills and formatted display data."""
     try:
         # Note: DictCursor is already set in your db_pool, so we just use with conn.cursor()
         with conn.cursor() as cursor:
-            query = """
-                SELECT 
-                    u.*, 
-                    p.pro_name AS profession_name,
-                    GROUP_CONCAT(s.skill_name) AS skills_combined
+            # Only the columns the member card shows (see query_profiles.py)
+            query = f"""
+                SELECT {select_list('member_card')}
                 FROM users u
-                LEFT JOIN profession p ON u.pro_id = p.pro_id
-                LEFT JOIN user_skills us ON u.user_id = us.user_id
-                LEFT JOIN skills_list s ON us.skill_id = s.skill_id
-                GROUP BY u.user_id
                 ORDER BY u.first_name ASC, u.second_name ASC
                 LIMIT %s OFFSET %s
             """
             cursor.execute(query, (limit, offset))
             members = cursor.fetchall()
+            professions = reference_data('professions', require={m['pro_id'] for m in members}, cursor=cursor)
 
             for member in members:
-                # 1. Process Skills
-                combined = member.get('skills_combined')
-                member['skills'] = combined.split(',') if combined else []
+                # 1. Process Skills (denormalized on the row) and profession (reference cache)
+                member['skills'] = [name for _, name in summary_items(member.get('skills_json'))]
+                member['profession_name'] = professions.get(member.get('pro_id'))
                 
                 # 2. Format Display Name
                 f_name = member.get('first_name') or ''
                 s_name = member.get('second_name') or ''
                 member['display_name'] = f"{f_name} {s_name}".strip()
-                
-                # 3. Handle Profile Image
-                db_photo = member.get('pic_path') 
-                if db_photo and (db_photo.startswith('http://') or db_photo.startswith('https://')):
-                    member['profile_image'] = db_photo
-                else:
-                    # Fallback to UI-Avatar
-                    member['profile_image'] = f"https://ui-avatars.com/api/?name={member['display_name']}&background=random"
             
             return members
     except Exception as e:
         print(f"Database Error in get_all_members: {e}")
         return []
 
-@with_db
+@with_db(readonly=True, cache_namespace='members')
 def get_members_count(conn):
     """Returns the total number of registered users."""
     try:
@@ -317,19 +758,14 @@ def get_members_count(conn):
     except Exception as e:
         print(f"Error in get_members_count: {e}")
         return 0
-@with_db
+@with_db(readonly=True, cache_namespace='companies')
 def get_all_companies(conn, limit=20, offset=0):
-    """Fetches all companies with services and handles logo fallback logic."""
+    """Fetches all companies with their services."""
     try:
         with conn.cursor() as cursor:
-            query = """
-                SELECT 
-                    c.*, 
-                    GROUP_CONCAT(p.pro_name SEPARATOR ', ') as services_combined
+            query = f"""
+                SELECT {select_list('company_card')}
                 FROM companies c
-                LEFT JOIN comp_services cs ON c.comp_id = cs.comp_id
-                LEFT JOIN profession p ON cs.pro_id = p.pro_id
-                GROUP BY c.comp_id
                 ORDER BY c.company_name ASC
                 LIMIT %s OFFSET %s
             """
@@ -337,25 +773,15 @@ def get_all_companies(conn, limit=20, offset=0):
             companies = cursor.fetchall()
 
             for comp in companies:
-                # 1. Process services string into list
-                combined = comp.get('services_combined')
-                comp['services'] = combined.split(', ') if combined else []
-                
-                # 2. Logo path logic
-                db_logo = comp.get('company_logo')
-
-                # Check for Cloudinary/Full URL
-                if not (db_logo and (db_logo.startswith('http://') or db_logo.startswith('https://'))):
-                    # Fallback to UI-Avatar if logo is missing or local
-                    name_for_url = comp['company_name'].replace(' ', '+')
-                    comp['company_logo'] = f"https://ui-avatars.com/api/?name={name_for_url}&background=0D8ABC&color=fff"
+                # 1. Process services (denormalized on the row)
+                comp['services'] = [name for _, name in summary_items(comp.get('services_json'))]
             
             return companies
     except Exception as e:
         print(f"Database Error in get_all_companies: {e}")
         return []
 
-@with_db
+@with_db(readonly=True, cache_namespace='companies')
 def get_companies_count(conn):
     """Returns total count of companies."""
     try:
@@ -368,48 +794,38 @@ def get_companies_count(conn):
         return 0
         
 
-@with_db
+@with_db(readonly=True, cache_namespace='jobs')
 def get_public_jobs(conn, limit=20, offset=0):
     """Fetches all active jobs with company info and skills."""
     try:
         with conn.cursor() as cursor:
-            query = """
-                SELECT j.*, j.job_type, c.company_name, c.company_logo, c.city,
-                       GROUP_CONCAT(s.skill_name SEPARATOR ', ') as skills
+            query = f"""
+                SELECT {select_list('job_card')}
                 FROM jobs j
                 JOIN companies c ON j.comp_id = c.comp_id
-                LEFT JOIN job_skills js ON j.job_id = js.job_id
-                LEFT JOIN skills_list s ON js.skill_id = s.skill_id
-                WHERE j.expires_at > NOW()
-                GROUP BY j.job_id 
+                WHERE j.is_active = 1
                 ORDER BY j.created_at DESC
                 LIMIT %s OFFSET %s
             """
             cursor.execute(query, (limit, offset))
             jobs = cursor.fetchall()
 
-            # Apply Logo Logic
             for job in jobs:
-                db_logo = job.get('company_logo')
-                
-                # Check for Cloudinary/HTTP link
-                if not (db_logo and (db_logo.startswith('http://') or db_logo.startswith('https://'))):
-                    # Fallback to UI-Avatar using the company name
-                    name_for_url = job.get('company_name', 'Company').replace(' ', '+')
-                    job['company_logo'] = f"https://ui-avatars.com/api/?name={name_for_url}&background=0D8ABC&color=fff"
+                # Cards split this on ', '
+                job['skills'] = ', '.join(name for _, name in summary_items(job.get('skills_json')))
 
             return jobs
     except Exception as e:
         print(f"DB Error (get_public_jobs): {e}")
         return []
 
-@with_db
+@with_db(readonly=True, cache_namespace='jobs')
 def get_jobs_count(conn):
     """Returns the total number of active jobs."""
     try:
         with conn.cursor() as cursor:
             # Note: We use COUNT(*) as total to keep dict access consistent
-            cursor.execute("SELECT COUNT(*) as total FROM jobs WHERE expires_at > NOW()")
+            cursor.execute("SELECT COUNT(*) as total FROM jobs WHERE is_active = 1")
             result = cursor.fetchone()
             return result['total'] if result else 0
     except Exception as e:
@@ -418,19 +834,18 @@ def get_jobs_count(conn):
     
 @with_db
 def get_user_dashboard_data(conn, member_id, role):
-    """Fetches role-specific profile data for the dashboard with universal image handling."""
+    """Fetches role-specific profile data for the dashboard."""
     try:
         with conn.cursor() as cursor:
             if role == 'company':
-                # Fetching 'company_logo' as 'pic_path' to keep logic uniform
                 sql = """
-                    SELECT company_name AS name, company_logo AS pic_path, 
+                    SELECT company_name AS name, avatar_url AS profile_url, 
                            email, about, city 
                     FROM companies WHERE member_id = %s
                 """
             else:
                 sql = """
-                    SELECT first_name, second_name, pic_path, 
+                    SELECT first_name, second_name, avatar_url AS profile_url, 
                            email, tagline AS about, city 
                     FROM users WHERE member_id = %s
                 """
@@ -445,23 +860,6 @@ def get_user_dashboard_data(conn, member_id, role):
                     second = user.get('second_name') or ''
                     user['name'] = f"{first} {second}".strip()
                 
-                # 2. Universal Image Handling
-                pic = user.get('pic_path')
-                
-                # Check if it's already a full Cloudinary/Web URL
-                if pic and (pic.startswith('http://') or pic.startswith('https://')):
-                    user['profile_url'] = pic
-                else:
-                    # Fallback Logic: Clean name for URL safety
-                    clean_name = user['name'].replace(' ', '+')
-                    
-                    if role == 'company':
-                        # Company fallback (Corporate Blue)
-                        user['profile_url'] = f"https://ui-avatars.com/api/?name={clean_name}&background=0D8ABC&color=fff"
-                    else:
-                        # Individual fallback (Standard Bootstrap Blue)
-                        user['profile_url'] = f"https://ui-avatars.com/api/?name={clean_name}&background=0d6efd&color=fff"
-                
                 return user
             
             return None
@@ -477,73 +875,39 @@ def get_detailed_profile_data(conn, member_id, role):
         with conn.cursor() as cursor:
             if role == 'individual':
                 query = """
-                    SELECT 
-                        u.*, 
-                        p.pro_name AS profession_name,
-                        GROUP_CONCAT(s.skill_name) AS skills_combined,
-                        GROUP_CONCAT(s.skill_id) AS skills_ids_combined
+                    SELECT u.*
                     FROM users u
-                    LEFT JOIN profession p ON u.pro_id = p.pro_id
-                    LEFT JOIN user_skills us ON u.user_id = us.user_id
-                    LEFT JOIN skills_list s ON us.skill_id = s.skill_id
                     WHERE u.member_id = %s
-                    GROUP BY u.user_id
                 """
             else:
                 query = """
-                    SELECT 
-                        c.*,
-                        GROUP_CONCAT(p.pro_name) AS services_names_combined,
-                        GROUP_CONCAT(p.pro_id) AS services_ids_combined
+                    SELECT c.*
                     FROM companies c
-                    LEFT JOIN comp_services cs ON c.comp_id = cs.comp_id
-                    LEFT JOIN profession p ON cs.pro_id = p.pro_id
                     WHERE c.member_id = %s
-                    GROUP BY c.comp_id
                 """
             
             cursor.execute(query, (member_id,))
             member = cursor.fetchone()
 
             if member:
-                # 1. Image Logic (Cloudinary-Aware)
-                pic_col = 'pic_path' if role == 'individual' else 'company_logo'
-                val = member.get(pic_col)
-
-                if val and (val.startswith('http://') or val.startswith('https://')):
-                    member['profile_url'] = val
-                else:
-                    # Fallback to UI-Avatars
-                    if role == 'individual':
-                        name = f"{member.get('first_name', '')} {member.get('second_name', '')}".strip()
-                        bg_color = "0d6efd"
-                    else:
-                        name = member.get('company_name', 'Company')
-                        bg_color = "0D8ABC"
-                    
-                    name_param = name.replace(' ', '+') if name else 'User'
-                    member['profile_url'] = f"https://ui-avatars.com/api/?name={name_param}&background={bg_color}&color=fff"
+                # 1. Image (resolved at write time, see avatars.py)
+                member['profile_url'] = member['avatar_url']
 
                 # 2. Data Formatting for Chips/Lists
                 if role == 'individual':
-                    # Split comma-separated skills into a simple list
-                    member['skills'] = member['skills_combined'].split(',') if member.get('skills_combined') else []
+                    member['profession_name'] = reference_name('professions', member.get('pro_id'), cursor)
+                    items = summary_items(member.get('skills_json'))
+                    member['skills'] = [name for _, name in items]
+                    # Comma-separated strings for the chip editor's hidden input / data attributes
+                    member['skills_combined'] = ','.join(member['skills'])
+                    member['skills_ids_combined'] = ','.join(str(skill_id) for skill_id, _ in items)
                 else:
                     # Transform services into a list of dictionaries for the frontend loop
-                    services_list = []
-                    names = member.get('services_names_combined').split(',') if member.get('services_names_combined') else []
-                    ids = member.get('services_ids_combined').split(',') if member.get('services_ids_combined') else []
-                    
-                    # Ensure we don't crash if counts don't match for some reason
-                    for i in range(len(names)):
-                        services_list.append({
-                            'pro_id': ids[i], 
-                            'pro_name': names[i]
-                        })
-                    
-                    member['services'] = services_list
+                    items = summary_items(member.get('services_json'))
+                    member['services'] = [{'pro_id': str(pro_id), 'pro_name': name} for pro_id, name in items]
+                    member['services_names_combined'] = ','.join(name for _, name in items)
                     # Stored as a string for the hidden input field in the edit form
-                    member['services_ids_list'] = member.get('services_ids_combined', '')
+                    member['services_ids_list'] = ','.join(str(pro_id) for pro_id, _ in items)
 
                 return member
             return None
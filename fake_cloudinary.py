@@ -0,0 +1,212 @@
+import re
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Fake Cloudinary Server ---
+# A local stand-in for the Cloudinary calls the app makes, for development
+# and load tests without a Cloudinary account or network:
+#   chunked uploads (upload_large: Content-Range + X-Unique-Upload-Id parts),
+#   uploader.destroy, api.delete_resources, and GET of the stored files.
+# Everything lives in memory and is gone when the process exits.
+#
+#   python fake_cloudinary.py --port 8089
+#   CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:8089 python app.py
+
+_UPLOAD = re.compile(r'^/v1_1/(?P<cloud>[^/]+)/(?P<type>image|video|raw|auto)/upload$')
+_DESTROY = re.compile(r'^/v1_1/(?P<cloud>[^/]+)/(?P<type>image|video|raw)/destroy$')
+_DELETE_RESOURCES = re.compile(r'^/v1_1/(?P<cloud>[^/]+)/resources/(?P<type>image|video|raw)/upload$')
+_FILE = re.compile(r'^/(?P<cloud>[^/]+)/(?P<type>image|video|raw)/upload/v\d+/(?P<public_id>.+)$')
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif'}
+
+
+class Store:
+    """Uploaded files and unfinished chunked uploads, shared by the handler threads."""
+
+    def __init__(self):
+        self.files = {}     # (resource_type, public_id) -> (bytes, format)
+        self.partial = {}   # upload id -> bytearray
+        self.lock = threading.Lock()
+
+    def add_part(self, upload_id, start, total, chunk):
+        """Appends a chunk; returns the whole file once its last byte arrived, else None."""
+        with self.lock:
+            buffer = self.partial.setdefault(upload_id, bytearray())
+            buffer[start:start + len(chunk)] = chunk
+            if len(buffer) < total:
+                return None
+            return bytes(self.partial.pop(upload_id))
+
+    def put(self, resource_type, public_id, data, file_format):
+        with self.lock:
+            self.files[(resource_type, public_id)] = (data, file_format)
+
+    def get(self, resource_type, public_id):
+        with self.lock:
+            return self.files.get((resource_type, public_id))
+
+    def delete(self, resource_type, public_id):
+        with self.lock:
+            return self.files.pop((resource_type, public_id), None) is not None
+
+
+store = Store()
+
+
+def parse_form(content_type, body):
+    """{field: str or (filename, bytes)} from a multipart or urlencoded body."""
+    if content_type.startswith('multipart/'):
+        message = BytesParser(policy=email_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        form = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            data = part.get_payload(decode=True) or b''
+            filename = part.get_filename()
+            form[name] = (filename, data) if filename is not None else data.decode('utf-8')
+        return form
+    return {key: values[-1] for key, values in parse_qs(body.decode('utf-8')).items()}
+
+
+def _resource_type(requested, filename):
+    if requested != 'auto':
+        return requested
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return 'image' if extension in IMAGE_EXTENSIONS else 'raw'
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeCloudinary/1.0'
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        form = parse_form(self.headers.get('Content-Type', ''), self._body())
+
+        match = _UPLOAD.match(path)
+        if match:
+            return self._upload(match, form)
+        match = _DESTROY.match(path)
+        if match:
+            found = store.delete(match['type'], form.get('public_id', ''))
+            return self._json(200, {'result': 'ok' if found else 'not found'})
+        return self._json(404, {'error': {'message': f"Unsupported endpoint {path}"}})
+
+    def do_DELETE(self):
+        url = urlparse(self.path)
+        match = _DELETE_RESOURCES.match(url.path)
+        if not match:
+            return self._json(404, {'error': {'message': f"Unsupported endpoint {url.path}"}})
+        # The SDK sends a JSON body; older versions sent public_ids[] in the query string
+        body = self._body()
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            public_ids = json.loads(body or b'{}').get('public_ids', [])
+        else:
+            public_ids = parse_qs(url.query).get('public_ids[]', [])
+        deleted = {public_id: 'deleted' if store.delete(match['type'], public_id) else 'not_found'
+                   for public_id in public_ids}
+        return self._json(200, {'deleted': deleted, 'partial': False})
+
+    def do_GET(self):
+        match = _FILE.match(urlparse(self.path).path)
+        if match:
+            # Image URLs carry the format as an extension, raw ones are the bare public_id
+            public_id = match['public_id'] if match['type'] == 'raw' else match['public_id'].rsplit('.', 1)[0]
+        stored = match and store.get(match['type'], public_id)
+        if not stored:
+            self.send_error(404)
+            return
+        data, file_format = stored
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/' + file_format if match['type'] == 'image'
+                         else 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _upload(self, match, form):
+        filename, data = form.get('file') or ('upload', b'')
+        filename = form.get('filename') or filename or 'upload'
+
+        # upload_large sends every chunk as its own request; answer the last one with the result
+        content_range = _CONTENT_RANGE.match(self.headers.get('Content-Range', ''))
+        if content_range:
+            start, total = int(content_range.group(1)), int(content_range.group(3))
+            data = store.add_part(self.headers.get('X-Unique-Upload-Id', filename), start, total, data)
+            if data is None:
+                return self._json(200, {'done': False})
+
+        resource_type = _resource_type(match['type'], filename)
+        file_format = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        public_id = form.get('public_id') or uuid.uuid4().hex[:20]
+        if form.get('folder'):
+            public_id = f"{form['folder']}/{public_id}"
+        if resource_type != 'raw' and public_id.endswith(f".{file_format}"):
+            public_id = public_id[:-len(file_format) - 1]
+        store.put(resource_type, public_id, data, file_format)
+
+        version = int(time.time())
+        host = self.headers.get('Host', f"127.0.0.1:{self.server.server_port}")
+        suffix = f".{file_format}" if file_format and resource_type != 'raw' else ''
+        url = f"http://{host}/{match['cloud']}/{resource_type}/upload/v{version}/{public_id}{suffix}"
+        return self._json(200, {
+            'public_id': public_id,
+            'version': version,
+            'resource_type': resource_type,
+            'type': 'upload',
+            'format': file_format,
+            'bytes': len(data),
+            'original_filename': filename.rsplit('.', 1)[0],
+            'url': url,
+            'secure_url': url,
+        })
+
+
+def serve(port=8089, verbose=False):
+    """Starts the server; returns it (serve_forever() on a thread or the caller's loop)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake Cloudinary server")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    server = serve(args.port, args.verbose)
+    print(f"Fake Cloudinary on http://127.0.0.1:{args.port} "
+          f"(set CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:{args.port})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import os
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response, g, after_this_request
+from markupsafe import Markup
+from metrics import register_collector
+
+# Redis is optional: only needed for a cache shared by several workers
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# --- Rendered Fragment Cache ---
+# Caches rendered listing cards (keyed by namespace + offset) and whole public
+# pages for anonymous visitors. Every key embeds the namespace's generation
+# number, so invalidate('members') makes all old entries unreachable at once.
+
+FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', 60))  # seconds
+FRAGMENT_CACHE_MAX_BYTES = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+FRAGMENT_CACHE_URL = os.getenv('FRAGMENT_CACHE_URL')  # e.g. redis://localhost:6379/0
+
+
+class MemoryLRUBackend:
+    """Per-process LRU bounded by total stored bytes, with per-entry TTL."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.generations = {}
+        self.modified = {}  # namespace -> time of the last bump
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        cost = len(value.encode('utf-8'))
+        if cost > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (time.time() + ttl, value)
+            self.size += cost
+            # Evict least recently used entries until we fit again
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+
+    def _drop(self, key):
+        _, value = self.entries.pop(key)
+        self.size -= len(value.encode('utf-8'))
+
+    def generation(self, namespace):
+        return self.generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self.lock:
+            self.generations[namespace] = self.generations.get(namespace, 0) + 1
+            self.modified[namespace] = time.time()
+
+    def last_modified(self, namespace):
+        return self.modified.get(namespace)
+
+
+class RedisBackend:
+    """Shared store for multi-worker deployments (generations live in Redis too)."""
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def generation(self, namespace):
+        return int(self.client.get(f"fragment:gen:{namespace}") or 0)
+
+    def bump(self, namespace):
+        pipe = self.client.pipeline()
+        pipe.incr(f"fragment:gen:{namespace}")
+        pipe.set(f"fragment:mtime:{namespace}", time.time())
+        pipe.execute()
+
+    def last_modified(self, namespace):
+        value = self.client.get(f"fragment:mtime:{namespace}")
+        return float(value) if value is not None else None
+
+
+def _make_backend():
+    if FRAGMENT_CACHE_URL and redis is not None:
+        return RedisBackend(FRAGMENT_CACHE_URL)
+    if FRAGMENT_CACHE_URL:
+        print("Fragment Cache: redis package not installed, using in-memory LRU")
+    return MemoryLRUBackend(FRAGMENT_CACHE_MAX_BYTES)
+
+
+backend = _make_backend()
+stats = {'hits': 0, 'misses': 0}
+STARTED_AT = time.time()
+
+
+@register_collector
+def cache_metrics():
+    lookups = stats['hits'] + stats['misses']
+    return [
+        ('fragment_cache_lookups_total', 'counter', 'Fragment cache lookups',
+         [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])]),
+        ('fragment_cache_hit_ratio', 'gauge', 'Fragment cache hits / lookups',
+         [({}, stats['hits'] / lookups if lookups else 0)]),
+    ]
+
+
+def _key(namespace, key):
+    """Full cache key, or None if the shared store can't be reached."""
+    try:
+        return f"fragment:{namespace}:{backend.generation(namespace)}:{key}"
+    except Exception as e:
+        print(f"Fragment Cache Error: {e}")
+        return None
+
+
+def _lookup(full_key):
+    """Cache read that never takes the page down if the shared store is unavailable."""
+    try:
+        value = backend.get(full_key)
+    except Exception as e:
+        print(f"Fragment Cache Error: {e}")
+        value = None
+    stats['hits' if value is not None else 'misses'] += 1
+    return value
+
+
+def _store(full_key, value, ttl):
+    try:
+        backend.set(full_key, value, ttl or FRAGMENT_CACHE_TTL)
+    except Exception as e:
+        print(f"Fragment Cache Error: {e}")
+
+
+def cached_fragment(namespace, key, build, ttl=None):
+    """
+    Returns cached HTML for (namespace, key), or calls build() and caches it.
+    build() returns (html, cacheable); results like empty lists from a DB
+    error should come back with cacheable=False.
+    """
+    full_key = _key(namespace, key)
+    html = _lookup(full_key) if full_key else None
+    if html is None:
+        html, cacheable = build()
+        html = str(html)
+        if cacheable and full_key:
+            _store(full_key, html, ttl)
+        elif not cacheable:
+            # Keeps cache_page from storing a page built around a failed query
+            g.fragment_uncacheable = True
+    return Markup(html)
+
+
+def cached_count(namespace, fetch, ttl=None):
+    """Cached COUNT(*) for a listing. Zero is never cached (it is also the error fallback)."""
+    value = cached_fragment(namespace, 'count', lambda: (str(total := fetch()), total > 0), ttl)
+    return int(value)
+
+
+def cached_value(namespace, key, fetch, ttl=None):
+    """
+    JSON-serialisable value cached under a namespace's generation, like the fragments.
+    None (not found / query error) is never cached.
+    """
+    full_key = _key(namespace, key)
+    value = _lookup(full_key) if full_key else None
+    if value is not None:
+        return json.loads(value)
+    result = fetch()
+    if result is not None and full_key:
+        _store(full_key, json.dumps(result), ttl)
+    return result
+
+
+def namespace_version(namespace):
+    """
+    (generation, last_modified) of a namespace, or None if the store can't be reached.
+    The in-memory generations only see this process's writes, so their version
+    also rolls over every FRAGMENT_CACHE_TTL (the same staleness bound as the cache).
+    """
+    try:
+        generation = str(backend.generation(namespace))
+        modified = backend.last_modified(namespace) or STARTED_AT
+    except Exception as e:
+        print(f"Fragment Cache Error: {e}")
+        return None
+
+    if isinstance(backend, MemoryLRUBackend):
+        bucket = int(time.time() // FRAGMENT_CACHE_TTL)
+        generation = f"{generation}.{bucket}"
+        modified = max(modified, bucket * FRAGMENT_CACHE_TTL)
+    return generation, modified
+
+
+def last_modified(namespace):
+    """Time of the namespace's last invalidation (as seen by this store), or None."""
+    try:
+        return backend.last_modified(namespace)
+    except Exception as e:
+        print(f"Fragment Cache Error: {e}")
+        return None
+
+
+def invalidate(*namespaces):
+    """Called from write paths: makes every cached fragment of these listings stale."""
+    for namespace in namespaces:
+        try:
+            backend.bump(namespace)
+        except Exception as e:
+            print(f"Fragment Cache Invalidate Error: {e}")
+
+
+def invalidate_after_request(*namespaces):
+    """For routes inside a @with_db transaction: invalidates once the view returned and the commit happened."""
+    @after_this_request
+    def _invalidate(response):
+        invalidate(*namespaces)
+        return response
+
+
+def forget_after_request(namespace, key):
+    """Drops one cached_value entry once the view's transaction committed (the rest of the namespace stays)."""
+    @after_this_request
+    def _forget(response):
+        full_key = _key(namespace, key)
+        try:
+            if full_key:
+                backend.delete(full_key)
+        except Exception as e:
+            print(f"Fragment Cache Invalidate Error: {e}")
+        return response
+
+
+def _is_anonymous_request():
+    # Logged-in visitors see a different navbar; pending flashes must be rendered once
+    return request.method == 'GET' and not session.get('logged_in') and '_flashes' not in session
+
+
+def cache_page(namespace, ttl=None):
+    """Caches a whole public page for anonymous visitors (keyed by path + query string)."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not _is_anonymous_request():
+                return f(*args, **kwargs)
+
+            full_key = _key(namespace, f"page:{request.full_path}")
+            if not full_key:
+                return f(*args, **kwargs)
+
+            html = _lookup(full_key)
+            if html is not None:
+                return make_response(html)
+
+            response = make_response(f(*args, **kwargs))
+            if (response.status_code == 200 and response.mimetype == 'text/html'
+                    and not g.get('fragment_uncacheable')):
+                _store(full_key, response.get_data(as_text=True), ttl)
+            return response
+        return decorated_function
+    return decorator
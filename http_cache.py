@@ -0,0 +1,68 @@
+import os
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, session, make_response
+from fragment_cache import namespace_version, STARTED_AT
+
+# --- Conditional Responses (ETag / Last-Modified) ---
+# Pages are versioned by the fragment cache generations of the data they show,
+# so a revalidation is answered with 304 without touching the database.
+# RELEASE_ID changes the ETags on deploy (templates/static may have changed).
+# Last-Modified carries no viewer, so only anonymous pages (the same for
+# everyone) get it; logged-in pages are validated by their viewer-aware ETag.
+RELEASE_ID = os.getenv('RELEASE_ID') or str(int(STARTED_AT))
+
+
+def _viewer():
+    # The navbar differs for logged-in users, so they get their own validators
+    return f"user:{session.get('user_id')}" if session.get('logged_in') else 'anon'
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def conditional_page(namespaces):
+    """
+    Adds ETag/Last-Modified to a GET page and answers matching revalidations with 304.
+    `namespaces` is a tuple of fragment cache namespaces, or a function taking the
+    view's URL arguments and returning one.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Pending flashes are shown once, so that page must always be rendered
+            if request.method != 'GET' or '_flashes' in session:
+                return f(*args, **kwargs)
+
+            names = namespaces(**kwargs) if callable(namespaces) else namespaces
+            versions = [namespace_version(name) for name in names]
+            if None in versions:
+                return f(*args, **kwargs)
+
+            stamp = '|'.join([RELEASE_ID, request.full_path, _viewer()] + [v[0] for v in versions])
+            etag = hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+            last_modified = None if session.get('logged_in') else max(v[1] for v in versions)
+
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+            # Browsers must revalidate every time; shared caches must not mix sessions
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,98 @@
+import os
+
+# Pillow is optional: without it uploads fall back to the original file
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# --- Image Settings ---
+# One square copy (px) replaces pic_path/company_logo and covers every card,
+# profile and dashboard view. Chat bubbles and the header use the generated
+# avatars (avatars.py), so no smaller copy is rendered.
+IMAGE_SIZE = 256
+
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'WEBP').upper()  # WEBP or JPEG
+IMAGE_QUALITY = {'WEBP': 80, 'JPEG': 82}
+IMAGE_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Refuse absurd dimensions before decoding (decompression bombs)
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+def can_process_images():
+    return Image is not None
+
+
+def _prepare(img):
+    """Applies EXIF orientation and normalises the colour mode for the output format."""
+    img = ImageOps.exif_transpose(img)
+
+    if IMAGE_FORMAT == 'JPEG':
+        # JPEG has no alpha channel: flatten transparent logos onto white
+        if img.mode in ('RGBA', 'LA', 'P'):
+            rgba = img.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            return background
+        return img.convert('RGB')
+
+    return img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+
+def _render_image(source_path):
+    """Decodes the source, then writes the re-encoded square copy next to it."""
+    extension = IMAGE_EXTENSIONS[IMAGE_FORMAT]
+
+    try:
+        with Image.open(source_path) as img:
+            width, height = img.size
+            if width * height > MAX_IMAGE_PIXELS:
+                raise ValueError(f"Image too large to process ({width}x{height})")
+
+            # Draft mode lets JPEG decode at a reduced scale straight away
+            img.draft('RGB', (IMAGE_SIZE * 2, IMAGE_SIZE * 2))
+            base = _prepare(img)
+    except (OSError, Image.DecompressionBombError) as e:
+        # Unidentified, truncated or corrupt image data
+        raise ValueError(f"Image can't be decoded: {e}") from e
+
+    square = ImageOps.fit(base, (IMAGE_SIZE, IMAGE_SIZE), Image.LANCZOS)
+    out_path = f"{source_path}_{IMAGE_SIZE}.{extension}"
+
+    # No exif/icc arguments are passed, so all metadata is dropped
+    if IMAGE_FORMAT == 'JPEG':
+        square.save(out_path, 'JPEG', quality=IMAGE_QUALITY['JPEG'], optimize=True, progressive=True)
+    else:
+        square.save(out_path, 'WEBP', quality=IMAGE_QUALITY['WEBP'], method=4)
+    return out_path
+
+
+def render_image(source_path):
+    """
+    Resizes and re-encodes an image to an IMAGE_SIZE square.
+    Runs on eventlet's native thread pool (Pillow releases the GIL), so the
+    hub keeps serving requests; without monkey patching (asgi mode) the
+    upload worker is a real thread and calls it directly. Returns the
+    local path of the copy, or None if images can't be processed here and the
+    file should be uploaded as-is. Raises ValueError for a file that isn't a
+    decodable image: retrying it can't succeed.
+    """
+    if not can_process_images():
+        return None
+
+    try:
+        # Imported here: asgi mode runs without eventlet installed
+        try:
+            from eventlet import tpool, patcher
+        except ImportError:
+            return _render_image(source_path)
+        if not patcher.is_monkey_patched('thread'):
+            return _render_image(source_path)
+        return tpool.execute(_render_image, source_path)
+    except ValueError:
+        raise
+    except Exception as e:
+        print(f"Image Processing Error: {e}")
+        return None
+
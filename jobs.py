@@ -1,9 +1,12 @@
 from flask import Blueprint, render_template, request, session, redirect, url_for, flash
 from datetime import datetime, timedelta
-from pymysql.cursors import DictCursor
 # Learning from your provided code: use get_sender_details for header info
 from chat import get_db_connection, get_sender_details
 from dashboard import login_required 
+from db_manager import with_db, sync_link_rows, summary_items, resolve_member, parse_id_list
+from fragment_cache import invalidate
+from tracing import span
+from query_profiles import select_list
 
 jobs_bp = Blueprint('jobs', __name__)
 
@@ -19,7 +22,7 @@ def manage_jobs():
         return redirect(url_for('dashboard.index'))
 
     conn = get_db_connection()
-    cursor = conn.cursor(DictCursor)
+    cursor = conn.cursor()
 
     try:
         # 1. FETCH HEADER INFO (Learning from your code pattern)
@@ -36,8 +39,7 @@ def manage_jobs():
             expiry_date = datetime.now() + timedelta(days=10)
             
             # Get the internal comp_id for this user
-            cursor.execute("SELECT comp_id FROM companies WHERE member_id = %s", (user_id,))
-            comp_data = cursor.fetchone()
+            comp_data = resolve_member(user_id, role, cursor)
             
             if comp_data:
                 comp_id = comp_data['comp_id']
@@ -50,11 +52,11 @@ def manage_jobs():
                 
                 job_id = cursor.lastrowid
 
-                # Insert Skill Tags
-                if skills_ids:
-                    id_list = [int(s_id.strip()) for s_id in skills_ids.split(',') if s_id.strip()]
-                    for s_id in id_list:
-                        cursor.execute("INSERT INTO job_skills (job_id, skill_id) VALUES (%s, %s)", (job_id, s_id))
+                # Insert Skill Tags (malformed ids are dropped, an all-bad list means no tags)
+                id_list = parse_id_list(skills_ids)
+                if id_list:
+                    with span('job.skills', count=len(id_list)):
+                        sync_link_rows(cursor, 'job_skills', job_id, id_list, existing=False)
                     # --- NEW NOTIFICATION LOGIC START ---
                     # 1. Find all users who have at least one of these skill IDs
                     # We use a tuple for the IN clause
@@ -68,32 +70,33 @@ def manage_jobs():
                     matching_users = cursor.fetchall()
 
                     # 2. Insert notification for each matched individual
-                    for user in matching_users:
-                        notif_msg = f"New Job Alert: A position for '{job_role}' matches your skills!"
-                        cursor.execute("""
-                            INSERT INTO notifications (user_id, type, message) 
-                            VALUES (%s, 'job_match', %s)
-                        """, (user['user_id'], notif_msg))
+                    with span('job.notifications', count=len(matching_users)):
+                        for user in matching_users:
+                            notif_msg = f"New Job Alert: A position for '{job_role}' matches your skills!"
+                            cursor.execute("""
+                                INSERT INTO notifications (user_id, type, message) 
+                                VALUES (%s, 'job_match', %s)
+                            """, (user['user_id'], notif_msg))
                     # --- NEW NOTIFICATION LOGIC END ---
                 conn.commit()
+                invalidate('jobs')
                 flash("Job opportunity launched successfully!", "success")
             
             return redirect(url_for('jobs.manage_jobs'))
 
         # 3. FETCH ACTIVE LISTINGS (GET)
         cursor.execute("""
-            SELECT j.*, DATEDIFF(j.expires_at, NOW()) as days_left,
-                   GROUP_CONCAT(s.skill_name SEPARATOR ', ') as required_skills
+            SELECT j.*, DATEDIFF(j.expires_at, NOW()) as days_left
             FROM jobs j
             JOIN companies c ON j.comp_id = c.comp_id
-            LEFT JOIN job_skills js ON j.job_id = js.job_id
-            LEFT JOIN skills_list s ON js.skill_id = s.skill_id
-            WHERE c.member_id = %s AND j.expires_at > NOW()
-            GROUP BY j.job_id 
+            WHERE c.member_id = %s AND j.is_active = 1
             ORDER BY j.created_at DESC
         """, (user_id,))
         
         active_jobs = cursor.fetchall()
+        for job in active_jobs:
+            # The template splits this on ', '
+            job['all_skills'] = ', '.join(name for _, name in summary_items(job.get('skills_json')))
 
     except Exception as e:
         print(f"Jobs Management Error: {e}")
@@ -117,7 +120,7 @@ def manage_jobs():
 def delete_job(job_id):
     user_id = session.get('user_id')
     conn = get_db_connection()
-    cursor = conn.cursor(DictCursor)
+    cursor = conn.cursor()
 
     try:
         # Verify ownership: Ensure the job belongs to the logged-in company
@@ -134,6 +137,7 @@ def delete_job(job_id):
             # Delete from job_skills first (though ON DELETE CASCADE handles this, it's good practice)
             cursor.execute("DELETE FROM jobs WHERE job_id = %s", (job_id,))
             conn.commit()
+            invalidate('jobs')
             flash("Listing removed successfully.", "info")
         else:
             flash("Unauthorized action or job not found.", "danger")
@@ -158,7 +162,7 @@ def job_feed():
         return redirect(url_for('jobs.manage_jobs'))
 
     conn = get_db_connection()
-    cursor = conn.cursor(DictCursor)
+    cursor = conn.cursor()
 
     try:
         # 1. Get header info
@@ -166,14 +170,8 @@ def job_feed():
 
         # 2. FETCH MATCHED JOBS
         # We join 'users' to bridge session.member_id to user_skills.user_id
-        query = """
-                SELECT   j.*, 
-                    c.company_name, c.company_logo, c.comp_id, c.member_id,
-                    DATEDIFF(j.expires_at, NOW()) as days_left,
-                    (SELECT GROUP_CONCAT(s.skill_name SEPARATOR ', ') 
-                        FROM job_skills js2 
-                        JOIN skills_list s ON js2.skill_id = s.skill_id 
-                        WHERE js2.job_id = j.job_id) as all_skills
+        query = f"""
+                SELECT {select_list('job_feed')}
                 FROM jobs j
                 JOIN companies c ON j.comp_id = c.comp_id
                 WHERE j.job_id IN (
@@ -184,24 +182,16 @@ def job_feed():
                     JOIN users u ON us.user_id = u.user_id
                     WHERE u.member_id = %s
                 ) 
-                AND j.expires_at > NOW()
+                AND j.is_active = 1
                 ORDER BY j.created_at DESC
             """
         cursor.execute(query, (user_id,))
         matched_jobs = cursor.fetchall()
         for job in matched_jobs:
-            # 1. Process logo path
-            db_logo = job.get('company_logo')
-            if db_logo and (db_logo.startswith('http://') or db_logo.startswith('https://')):
-                # Keep the Cloudinary URL
-                pass
-            else:
-                # Use UI-Avatar fallback
-                job['company_logo'] = f"https://ui-avatars.com/api/?name={job['company_name']}&background=0D8ABC&color=fff"
+            job['all_skills'] = ', '.join(name for _, name in summary_items(job.get('skills_json')))
         # --- NEW: Clear 'job_match' alerts when they view the feed ---
         # First, find the actual user_id from the member_id
-        cursor.execute("SELECT user_id FROM users WHERE member_id = %s", (user_id,))
-        u_data = cursor.fetchone()
+        u_data = resolve_member(user_id, role, cursor)
         if u_data:
             cursor.execute("""
                 UPDATE notifications 
@@ -222,4 +212,59 @@ def job_feed():
                            jobs=matched_jobs, 
                            name=display_name, 
                            profile_url=profile_url,
-                           active_page='jobs')
\ No newline at end of file
+                           active_page='jobs')
+
+# --- Expired Job Archival ---
+# Hot queries filter on the deterministic, indexed is_active flag instead of
+# expires_at > NOW(). The sweep below (run by the scheduler) flips the flag
+# and moves expired jobs + their skills into archive tables.
+JOB_ARCHIVE_BATCH = 500
+# Copied by name (archived_at is set on insert): a new jobs column is only archived once listed here
+JOB_ARCHIVE_COLUMNS = ('job_id', 'comp_id', 'job_role', 'job_description', 'job_type', 'external_link',
+                       'created_at', 'expires_at', 'is_active', 'skills_json')
+
+@with_db
+def _archive_job_batch(conn):
+    """Moves one batch of inactive jobs to the archive in a single transaction. Returns the count moved."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT job_id FROM jobs WHERE is_active = 0
+            ORDER BY job_id LIMIT %s FOR UPDATE
+        """, (JOB_ARCHIVE_BATCH,))
+        job_ids = tuple(row['job_id'] for row in cursor.fetchall())
+        if not job_ids:
+            return 0
+
+        columns = ', '.join(JOB_ARCHIVE_COLUMNS)
+        cursor.execute("""
+            INSERT IGNORE INTO job_skills_archive (job_id, skill_id)
+            SELECT job_id, skill_id FROM job_skills WHERE job_id IN %s
+        """, (job_ids,))
+        cursor.execute(f"""
+            INSERT IGNORE INTO jobs_archive ({columns}, archived_at)
+            SELECT {columns}, NOW() FROM jobs WHERE job_id IN %s
+        """, (job_ids,))
+        cursor.execute("DELETE FROM job_skills WHERE job_id IN %s", (job_ids,))
+        cursor.execute("DELETE FROM jobs WHERE job_id IN %s", (job_ids,))
+        return len(job_ids)
+
+@with_db
+def _deactivate_expired_jobs(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("UPDATE jobs SET is_active = 0 WHERE is_active = 1 AND expires_at <= NOW()")
+        return cursor.rowcount
+
+def archive_expired_jobs():
+    """Scheduler task: marks expired jobs inactive, then archives them in batches."""
+    deactivated = _deactivate_expired_jobs()
+    if deactivated:
+        invalidate('jobs')
+    archived = 0
+    while True:
+        moved = _archive_job_batch()
+        archived += moved
+        if moved < JOB_ARCHIVE_BATCH:
+            break
+    if deactivated or archived:
+        print(f"Job sweep: {deactivated} expired, {archived} archived")
+    return archived
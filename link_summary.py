@@ -0,0 +1,106 @@
+import sys
+import argparse
+from db_manager import (with_db, LINK_TABLES, LINK_SUMMARIES, link_summary_items,
+                        encode_summary, summary_items)
+
+# --- Denormalized Chip Columns ---
+# users.skills_json, companies.services_json and jobs.skills_json mirror the
+# link tables so listings read chips straight off the row (see LINK_SUMMARIES
+# in db_manager). The columns come from migrations/0002; writes keep them
+# current through sync_link_rows and this module backfills/verifies them
+# (`python migrate.py backfill` runs the backfill after a deploy).
+#
+#   python link_summary.py backfill [--table user_skills]
+#   python link_summary.py verify   [--table user_skills]
+
+BACKFILL_BATCH = 500
+
+
+@with_db
+def _owner_batch(conn, table, after_id):
+    owner_table, column, _ = LINK_SUMMARIES[table]
+    owner_col, _ = LINK_TABLES[table]
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {owner_col} AS owner_id, {column} AS summary FROM {owner_table}
+            WHERE {owner_col} > %s ORDER BY {owner_col} LIMIT %s
+        """, (after_id, BACKFILL_BATCH))
+        return cursor.fetchall()
+
+
+@with_db
+def _write_batch(conn, table, owner_ids):
+    """Recomputes and stores the summary for a batch of owners in one transaction."""
+    owner_table, column, _ = LINK_SUMMARIES[table]
+    owner_col, _ = LINK_TABLES[table]
+    with conn.cursor() as cursor:
+        items = link_summary_items(cursor, table, owner_ids)
+        cursor.executemany(f"UPDATE {owner_table} SET {column} = %s WHERE {owner_col} = %s",
+                           [(encode_summary(items[owner_id]), owner_id) for owner_id in owner_ids])
+
+
+@with_db
+def _expected_batch(conn, table, owner_ids):
+    with conn.cursor() as cursor:
+        return link_summary_items(cursor, table, owner_ids)
+
+
+def _owners(table):
+    """Yields owner batches (lists of rows) in primary-key order."""
+    after_id = 0
+    while True:
+        rows = _owner_batch(table, after_id)
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1]['owner_id']
+
+
+def backfill(tables=None):
+    """Rewrites every summary from the link tables. Safe to re-run."""
+    total = 0
+    for table in tables or LINK_SUMMARIES:
+        count = 0
+        for rows in _owners(table):
+            _write_batch(table, [row['owner_id'] for row in rows])
+            count += len(rows)
+        print(f"Backfilled {LINK_SUMMARIES[table][0]}.{LINK_SUMMARIES[table][1]}: {count} rows")
+        total += count
+    return total
+
+
+def verify(tables=None, show=10):
+    """Compares stored summaries with the link tables. Returns the number of stale rows."""
+    stale = 0
+    for table in tables or LINK_SUMMARIES:
+        owner_table, column, _ = LINK_SUMMARIES[table]
+        checked = mismatched = 0
+        for rows in _owners(table):
+            expected = _expected_batch(table, [row['owner_id'] for row in rows])
+            for row in rows:
+                checked += 1
+                stored = summary_items(row['summary'])
+                if row['summary'] is None or stored != expected[row['owner_id']]:
+                    mismatched += 1
+                    if mismatched <= show:
+                        print(f"  {owner_table} {row['owner_id']}: stored {stored} != {expected[row['owner_id']]}")
+        print(f"Verified {owner_table}.{column}: {checked} rows, {mismatched} stale")
+        stale += mismatched
+    return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill/verify denormalized skill and service columns")
+    parser.add_argument('command', choices=['backfill', 'verify'])
+    parser.add_argument('--table', choices=sorted(LINK_SUMMARIES), action='append',
+                        help="link table to process (repeatable; default: all)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'backfill':
+        backfill(args.table)
+        return 0
+    return 1 if verify(args.table) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
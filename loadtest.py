@@ -0,0 +1,309 @@
+import eventlet
+eventlet.monkey_patch()
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+from dotenv import load_dotenv
+load_dotenv()
+import socketio
+from engineio.payload import Payload
+
+# A long-poll response carries every broadcast queued since the last poll;
+# the client's default cap (16 packets) aborts the connection under load
+Payload.max_decode_packets = 100000
+
+# --- Community Chat Load Test ---
+# Connects many simulated Socket.IO clients to a running app, sends
+# send_community_msg at a fixed total rate and measures how long each
+# broadcast takes to reach every client (receive_community_msg).
+#
+#   python app.py                                    # in another terminal
+#   python loadtest.py --clients 2000 --rate 50 --duration 60 --server-pid <pid>
+#
+# Comparing the Socket.IO server modes: run the same load against each and
+# print the saved results side by side.
+#
+#   SOCKETIO_MODE=eventlet python app.py  ->  python loadtest.py ... --label eventlet --json eventlet.json
+#   SOCKETIO_MODE=asgi python app.py      ->  python loadtest.py ... --label asgi --json asgi.json
+#   python loadtest.py --compare eventlet.json asgi.json
+#
+# Clients are green threads in this one process, so watch the reported client
+# CPU: if it is near 100% the tester, not the server, is the bottleneck.
+# Install websocket-client for the websocket transport; without it the
+# clients fall back to long-polling.
+
+RUN_ID = f"{random.getrandbits(32):08x}"
+MARKER = f"lt|{RUN_ID}|"
+ATTACHMENT = {
+    'file_path': 'https://res.cloudinary.com/loadtest/raw/upload/loadtest.txt',
+    'file_name': 'loadtest.txt',
+    'file_public_id': 'loadtest/attachment',
+}
+
+
+def session_cookie(secret_key, member_id, role):
+    """Signs a Flask session cookie so the simulated client is 'logged in' as member_id."""
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+    signer = Flask('loadtest')
+    signer.secret_key = secret_key
+    serializer = SecureCookieSessionInterface().get_signing_serializer(signer)
+    return serializer.dumps({'logged_in': True, 'user_id': member_id, 'role': role})
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of another process (psutil if available, else /proc)."""
+    try:
+        import psutil
+        times = psutil.Process(pid).cpu_times()
+        return times.user + times.system
+    except ImportError:
+        pass
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def own_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Stats:
+    def __init__(self):
+        self.sent = {}            # seq -> (send time, receivers connected at send)
+        self.delivered = {}       # seq -> deliveries counted
+        self.latencies = []       # seconds, one per delivery
+        self.connect_errors = 0
+        self.disconnects = 0
+        self.send_errors = 0
+        self.stopping = False
+
+    def on_receive(self, data):
+        message = (data or {}).get('message') or ''
+        if not message.startswith(MARKER):
+            return  # real traffic in the room
+        try:
+            seq = int(message[len(MARKER):].split('|', 1)[0])
+        except ValueError:
+            return
+        sent = self.sent.get(seq)
+        if sent is None:
+            return
+        self.latencies.append(time.perf_counter() - sent[0])
+        self.delivered[seq] = self.delivered.get(seq, 0) + 1
+
+
+def connect_client(url, headers, transports, stats, clients):
+    client = socketio.Client(reconnection=False)
+    client.on('receive_community_msg', stats.on_receive)
+
+    @client.on('disconnect')
+    def on_disconnect(*args):
+        if not stats.stopping:
+            stats.disconnects += 1
+        if client in clients:
+            clients.remove(client)
+
+    try:
+        client.connect(url, headers=headers, transports=transports, wait_timeout=10)
+        clients.append(client)
+    except Exception as e:
+        stats.connect_errors += 1
+        if stats.connect_errors <= 5:
+            print(f"Connect Error: {e}")
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def report(stats, args, sending_time, duration, server_cpu, client_cpu):
+    latencies = sorted(stats.latencies)
+    expected = sum(receivers for _, receivers in stats.sent.values())
+    received = sum(stats.delivered.values())
+    result = {
+        'label': args.label,
+        'clients': args.clients,
+        'rate': args.rate,
+        'duration_s': round(duration, 1),
+        'messages_sent': len(stats.sent),
+        'achieved_rate': round(len(stats.sent) / sending_time, 1) if sending_time else 0.0,
+        'deliveries_expected': expected,
+        'deliveries_received': received,
+        'dropped': max(0, expected - received),
+        'drop_rate': round(max(0, expected - received) / expected, 4) if expected else 0.0,
+        'deliveries_per_s': round(received / duration, 1) if duration else 0.0,
+        'latency_ms': {
+            'p50': round(_percentile(latencies, 0.50) * 1000, 1),
+            'p90': round(_percentile(latencies, 0.90) * 1000, 1),
+            'p99': round(_percentile(latencies, 0.99) * 1000, 1),
+            'max': round((latencies[-1] if latencies else 0) * 1000, 1),
+        },
+        'connect_errors': stats.connect_errors,
+        'disconnects': stats.disconnects,
+        'send_errors': stats.send_errors,
+        'server_cpu_percent': None if server_cpu is None else round(server_cpu / duration * 100, 1),
+        'client_cpu_percent': round(client_cpu / duration * 100, 1),
+    }
+
+    print(f"\nMessages sent:      {result['messages_sent']} at {result['achieved_rate']}/s "
+          f"(target {args.rate}/s, {args.attachment_ratio:.0%} with attachment)")
+    print(f"Deliveries:         {received}/{expected} (dropped {result['dropped']}, {result['drop_rate']:.2%}), "
+          f"{result['deliveries_per_s']}/s")
+    print("Broadcast latency:  p50 {p50} ms | p90 {p90} ms | p99 {p99} ms | max {max} ms".format(**result['latency_ms']))
+    print(f"Connect errors:     {stats.connect_errors}, unexpected disconnects: {stats.disconnects}")
+    if result['server_cpu_percent'] is not None:
+        print(f"Server CPU:         {result['server_cpu_percent']}% of one core")
+    print(f"Client CPU:         {result['client_cpu_percent']}% of one core")
+    if result['client_cpu_percent'] > 90:
+        print("Warning: the load generator is saturated; latencies include its own queueing. "
+              "Use fewer clients per process or run several processes.")
+    return result
+
+
+COMPARE_FIELDS = (
+    # (result key, '.'-separated for nested values; row title)
+    ('clients', 'Clients'),
+    ('achieved_rate', 'Messages/s sent'),
+    ('deliveries_per_s', 'Deliveries/s'),
+    ('drop_rate', 'Drop rate'),
+    ('latency_ms.p50', 'Latency p50 (ms)'),
+    ('latency_ms.p99', 'Latency p99 (ms)'),
+    ('connect_errors', 'Connect errors'),
+    ('server_cpu_percent', 'Server CPU %'),
+    ('client_cpu_percent', 'Client CPU %'),
+)
+
+
+def compare(paths):
+    """Prints saved --json results side by side, one column per run."""
+    runs = []
+    for path in paths:
+        with open(path) as f:
+            result = json.load(f)
+        runs.append((result.get('label') or os.path.splitext(os.path.basename(path))[0], result))
+
+    def value(result, key):
+        for part in key.split('.'):
+            result = (result or {}).get(part)
+        return '-' if result is None else str(result)
+
+    width = max(12, *(len(name) + 2 for name, _ in runs))
+    print(f"{'':20}" + ''.join(f"{name:>{width}}" for name, _ in runs))
+    for key, title in COMPARE_FIELDS:
+        print(f"{title:20}" + ''.join(f"{value(result, key):>{width}}" for _, result in runs))
+    if any(run[1].get('client_cpu_percent', 0) > 90 for run in runs):
+        print("Warning: a load generator was saturated; its numbers understate the server.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Socket.IO load test for community chat")
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--connect-rate', type=float, default=100, help="new connections per second")
+    parser.add_argument('--rate', type=float, default=10, help="messages per second across all clients")
+    parser.add_argument('--attachment-ratio', type=float, default=0.1, help="share of messages with an attachment")
+    parser.add_argument('--message-size', type=int, default=80, help="approximate message length in characters")
+    parser.add_argument('--duration', type=float, default=30, help="seconds of sending")
+    parser.add_argument('--drain', type=float, default=5, help="seconds to wait for late broadcasts")
+    parser.add_argument('--members', default='IND000001',
+                        help="comma-separated member_ids the clients log in as (round-robin)")
+    parser.add_argument('--role', default='individual')
+    parser.add_argument('--anonymous', action='store_true', help="connect without a session cookie")
+    parser.add_argument('--polling', action='store_true', help="force the long-polling transport")
+    parser.add_argument('--server-pid', type=int, help="pid of the app process, for CPU usage")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--label', help="name of this run in the results, e.g. the server's SOCKETIO_MODE")
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                        help="print saved --json results side by side and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(args.compare)
+        return 0
+
+    secret_key = os.getenv('FLASK_SECRET_KEY')
+    if not args.anonymous and not secret_key:
+        print("FLASK_SECRET_KEY is not set; use the app's key or pass --anonymous")
+        return 2
+
+    members = [m.strip() for m in args.members.split(',') if m.strip()]
+    cookies = [] if args.anonymous else [session_cookie(secret_key, m, args.role) for m in members]
+    try:
+        import websocket  # noqa: F401  (websocket-client)
+        transports = ['polling'] if args.polling else None
+    except ImportError:
+        print("websocket-client is not installed; clients use long-polling")
+        transports = ['polling']
+    stats = Stats()
+    clients = []
+
+    # 1. Ramp up connections
+    print(f"Connecting {args.clients} clients to {args.url} (run {RUN_ID})...")
+    pool = eventlet.GreenPool(args.clients)
+    for i in range(args.clients):
+        headers = {'Cookie': f"session={cookies[i % len(cookies)]}"} if cookies else {}
+        pool.spawn_n(connect_client, args.url, headers, transports, stats, clients)
+        eventlet.sleep(1.0 / args.connect_rate)
+    pool.waitall()
+    print(f"Connected {len(clients)}/{args.clients}")
+    if not clients:
+        return 1
+
+    # 2. Send at a fixed total rate from random clients
+    def send(client, seq, payload):
+        try:
+            client.emit('send_community_msg', payload)
+        except Exception:
+            stats.send_errors += 1
+            stats.sent.pop(seq, None)
+
+    server_cpu_start = cpu_seconds(args.server_pid) if args.server_pid else None
+    client_cpu_start = own_cpu_seconds()
+    started = time.perf_counter()
+    next_at, seq = started, 0
+    padding = 'x' * max(0, args.message_size - len(MARKER) - 12)
+    while time.perf_counter() - started < args.duration and clients:
+        seq += 1
+        payload = {'message': f"{MARKER}{seq}|{padding}"}
+        if random.random() < args.attachment_ratio:
+            payload.update(ATTACHMENT)
+        stats.sent[seq] = (time.perf_counter(), len(clients))
+        pool.spawn_n(send, random.choice(clients), seq, payload)
+        next_at += 1.0 / args.rate
+        eventlet.sleep(max(0, next_at - time.perf_counter()))
+    sending_time = time.perf_counter() - started
+
+    # 3. Wait for stragglers, then disconnect
+    eventlet.sleep(args.drain)
+    duration = time.perf_counter() - started
+    server_cpu = None
+    if server_cpu_start is not None:
+        server_cpu_end = cpu_seconds(args.server_pid)
+        server_cpu = None if server_cpu_end is None else server_cpu_end - server_cpu_start
+    client_cpu = own_cpu_seconds() - client_cpu_start
+    stats.stopping = True
+    for client in list(clients):
+        clients.remove(client)
+        pool.spawn_n(client.disconnect)
+    pool.waitall()
+
+    result = report(stats, args, sending_time, duration, server_cpu, client_cpu)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import random
 from flask_mail import Message
 from flask import current_app
+from tracing import span
 def generate_otp():
     return str(random.randint(100000, 999999))
 
@@ -61,4 +62,5 @@ def send_otp_email(mail, recipient_email, otp):
         </div>
     </div>
     """
-    mail.send(msg)
\ No newline at end of file
+    with span('mail.send'):
+        mail.send(msg)
\ No newline at end of file
@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template, session, redirect, url_for
 from chat import get_sender_details, with_db
+from db_manager import reference_data, resolve_member
 
 members_bp = Blueprint('members', __name__)
 @members_bp.route('/dashboard/find-members')
-@with_db
+@with_db(readonly=True)
 def find_members(conn):
     user_id = session.get('user_id')
     role = session.get('role')
@@ -17,8 +18,7 @@ def find_members(conn):
         with conn.cursor() as cursor:
             # --- CASE 1: LOGGED IN AS INDIVIDUAL ---
             if role == 'individual':
-                cursor.execute("SELECT user_id, pro_id FROM users WHERE member_id = %s", (user_id,))
-                current_user = cursor.fetchone()
+                current_user = resolve_member(user_id, role, cursor)
 
                 if current_user:
                     actual_id = current_user['user_id']
@@ -27,28 +27,25 @@ def find_members(conn):
                     cursor.execute("SELECT skill_id FROM user_skills WHERE user_id = %s", (actual_id,))
                     skill_ids = [row['skill_id'] for row in cursor.fetchall()]
 
-                    query = """
-                        SELECT DISTINCT u.member_id, u.first_name, u.second_name, u.pic_path, 
-                                        u.experience, p.pro_name
-                        FROM users u
-                        JOIN profession p ON u.pro_id = p.pro_id
-                        LEFT JOIN user_skills us ON u.user_id = us.user_id
-                        WHERE (u.pro_id = %s 
-                    """
-                    params = [my_pro_id]
+                    # Same profession UNION shared skills: each half uses its own index,
+                    # where one OR across both tables would scan every user
+                    columns = "u.member_id, u.first_name, u.second_name, u.avatar_url, u.experience, u.pro_id"
+                    query = f"SELECT {columns} FROM users u WHERE u.pro_id = %s AND u.member_id != %s"
+                    params = [my_pro_id, user_id]
                     if skill_ids:
-                        query += " OR us.skill_id IN %s"
-                        params.append(tuple(skill_ids))
-                    
-                    query += ") AND u.member_id != %s"
-                    params.append(user_id)
+                        query += f"""
+                            UNION
+                            SELECT {columns} FROM users u
+                            JOIN user_skills us ON u.user_id = us.user_id
+                            WHERE us.skill_id IN %s AND u.member_id != %s
+                        """
+                        params += [tuple(skill_ids), user_id]
                     cursor.execute(query, tuple(params))
                     matched_members = cursor.fetchall()
 
             # --- CASE 2: LOGGED IN AS COMPANY ---
             elif role == 'company':
-                cursor.execute("SELECT comp_id FROM companies WHERE member_id = %s", (user_id,))
-                company_data = cursor.fetchone()
+                company_data = resolve_member(user_id, role, cursor)
                 
                 if company_data:
                     comp_id = company_data['comp_id']
@@ -57,23 +54,22 @@ def find_members(conn):
 
                     if service_ids:
                         query = """
-                            SELECT u.member_id, u.first_name, u.second_name, u.pic_path, 
-                                   u.experience, p.pro_name
+                            SELECT u.member_id, u.first_name, u.second_name, u.avatar_url, 
+                                   u.experience, u.pro_id
                             FROM users u
-                            JOIN profession p ON u.pro_id = p.pro_id
                             WHERE u.pro_id IN %s
                         """
                         cursor.execute(query, (tuple(service_ids),))
                         matched_members = cursor.fetchall()
 
-        # --- DATA POST-PROCESSING (Connection is closed/returned by here) ---
+        # --- DATA POST-PROCESSING ---
+        # Profession names come from the reference cache; members without a known
+        # profession stay out, as they did with the old inner join
+        with conn.cursor() as cursor:
+            professions = reference_data('professions', require={m['pro_id'] for m in matched_members}, cursor=cursor)
+        matched_members = [m for m in matched_members if m['pro_id'] in professions]
         for member in matched_members:
-            pic_val = member.get('pic_path')
-            if pic_val and (pic_val.startswith('http://') or pic_val.startswith('https://')):
-                member['avatar'] = pic_val
-            else:
-                first_name = member.get('first_name', 'User')
-                member['avatar'] = f"https://ui-avatars.com/api/?name={first_name}&background=0d6efd&color=fff"
+            member['pro_name'] = professions[member['pro_id']]
 
         # Fetch layout details
         display_name, profile_url, _, _ = get_sender_details(user_id, role)
@@ -0,0 +1,217 @@
+import os
+import time
+import inspect
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+from flask import g, request, session, abort, has_request_context, Response
+
+# --- Metrics ---
+# A small in-process registry (counters + histograms) exported in the
+# Prometheus text format at /metrics. Recording is a dict update under a lock,
+# so it is cheap enough to run on every request and every query. Each worker
+# process exports its own numbers; Prometheus sums them per instance.
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # lets a Prometheus scraper in without an admin session
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name, self.documentation, self.label_names = name, documentation, labels
+        self.values = defaultdict(float)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.values[label_values] += amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.label_names, label_values)} {value:g}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.documentation, self.label_names = name, documentation, labels
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        for label_values, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.label_names, label_values, ('le', f'{bound:g}'))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.label_names, label_values, ('le', '+Inf'))} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.label_names, label_values)} {series[-2]:.6f}"
+            yield f"{self.name}_count{_labels(self.label_names, label_values)} {series[-1]}"
+
+
+_registry = []
+_collectors = []  # callables returning [(name, kind, documentation, [(labels dict, value)])]
+
+
+def counter(name, documentation, labels=()):
+    metric = Counter(name, documentation, labels)
+    _registry.append(metric)
+    return metric
+
+
+def histogram(name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, documentation, labels, buckets)
+    _registry.append(metric)
+    return metric
+
+
+def register_collector(func):
+    """For values that already live elsewhere (cache stats, pool size); read at scrape time."""
+    _collectors.append(func)
+    return func
+
+
+# Request metrics
+http_requests = counter('http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+http_latency = histogram('http_request_duration_seconds', 'Request latency', ('endpoint', 'method'))
+request_db_queries = histogram('http_request_db_queries', 'DB queries per request', ('endpoint',), COUNT_BUCKETS)
+request_db_time = histogram('http_request_db_seconds', 'Time spent in the DB per request', ('endpoint',), QUERY_BUCKETS)
+
+# DB metrics (fed by db_manager's cursor class and with_db)
+db_queries = counter('db_queries_total', 'Queries executed', ('outcome',))
+db_query_time = histogram('db_query_duration_seconds', 'Single query latency', (), QUERY_BUCKETS)
+db_pool_wait = histogram('db_pool_wait_seconds', 'Time to check a connection out of the pool', (), QUERY_BUCKETS)
+
+# Socket.IO metrics
+socketio_events = counter('socketio_events_total', 'Socket.IO events received', ('event', 'outcome'))
+socketio_latency = histogram('socketio_event_duration_seconds', 'Socket.IO handler latency', ('event',))
+
+
+def record_query(duration, failed=False):
+    """Called by the DB cursor after every statement."""
+    db_queries.inc('error' if failed else 'ok')
+    db_query_time.observe(duration)
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_time = g.get('db_time', 0.0) + duration
+
+
+def track_event(event):
+    """Decorator for Socket.IO handlers (plain or coroutine): counts events and times the handler."""
+    def decorator(f):
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def decorated_coroutine(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    result = await f(*args, **kwargs)
+                    outcome = 'ok'
+                    return result
+                finally:
+                    socketio_events.inc(event, outcome)
+                    socketio_latency.observe(time.perf_counter() - started, event)
+            return decorated_coroutine
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = f(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                socketio_events.inc(event, outcome)
+                socketio_latency.observe(time.perf_counter() - started, event)
+        return decorated_function
+    return decorator
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"Metrics Collector Error: {e}")
+            continue
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {value:g}")
+    return '\n'.join(lines) + '\n'
+
+
+def _authorized():
+    if 'admin_id' in session:
+        return True
+    header = request.headers.get('Authorization', '')
+    return bool(METRICS_TOKEN) and header == f"Bearer {METRICS_TOKEN}"
+
+
+def init_metrics(app):
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+
+    @app.after_request
+    def remember_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        started = g.get('request_started')
+        if started is None:
+            return
+        # Unmatched URLs share one label so random 404s can't blow up the series count
+        endpoint = request.endpoint or 'unmatched'
+        status = g.get('response_status', 500)
+        http_requests.inc(endpoint, request.method, str(status))
+        http_latency.observe(time.perf_counter() - started, endpoint, request.method)
+        request_db_queries.observe(g.get('db_queries', 0), endpoint)
+        request_db_time.observe(g.get('db_time', 0.0), endpoint)
+
+    @app.route('/metrics')
+    def metrics():
+        if not _authorized():
+            abort(403)
+        return Response(render(), mimetype='text/plain; version=0.0.4')
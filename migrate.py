@@ -0,0 +1,258 @@
+import os
+import re
+import sys
+import argparse
+from db_manager import open_dedicated_connection, backfill_avatars
+from link_summary import backfill as backfill_link_summaries
+from query_profiles import select_list
+
+# --- Schema Migrations ---
+# Versioned plain-SQL files in migrations/ (NNNN_name.sql), applied in order
+# and recorded in schema_migrations. A MySQL advisory lock keeps two deploys
+# from migrating at the same time.
+#
+#   python migrate.py status
+#   python migrate.py up [--to 2]
+#   python migrate.py backfill
+#   python migrate.py explain [--min-rows 100]
+#
+# Databases created before migrations existed are adopted by running `up`:
+# tables use IF NOT EXISTS, later columns are added with explicit ALTERs, and
+# a column or index that already exists under the same name is reported and
+# skipped instead of failing the migration. Columns derived from other rows
+# (skill/service chips, avatar_url) are filled by `backfill` after `up`; it
+# is safe to re-run.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_LOCK_NAME = os.getenv('MIGRATION_LOCK_NAME', 'technest_migrate')
+MIGRATION_LOCK_TIMEOUT = int(os.getenv('MIGRATION_LOCK_TIMEOUT', 60))  # seconds
+
+# MySQL errors meaning "already there": duplicate column name, duplicate key name
+ALREADY_APPLIED_ERRORS = {1060, 1061}
+
+_FILE_NAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def load_migrations():
+    """[(version, name, path)] sorted by version."""
+    migrations = []
+    for file_name in os.listdir(MIGRATIONS_DIR):
+        match = _FILE_NAME.match(file_name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, file_name)))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+
+def split_statements(sql):
+    """Statements of a migration file: ';' at the end of a line ends one, '--' lines are comments."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in re.split(r';\s*$', '\n'.join(lines), flags=re.MULTILINE)
+            if statement.strip()]
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def status():
+    conn = open_dedicated_connection()
+    try:
+        with conn.cursor() as cursor:
+            _ensure_migrations_table(cursor)
+            applied = _applied_versions(cursor)
+        for version, name, _ in load_migrations():
+            print(f"{'applied' if version in applied else 'pending':8} {version:04d} {name}")
+    finally:
+        conn.close()
+
+
+def _apply(cursor, version, name, path):
+    with open(path, encoding='utf-8') as handle:
+        statements = split_statements(handle.read())
+    print(f"Applying {version:04d} {name} ({len(statements)} statements)")
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except Exception as e:
+            code = e.args[0] if e.args else None
+            if code not in ALREADY_APPLIED_ERRORS:
+                raise
+            print(f"  skipped, already present: {e.args[1]}")
+    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+
+
+def migrate(target=None):
+    """Applies pending migrations up to `target` (default: all). Returns how many ran."""
+    # DDL commits implicitly in MySQL, so each statement runs in autocommit mode
+    conn = open_dedicated_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+            if not cursor.fetchone()['acquired']:
+                raise RuntimeError("Another process is running migrations")
+            try:
+                _ensure_migrations_table(cursor)
+                applied = _applied_versions(cursor)
+                count = 0
+                for version, name, path in load_migrations():
+                    if version in applied or (target is not None and version > target):
+                        continue
+                    _apply(cursor, version, name, path)
+                    count += 1
+                print(f"{count} migration(s) applied" if count else "Schema is up to date")
+                return count
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+    finally:
+        conn.close()
+
+
+# --- EXPLAIN Check ---
+# The hot queries of db_manager and the blueprints, in the shape they run
+# with representative parameters. A plan step with type ALL (full table
+# scan) over at least --min-rows estimated rows fails the check. Small or
+# empty tables are often scanned on purpose by the optimizer, so run this
+# against a copy of production data.
+EXPLAIN_QUERIES = [
+    ('login', "SELECT member_id, password_hash, role FROM auth WHERE email = %s", ('someone@example.com',)),
+    ('reset_token', "SELECT email FROM auth WHERE reset_token = %s AND reset_expires > NOW()", ('token',)),
+    ('resolve_individual', "SELECT user_id, pro_id FROM users WHERE member_id = %s", ('IND000000',)),
+    ('resolve_company', "SELECT comp_id FROM companies WHERE member_id = %s", ('COM000000',)),
+    ('members_page', f"""
+        SELECT {select_list('member_card')} FROM users u
+        ORDER BY u.first_name ASC, u.second_name ASC LIMIT 20 OFFSET 0
+    """, ()),
+    ('companies_page', f"""
+        SELECT {select_list('company_card')} FROM companies c
+        ORDER BY c.company_name ASC LIMIT 20 OFFSET 0
+    """, ()),
+    ('public_jobs', f"""
+        SELECT {select_list('job_card')} FROM jobs j
+        JOIN companies c ON j.comp_id = c.comp_id
+        WHERE j.is_active = 1 ORDER BY j.created_at DESC LIMIT 20 OFFSET 0
+    """, ()),
+    ('company_jobs', """
+        SELECT j.*, DATEDIFF(j.expires_at, NOW()) as days_left FROM jobs j
+        JOIN companies c ON j.comp_id = c.comp_id
+        WHERE c.member_id = %s AND j.is_active = 1 ORDER BY j.created_at DESC
+    """, ('COM000000',)),
+    ('job_feed', f"""
+        SELECT {select_list('job_feed')} FROM jobs j
+        JOIN companies c ON j.comp_id = c.comp_id
+        WHERE j.job_id IN (
+            SELECT js.job_id FROM job_skills js
+            JOIN user_skills us ON js.skill_id = us.skill_id
+            JOIN users u ON us.user_id = u.user_id
+            WHERE u.member_id = %s
+        ) AND j.is_active = 1 ORDER BY j.created_at DESC
+    """, ('IND000000',)),
+    ('job_match_recipients', """
+        SELECT DISTINCT us.user_id FROM user_skills us JOIN users u ON us.user_id = u.user_id
+        WHERE us.skill_id IN %s
+    """, ((1, 2, 3),)),
+    ('link_rows', "SELECT skill_id FROM user_skills WHERE user_id = %s", (1,)),
+    ('match_members', """
+        SELECT u.member_id, u.first_name FROM users u WHERE u.pro_id = %s AND u.member_id != %s
+        UNION
+        SELECT u.member_id, u.first_name FROM users u JOIN user_skills us ON u.user_id = us.user_id
+        WHERE us.skill_id IN %s AND u.member_id != %s
+    """, (1, 'IND000000', (1, 2, 3), 'IND000000')),
+    ('match_members_for_company', "SELECT u.member_id, u.first_name FROM users u WHERE u.pro_id IN %s", ((1, 2),)),
+    ('match_companies', """
+        SELECT DISTINCT c.member_id FROM companies c JOIN comp_services cs ON c.comp_id = cs.comp_id
+        WHERE cs.pro_id IN %s AND c.comp_id != %s
+    """, ((1, 2), 1)),
+    ('unread_count', """
+        SELECT COUNT(*) as count FROM notifications
+        WHERE user_id = %s AND user_role = %s AND is_read = 0
+    """, (1, 'individual')),
+    ('notifications', f"""
+        SELECT {select_list('notification')} FROM notifications
+        WHERE user_id = %s AND user_role = 'individual' ORDER BY created_at DESC
+    """, (1,)),
+    ('chat_history', f"""
+        SELECT {select_list('chat_message')} FROM community_chat m
+        LEFT JOIN users u ON m.sender_id = u.member_id AND m.sender_role = 'individual'
+        LEFT JOIN companies c ON m.sender_id = c.member_id AND m.sender_role = 'company'
+        ORDER BY m.created_at DESC LIMIT 50
+    """, ()),
+    ('chat_cleanup', """
+        SELECT m.file_public_id FROM community_chat m
+        WHERE m.created_at < NOW() - INTERVAL 30 DAY ORDER BY m.created_at LIMIT 500
+    """, ()),
+    ('unused_chat_assets', """
+        SELECT public_id FROM chat_assets WHERE ref_count <= 0 AND last_used_at < NOW() - INTERVAL 1 DAY
+    """, ()),
+    ('expire_jobs', "SELECT job_id FROM jobs WHERE is_active = 1 AND expires_at <= NOW()", ()),
+    ('archive_batch', "SELECT job_id FROM jobs WHERE is_active = 0 ORDER BY job_id LIMIT 200", ()),
+    ('latest_upload', """
+        SELECT status FROM media_uploads WHERE member_id = %s ORDER BY upload_id DESC LIMIT 1
+    """, ('IND000000',)),
+    ('dashboard_news', "SELECT title FROM news_posts ORDER BY created_at DESC LIMIT 4", ()),
+]
+
+
+def explain(min_rows=100):
+    """Runs EXPLAIN on every registered query. Returns the names of those with a full scan."""
+    failed = []
+    conn = open_dedicated_connection()
+    try:
+        with conn.cursor() as cursor:
+            for name, sql, params in EXPLAIN_QUERIES:
+                cursor.execute(f"EXPLAIN {sql}", params)
+                scans = [row for row in cursor.fetchall()
+                         if row.get('type') == 'ALL' and (row.get('rows') or 0) >= min_rows]
+                if scans:
+                    failed.append(name)
+                    tables = ', '.join(f"{row['table']} (~{row['rows']} rows)" for row in scans)
+                    print(f"FULL SCAN {name}: {tables}")
+                else:
+                    print(f"ok        {name}")
+    finally:
+        conn.close()
+    print(f"{len(EXPLAIN_QUERIES) - len(failed)}/{len(EXPLAIN_QUERIES)} queries use indexes")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TechNest schema migrations")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help="list applied and pending migrations")
+    up = sub.add_parser('up', help="apply pending migrations")
+    up.add_argument('--to', type=int, help="stop after this version")
+    sub.add_parser('backfill', help="fill derived columns (chip summaries, avatar_url) left NULL")
+    check = sub.add_parser('explain', help="fail if a registered hot query does a full table scan")
+    check.add_argument('--min-rows', type=int, default=100,
+                       help="ignore full scans of tables estimated below this many rows")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        status()
+        return 0
+    if args.command == 'up':
+        migrate(args.to)
+        return 0
+    if args.command == 'backfill':
+        backfill_link_summaries()
+        backfill_avatars()
+        return 0
+    return 1 if explain(args.min_rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+-- Base schema: every table the app reads or writes, with primary keys only.
+-- Secondary indexes live in 0002 so existing databases get them the same way.
+-- Tables that already exist are left untouched (IF NOT EXISTS).
+
+CREATE TABLE IF NOT EXISTS auth (
+    member_id VARCHAR(20) NOT NULL PRIMARY KEY,
+    email VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    role ENUM('individual', 'company') NOT NULL,
+    reset_token VARCHAR(100) NULL,
+    reset_expires DATETIME NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS profession_category (
+    category_id INT AUTO_INCREMENT PRIMARY KEY,
+    category_name VARCHAR(100) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS profession (
+    pro_id INT AUTO_INCREMENT PRIMARY KEY,
+    pro_name VARCHAR(100) NOT NULL,
+    category_id INT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS skills_list (
+    skill_id INT AUTO_INCREMENT PRIMARY KEY,
+    skill_name VARCHAR(100) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS reference_data_version (
+    id TINYINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO reference_data_version (id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id INT AUTO_INCREMENT PRIMARY KEY,
+    member_id VARCHAR(20) NOT NULL,
+    first_name VARCHAR(100) NOT NULL,
+    second_name VARCHAR(100) NULL,
+    gender VARCHAR(20) NULL,
+    email VARCHAR(255) NOT NULL,
+    phone_no VARCHAR(30) NULL,
+    city VARCHAR(100) NULL,
+    DOB DATE NULL,
+    education VARCHAR(100) NULL,
+    experience VARCHAR(50) NULL,
+    pro_id INT NULL,
+    tagline VARCHAR(500) NULL,
+    pic_path VARCHAR(500) NULL,
+    profile_public_id VARCHAR(255) NULL,
+    linkedin_link VARCHAR(500) NULL,
+    other_link VARCHAR(500) NULL,
+    skills_json JSON NULL,
+    avatar_url VARCHAR(500) NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS user_skills (
+    user_id INT NOT NULL,
+    skill_id INT NOT NULL,
+    PRIMARY KEY (user_id, skill_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS companies (
+    comp_id INT AUTO_INCREMENT PRIMARY KEY,
+    member_id VARCHAR(20) NOT NULL,
+    company_name VARCHAR(255) NOT NULL,
+    owner_name VARCHAR(255) NULL,
+    established_year SMALLINT NULL,
+    employee_range VARCHAR(50) NULL,
+    city VARCHAR(100) NULL,
+    address VARCHAR(500) NULL,
+    google_map_url VARCHAR(1000) NULL,
+    about TEXT NULL,
+    company_logo VARCHAR(500) NULL,
+    logo_public_id VARCHAR(255) NULL,
+    email VARCHAR(255) NOT NULL,
+    web_url VARCHAR(500) NULL,
+    linkedin_url VARCHAR(500) NULL,
+    contact_no VARCHAR(30) NULL,
+    services_json JSON NULL,
+    avatar_url VARCHAR(500) NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS comp_services (
+    comp_id INT NOT NULL,
+    pro_id INT NOT NULL,
+    PRIMARY KEY (comp_id, pro_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    comp_id INT NOT NULL,
+    job_role VARCHAR(255) NOT NULL,
+    job_description TEXT NULL,
+    job_type VARCHAR(50) NULL,
+    external_link VARCHAR(500) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NULL,
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    skills_json JSON NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS job_skills (
+    job_id INT NOT NULL,
+    skill_id INT NOT NULL,
+    PRIMARY KEY (job_id, skill_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Filled by name from jobs (JOB_ARCHIVE_COLUMNS in jobs.py) plus archived_at
+CREATE TABLE IF NOT EXISTS jobs_archive LIKE jobs;
+ALTER TABLE jobs_archive ADD COLUMN archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+CREATE TABLE IF NOT EXISTS job_skills_archive LIKE job_skills;
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    user_role ENUM('individual', 'company') NOT NULL DEFAULT 'individual',
+    type VARCHAR(30) NOT NULL,
+    message VARCHAR(500) NULL,
+    is_read TINYINT(1) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS news_posts (
+    news_id INT AUTO_INCREMENT PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NULL,
+    category VARCHAR(50) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS daily_quiz (
+    id INT PRIMARY KEY,
+    question TEXT NOT NULL,
+    option_a VARCHAR(255) NULL,
+    option_b VARCHAR(255) NULL,
+    option_c VARCHAR(255) NULL,
+    option_d VARCHAR(255) NULL,
+    correct_option VARCHAR(255) NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS community_chat (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    sender_id VARCHAR(20) NOT NULL,
+    sender_role ENUM('individual', 'company') NOT NULL,
+    message TEXT NULL,
+    file_path VARCHAR(500) NULL,
+    file_name VARCHAR(255) NULL,
+    file_public_id VARCHAR(255) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Attachment dedup (chat.py) and the background upload queue (upload_queue.py)
+CREATE TABLE IF NOT EXISTS chat_assets (
+    content_hash CHAR(64) PRIMARY KEY,
+    public_id VARCHAR(255) NOT NULL UNIQUE,
+    url VARCHAR(500) NOT NULL,
+    resource_type VARCHAR(10) NOT NULL DEFAULT 'image',
+    bytes INT NOT NULL DEFAULT 0,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_chat_assets_unused (ref_count, last_used_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS media_uploads (
+    upload_id INT AUTO_INCREMENT PRIMARY KEY,
+    member_id VARCHAR(20) NOT NULL,
+    target ENUM('profile', 'logo') NOT NULL,
+    spool_path VARCHAR(255) NOT NULL,
+    file_name VARCHAR(255),
+    status ENUM('pending', 'uploading', 'done', 'failed') NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(255),
+    result_url VARCHAR(500),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_media_uploads_member (member_id, upload_id),
+    INDEX idx_media_uploads_status (status)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS admins (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(100) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
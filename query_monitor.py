@@ -0,0 +1,122 @@
+import os
+import re
+import sys
+from collections import Counter, deque
+from datetime import datetime
+from flask import g, request, has_request_context
+from pymysql.cursors import DictCursor
+from metrics import counter
+
+# --- Slow Query Log & N+1 Detector ---
+# Fed by db_manager.InstrumentedCursor after every statement. Statements over
+# SLOW_QUERY_MS are logged with their normalized SQL and the line of our code
+# that ran them. Within one request, a statement shape repeated N_PLUS_ONE_THRESHOLD
+# times (a query or INSERT inside a loop) is reported once when the request ends.
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+# Dev only: run EXPLAIN for flagged SELECTs and print the plan
+QUERY_EXPLAIN = os.getenv('QUERY_EXPLAIN', 'False').lower() == 'true'
+RECENT_SIZE = 50
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(PROJECT_DIR, 'db_manager.py')}
+
+slow_queries = counter('db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS', ('call_site',))
+n_plus_one = counter('db_repeated_statements_total', 'Requests that repeated one statement shape', ('endpoint',))
+
+# Most recent findings, newest first (shown by /admin/slow-queries)
+recent = deque(maxlen=RECENT_SIZE)
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_LIST = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(query):
+    """Statement shape: literals and placeholders become ?, IN/VALUES lists collapse."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    sql = _STRING.sub('?', query)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _VALUES_LIST.sub(r'\1, ...', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def call_site():
+    """file:line of the innermost frame in our own code (outside the DB layer)."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(PROJECT_DIR) and filename not in _SKIP_FILES:
+            return f"{os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _explain(cursor, query, args):
+    if not QUERY_EXPLAIN or not query.lstrip().upper().startswith('SELECT'):
+        return
+    try:
+        # A plain DictCursor: EXPLAIN must not be timed/flagged itself
+        with cursor.connection.cursor(DictCursor) as plain:
+            plain.execute(f"EXPLAIN {query}", args)
+            for row in plain.fetchall():
+                print(f"    EXPLAIN table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+                      f"rows={row.get('rows')} extra={row.get('Extra')}")
+    except Exception as e:
+        print(f"    EXPLAIN failed: {e}")
+
+
+def observe(cursor, query, args, duration):
+    """Called by the cursor after every statement."""
+    slow = duration * 1000 >= SLOW_QUERY_MS
+    in_request = has_request_context()
+    if not (slow or in_request):
+        return
+    sql = normalize_sql(query)
+
+    if slow:
+        site = call_site()
+        slow_queries.inc(site)
+        recent.appendleft({'kind': 'slow', 'at': datetime.now().isoformat(timespec='seconds'),
+                           'ms': round(duration * 1000, 1), 'sql': sql, 'call_site': site})
+        print(f"Slow Query ({duration * 1000:.0f} ms) at {site}: {sql}")
+        _explain(cursor, query, args)
+
+    if not in_request:
+        return
+    counts = g.get('statement_counts')
+    if counts is None:
+        counts = g.statement_counts = Counter()
+        g.statement_sites = {}
+    counts[sql] += 1
+    if counts[sql] == N_PLUS_ONE_THRESHOLD:
+        # Capture where the loop is once; the report is printed at teardown
+        g.statement_sites[sql] = call_site()
+        _explain(cursor, query, args)
+
+
+def init_query_monitor(app):
+    @app.teardown_request
+    def report_repeated_statements(exc):
+        """One line per statement shape that ran in a loop during this request."""
+        _report_repeated()
+
+
+def _report_repeated():
+    sites = g.pop('statement_sites', None)
+    if not sites:
+        return
+    endpoint = request.endpoint or 'unmatched'
+    n_plus_one.inc(endpoint)
+    for sql, site in sites.items():
+        count = g.statement_counts[sql]
+        recent.appendleft({'kind': 'repeated', 'at': datetime.now().isoformat(timespec='seconds'),
+                           'count': count, 'sql': sql, 'call_site': site, 'endpoint': endpoint})
+        print(f"N+1 Suspect in {endpoint}: {count}x at {site}: {sql}")
@@ -0,0 +1,118 @@
+import os
+import re
+import sys
+from jinja2 import Environment, FileSystemLoader, nodes
+
+# --- Query Profiles ---
+# Named column lists for the hot list views, so card queries fetch what the
+# card shows instead of u.* / c.* / j.* (long about/job_description text of
+# unrelated columns, public_id bookkeeping, ...). Each profile lists:
+#   columns  - the SELECT list, used via select_list(profile)
+#   derived  - keys the Python code adds to every row after the query
+#   template - (template, loop variable) rendering the rows
+#
+#   python query_profiles.py   # fails if a template reads a field no profile provides
+
+QUERY_PROFILES = {
+    'member_card': {
+        'columns': (
+            'u.member_id', 'u.first_name', 'u.second_name', 'u.gender', 'u.email', 'u.city',
+            'u.education', 'u.experience', 'u.pro_id', 'u.tagline', 'u.linkedin_link',
+            'u.other_link', 'u.avatar_url', 'u.skills_json',
+        ),
+        'derived': ('skills', 'profession_name', 'display_name'),
+        'template': ('partials/_member_card.html', 'member'),
+    },
+    'company_card': {
+        'columns': (
+            'c.member_id', 'c.company_name', 'c.owner_name', 'c.established_year',
+            'c.employee_range', 'c.city', 'c.address', 'c.google_map_url', 'c.about',
+            'c.email', 'c.web_url', 'c.linkedin_url', 'c.contact_no', 'c.avatar_url',
+            'c.services_json',
+        ),
+        'derived': ('services',),
+        'template': ('partials/_company_card.html', 'company'),
+    },
+    'job_card': {
+        'columns': (
+            'j.job_id', 'j.job_role', 'j.job_type', 'j.job_description', 'j.external_link',
+            'j.created_at', 'j.expires_at', 'j.skills_json',
+            'c.company_name', 'c.avatar_url', 'c.city',
+        ),
+        'derived': ('skills',),
+        'template': ('partials/_job_card.html', 'job'),
+    },
+    'job_feed': {
+        'columns': (
+            'j.job_id', 'j.job_role', 'j.job_type', 'j.job_description', 'j.external_link',
+            'j.created_at', 'j.skills_json',
+            'c.company_name', 'c.avatar_url', 'c.member_id',
+            'DATEDIFF(j.expires_at, NOW()) AS days_left',
+        ),
+        'derived': ('all_skills',),
+        'template': ('dashboard/job_board.html', 'job'),
+    },
+    'notification': {
+        'columns': ('id', 'type', 'message', 'is_read', 'created_at'),
+        'derived': (),
+        'template': ('dashboard/notifications.html', 'n'),
+    },
+    'chat_message': {
+        'columns': (
+            'm.sender_id', 'm.sender_role', 'm.message', 'm.file_path', 'm.file_name', 'm.created_at',
+            'u.first_name AS u_name', 'u.pic_path AS u_pic', 'u.member_id AS u_mid',
+            'c.company_name AS c_name', 'c.company_logo AS c_pic', 'c.member_id AS c_mid',
+            'COALESCE(u.avatar_url, c.avatar_url) AS avatar',
+        ),
+        'derived': ('display_name', 'raw_file', 'sender_member_id', 'is_comp', 'formatted_time'),
+        'template': ('dashboard/chat.html', 'msg'),
+    },
+}
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
+def select_list(profile):
+    """The profile's columns as a SELECT list."""
+    return ', '.join(QUERY_PROFILES[profile]['columns'])
+
+
+def row_fields(profile):
+    """Keys every row of this profile carries: column names/aliases plus derived keys."""
+    spec = QUERY_PROFILES[profile]
+    names = {re.split(r'\s+AS\s+|\.', column, flags=re.IGNORECASE)[-1] for column in spec['columns']}
+    return names | set(spec['derived'])
+
+
+def template_fields(template, variable):
+    """Attributes/items a template reads from `variable` (e.g. member.city, member['city'])."""
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+    source = env.loader.get_source(env, template)[0]
+    found = set()
+    for node in env.parse(source).find_all((nodes.Getattr, nodes.Getitem)):
+        if not (isinstance(node.node, nodes.Name) and node.node.name == variable):
+            continue
+        if isinstance(node, nodes.Getattr):
+            found.add(node.attr)
+        elif isinstance(node.arg, nodes.Const):
+            found.add(node.arg.value)
+    return found
+
+
+def check():
+    """Returns {profile: fields its template reads but the profile doesn't provide}."""
+    problems = {}
+    for profile, spec in QUERY_PROFILES.items():
+        missing = template_fields(*spec['template']) - row_fields(profile)
+        if missing:
+            problems[profile] = sorted(missing)
+    return problems
+
+
+if __name__ == '__main__':
+    problems = check()
+    for profile, missing in problems.items():
+        print(f"{profile} ({QUERY_PROFILES[profile]['template'][0]}): not projected: {', '.join(missing)}")
+    if not problems:
+        print(f"All {len(QUERY_PROFILES)} query profiles cover their templates")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,200 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime
+from db_manager import open_dedicated_connection
+from tracing import trace_root
+
+# --- Periodic Task Scheduler ---
+# Every worker process runs a scheduler loop, but only the leader executes
+# tasks. Leadership is a MySQL advisory lock (GET_LOCK) held on a dedicated
+# connection, or an flock() on a local file for single-host setups.
+
+SCHEDULER_LOCK = os.getenv('SCHEDULER_LOCK', 'db')  # 'db' or 'file'
+SCHEDULER_LOCK_NAME = os.getenv('SCHEDULER_LOCK_NAME', 'technest_scheduler')
+SCHEDULER_LOCK_FILE = os.getenv('SCHEDULER_LOCK_FILE', '/tmp/technest_scheduler.lock')
+SCHEDULER_TICK = int(os.getenv('SCHEDULER_TICK', 5))  # seconds between checks
+HISTORY_SIZE = 20
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_interval(value):
+    """Accepts seconds or a short string like '30m', '6h', '1d'."""
+    if isinstance(value, (int, float)):
+        return value
+    value = str(value).strip().lower()
+    if value[-1] in INTERVAL_UNITS:
+        return float(value[:-1]) * INTERVAL_UNITS[value[-1]]
+    return float(value)
+
+
+class DbLeaderLock:
+    """Leader lock backed by GET_LOCK; MySQL releases it if our connection dies."""
+
+    def __init__(self, name):
+        self.name = name
+        self.conn = None
+
+    def acquire(self):
+        try:
+            if self.conn is None:
+                self.conn = open_dedicated_connection()
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (self.name,))
+                return bool(cursor.fetchone()['acquired'])
+        except Exception as e:
+            print(f"Scheduler Lock Error: {e}")
+            self._reset()
+            return False
+
+    def still_held(self):
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID() AS held", (self.name,))
+                return bool(cursor.fetchone()['held'])
+        except Exception as e:
+            print(f"Scheduler Lock Lost: {e}")
+            self._reset()
+            return False
+
+    def _reset(self):
+        try:
+            if self.conn:
+                self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+
+
+class FileLeaderLock:
+    """Leader lock backed by flock(); the OS releases it if the process dies."""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def acquire(self):
+        import fcntl
+        try:
+            if self.handle is None:
+                self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def still_held(self):
+        return self.handle is not None
+
+
+class Scheduler:
+    def __init__(self, lock):
+        self.lock = lock
+        self.tasks = {}
+        self.is_leader = False
+        self._started = False
+        self._pool = None
+
+    def register(self, name, func, interval, jitter=0.1, timeout=None):
+        """
+        Runs func every `interval` ('30m', '6h' or seconds), +/- jitter as a fraction of the interval.
+        A run longer than `timeout` is recorded as timed out and the task is not
+        started again until it actually finishes.
+        """
+        interval = parse_interval(interval)
+        timeout = parse_interval(timeout) if timeout else None
+        self.tasks[name] = {
+            'func': func,
+            'interval': interval,
+            'jitter': jitter,
+            'timeout': timeout,
+            # Spread first runs so restarts don't stampede
+            'next_run': time.time() + random.uniform(0, interval * jitter),
+            'running': None,
+            'history': deque(maxlen=HISTORY_SIZE),
+        }
+
+    def _schedule_next(self, task, started):
+        spread = task['interval'] * task['jitter']
+        task['next_run'] = started + task['interval'] + random.uniform(-spread, spread)
+
+    def _run(self, name, task):
+        started = time.time()
+        entry = {'started': datetime.now(), 'duration': None, 'status': 'running', 'error': None}
+        task['history'].appendleft(entry)
+
+        # Scheduled runs are rare, so every one of them is traced
+        future = self._pool.submit(trace_root('task', name, sample_rate=1.0)(task['func']))
+        task['running'] = future
+        try:
+            future.result(timeout=task['timeout'])
+            entry['status'] = 'ok'
+        except FutureTimeout:
+            entry['status'] = 'timeout'
+            print(f"Scheduler: task '{name}' exceeded {task['timeout']}s")
+        except Exception as e:
+            entry['status'] = 'error'
+            entry['error'] = str(e)
+            print(f"Scheduler: task '{name}' failed: {e}")
+        finally:
+            entry['duration'] = round(time.time() - started, 3)
+
+    def _check_leadership(self):
+        if self.is_leader and not self.lock.still_held():
+            print("Scheduler: leadership lost")
+            self.is_leader = False
+        if not self.is_leader and self.lock.acquire():
+            print(f"Scheduler: this worker (pid {os.getpid()}) is now the leader")
+            self.is_leader = True
+
+    def _loop(self):
+        while True:
+            try:
+                self._check_leadership()
+                if self.is_leader:
+                    now = time.time()
+                    for name, task in self.tasks.items():
+                        busy = task['running'] is not None and not task['running'].done()
+                        if now >= task['next_run'] and not busy:
+                            self._schedule_next(task, now)
+                            # Each task waits on its own thread so a slow one never delays the others
+                            threading.Thread(target=self._run, args=(name, task), daemon=True).start()
+            except Exception as e:
+                print(f"Scheduler Loop Error: {e}")
+            time.sleep(SCHEDULER_TICK)
+
+    def start(self):
+        if self._started or not self.tasks:
+            return
+        self._started = True
+        self._pool = ThreadPoolExecutor(max_workers=len(self.tasks), thread_name_prefix='scheduled-task')
+        threading.Thread(target=self._loop, daemon=True, name='scheduler').start()
+
+    def get_history(self):
+        """Snapshot for the admin status endpoint."""
+        return {
+            'is_leader': self.is_leader,
+            'pid': os.getpid(),
+            'tasks': {
+                name: {
+                    'interval': task['interval'],
+                    'next_run': datetime.fromtimestamp(task['next_run']).isoformat(timespec='seconds'),
+                    'history': [dict(h, started=h['started'].isoformat(timespec='seconds'))
+                                for h in task['history']],
+                }
+                for name, task in self.tasks.items()
+            },
+        }
+
+
+def _make_lock():
+    if SCHEDULER_LOCK == 'file':
+        return FileLeaderLock(SCHEDULER_LOCK_FILE)
+    return DbLeaderLock(SCHEDULER_LOCK_NAME)
+
+
+# One scheduler per process; tasks are registered in app.py
+scheduler = Scheduler(_make_lock())
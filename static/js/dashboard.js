@@ -66,6 +66,30 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         });
     }
+
+    // 4. Pending Picture/Logo Upload
+    // The background worker finishes the upload after the redirect; poll until it's done
+    const pendingImg = document.querySelector('img[data-upload-status]');
+    if (pendingImg) {
+        const pollUpload = () => {
+            fetch(pendingImg.dataset.uploadStatus)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.status === 'done') {
+                        pendingImg.src = job.url;
+                    } else if (job.status === 'failed') {
+                        if (fileHint) {
+                            fileHint.innerText = 'Upload failed, please try again';
+                            fileHint.style.color = 'red';
+                        }
+                    } else if (job.status !== 'none') {
+                        setTimeout(pollUpload, 3000);
+                    }
+                })
+                .catch(err => console.error('Error fetching upload status:', err));
+        };
+        setTimeout(pollUpload, 3000);
+    }
 });
 
 // 1. Put this at the VERY TOP of the file
@@ -220,7 +244,7 @@ document.addEventListener('DOMContentLoaded', function () {
                             message: "",
                             file_path: result.file_path,
                             file_name: result.file_name,
-                            file_public_id: result.file_public_id
+                            file_token: result.file_token
                         });
                         this.value = ""; // Clear input
                     } else {
@@ -0,0 +1,216 @@
+import os
+import time
+import uuid
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+# --- Request Tracing ---
+# A sampled request, socket event or scheduled task gets a trace; code inside
+# it opens spans (with_db functions, SQL statements, Cloudinary calls, mail
+# sends, template rendering). Finished traces go to an in-process ring buffer
+# that /admin/traces renders as waterfalls. The current trace lives in a
+# thread local, which eventlet turns into a greenlet local.
+
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.1))  # 0.0 - 1.0
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 200))
+MAX_SPANS_PER_TRACE = 500  # a runaway loop must not grow one trace forever
+
+_local = threading.local()
+traces = deque(maxlen=TRACE_BUFFER_SIZE)  # finished traces, newest first
+
+
+class Trace:
+    def __init__(self, kind, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.name = name
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.spans = []   # [name, start offset, duration, depth, attrs]
+        self.stack = []   # indexes of open spans
+        self.dropped = 0
+
+    def open_span(self, name, attrs):
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped += 1
+            self.stack.append(None)
+            return
+        self.spans.append([name, time.perf_counter() - self.start, None, len(self.stack), attrs])
+        self.stack.append(len(self.spans) - 1)
+
+    def close_span(self, error=None):
+        index = self.stack.pop() if self.stack else None
+        if index is None:
+            return
+        span = self.spans[index]
+        span[2] = time.perf_counter() - self.start - span[1]
+        if error is not None:
+            span[4] = dict(span[4], error=str(error))
+
+    def add_span(self, name, duration, attrs):
+        """A span that already finished (e.g. a timed SQL statement)."""
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped += 1
+            return
+        end = time.perf_counter() - self.start
+        self.spans.append([name, end - duration, duration, len(self.stack), attrs])
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'kind': self.kind,
+            'name': self.name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_ms': round((self.duration or 0) * 1000, 2),
+            'status': self.status,
+            'dropped_spans': self.dropped,
+            'spans': [{'name': s[0], 'offset_ms': round(s[1] * 1000, 2),
+                       'duration_ms': round((s[2] or 0) * 1000, 2), 'depth': s[3], 'attrs': s[4]}
+                      for s in self.spans],
+        }
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def start_trace(kind, name, sample_rate=None):
+    """Starts a trace for this greenlet if it is sampled. Returns it (or None)."""
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate:
+        _local.trace = None
+        return None
+    _local.trace = Trace(kind, name)
+    return _local.trace
+
+
+def finish_trace(status=None):
+    trace = current_trace()
+    if trace is None:
+        return None
+    _local.trace = None
+    # Close anything left open by an exception
+    while trace.stack:
+        trace.close_span()
+    trace.duration = time.perf_counter() - trace.start
+    trace.status = status
+    traces.appendleft(trace)
+    return trace
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'attrs')
+
+    def __init__(self, trace, name, attrs):
+        self.trace, self.name, self.attrs = trace, name, attrs
+
+    def __enter__(self):
+        self.trace.open_span(self.name, self.attrs)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.close_span(exc)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, **attrs):
+    """Context manager timing a block; free when the current work isn't traced."""
+    trace = current_trace()
+    return _NO_SPAN if trace is None else _Span(trace, name, attrs)
+
+
+def record_span(name, duration, **attrs):
+    trace = current_trace()
+    if trace is not None:
+        trace.add_span(name, duration, attrs)
+
+
+def traced(name=None):
+    """Decorator form of span()."""
+    def decorator(f):
+        label = name or f.__name__
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with span(label):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def trace_root(kind, name, sample_rate=None):
+    """Decorator for entry points outside HTTP (socket handlers, scheduled tasks)."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            start_trace(kind, name, sample_rate)
+            status = 'error'
+            try:
+                result = f(*args, **kwargs)
+                status = 'ok'
+                return result
+            finally:
+                finish_trace(status)
+        return decorated_function
+    return decorator
+
+
+def slowest(limit=20, kind=None):
+    selected = [t for t in list(traces) if kind is None or t.kind == kind]
+    return sorted(selected, key=lambda t: t.duration or 0, reverse=True)[:limit]
+
+
+def find(trace_id):
+    return next((t for t in list(traces) if t.trace_id == trace_id), None)
+
+
+def init_tracing(app):
+    from flask import request, template_rendered, before_render_template
+
+    @app.before_request
+    def begin_request_trace():
+        start_trace('http', f"{request.method} {request.endpoint or request.path}")
+
+    @app.after_request
+    def tag_response(response):
+        trace = current_trace()
+        if trace is not None:
+            trace.status = response.status_code
+            response.headers['X-Trace-Id'] = trace.trace_id
+        return response
+
+    @app.teardown_request
+    def end_request_trace(exc):
+        trace = current_trace()
+        if trace is not None:
+            finish_trace(trace.status or (500 if exc else None))
+
+    # Template rendering shows up as its own span
+    def render_started(sender, template, context, **extra):
+        trace = current_trace()
+        if trace is not None:
+            trace.open_span(f"render {template.name}", {})
+
+    def render_finished(sender, template, context, **extra):
+        trace = current_trace()
+        if trace is not None:
+            trace.close_span()
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
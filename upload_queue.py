@@ -0,0 +1,282 @@
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from flask import after_this_request
+from db_manager import with_db
+from upload_service import upload_to_cloudinary, validate_upload
+from image_service import render_image
+from fragment_cache import invalidate
+from avatars import refresh_avatar
+from tracing import trace_root, span
+
+# --- Background Media Upload Queue ---
+# Requests spool the file to local disk, record a 'pending' job and return
+# immediately. A worker thread uploads to Cloudinary and then writes the
+# final URL into users.pic_path / companies.company_logo.
+
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'technest_uploads'))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv('UPLOAD_MAX_ATTEMPTS', 4))
+UPLOAD_RETRY_DELAY = int(os.getenv('UPLOAD_RETRY_DELAY', 15))  # seconds, doubled on every retry
+# A job untouched this long lost its worker (crash/restart) and may be taken
+# over. Well above UPLOAD_TIMEOUT per Cloudinary request, so a live upload is never reclaimed.
+UPLOAD_STALE_MINUTES = int(os.getenv('UPLOAD_STALE_MINUTES', 15))
+UPLOAD_RECLAIM_SECONDS = int(os.getenv('UPLOAD_RECLAIM_SECONDS', 300))  # idle worker's check for stale jobs
+
+# Pictures and logos: checked by size, extension and magic bytes before queueing
+MEDIA_UPLOAD_MAX_BYTES = 2 * 1024 * 1024
+MEDIA_UPLOAD_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+# target -> (Cloudinary subfolder, table, url column, public_id column)
+UPLOAD_TARGETS = {
+    'profile': ('profiles', 'users', 'pic_path', 'profile_public_id'),
+    'logo': ('logos', 'companies', 'company_logo', 'logo_public_id'),
+}
+# Whose avatar_url a finished upload changes
+TARGET_ROLES = {
+    'profile': 'individual',
+    'logo': 'company',
+}
+# Cached listings that show the picture/logo
+TARGET_LISTINGS = {
+    'profile': ('members',),
+    'logo': ('companies', 'jobs'),
+}
+
+_job_queue = queue.Queue()
+_worker_lock = threading.Lock()
+_worker_started = False
+
+
+# --- 1. DB Helpers ---
+# media_uploads is created by migrations/0001_base_schema.sql
+def _insert_job_row(cursor, member_id, target, spool_path, file_name):
+    cursor.execute("""
+        INSERT INTO media_uploads (member_id, target, spool_path, file_name)
+        VALUES (%s, %s, %s, %s)
+    """, (member_id, target, spool_path, file_name))
+    return cursor.lastrowid
+
+
+@with_db
+def _insert_job(conn, member_id, target, spool_path, file_name):
+    with conn.cursor() as cursor:
+        return _insert_job_row(cursor, member_id, target, spool_path, file_name)
+
+
+@with_db
+def _claim_job(conn, upload_id):
+    """Marks a pending job as uploading. Returns the job row, or None if someone else has it."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE media_uploads SET status = 'uploading', attempts = attempts + 1
+            WHERE upload_id = %s AND status = 'pending'
+        """, (upload_id,))
+        if cursor.rowcount == 0:
+            return None
+        cursor.execute("SELECT * FROM media_uploads WHERE upload_id = %s", (upload_id,))
+        return cursor.fetchone()
+
+
+@with_db
+def _complete_job(conn, job, url, public_id):
+    """Points the profile/logo at the uploaded file and closes the job in one transaction."""
+    _, table, url_col, public_id_col = UPLOAD_TARGETS[job['target']]
+    with conn.cursor() as cursor:
+        # Table/column names come from the UPLOAD_TARGETS whitelist above
+        cursor.execute(f"UPDATE {table} SET {url_col} = %s, {public_id_col} = %s WHERE member_id = %s",
+                       (url, public_id, job['member_id']))
+        refresh_avatar(cursor, TARGET_ROLES[job['target']], job['member_id'])
+        cursor.execute("""
+            UPDATE media_uploads SET status = 'done', result_url = %s, last_error = NULL
+            WHERE upload_id = %s
+        """, (url, job['upload_id']))
+
+
+@with_db
+def _fail_job(conn, upload_id, error, final):
+    with conn.cursor() as cursor:
+        cursor.execute("UPDATE media_uploads SET status = %s, last_error = %s WHERE upload_id = %s",
+                       ('failed' if final else 'pending', str(error)[:255], upload_id))
+
+
+@with_db
+def _stale_job_ids(conn):
+    """
+    Jobs nobody has touched for UPLOAD_STALE_MINUTES: left pending or interrupted
+    mid-upload by a worker that died. Jobs another live worker holds are newer.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT upload_id FROM media_uploads
+            WHERE status IN ('pending', 'uploading') AND updated_at < NOW() - INTERVAL %s MINUTE
+            ORDER BY upload_id FOR UPDATE
+        """, (UPLOAD_STALE_MINUTES,))
+        upload_ids = [row['upload_id'] for row in cursor.fetchall()]
+        if upload_ids:
+            # Back to pending so _claim_job can take them (first claimer wins)
+            cursor.execute("""
+                UPDATE media_uploads SET status = 'pending'
+                WHERE upload_id IN %s AND status = 'uploading'
+            """, (tuple(upload_ids),))
+        return upload_ids
+
+
+@with_db
+def get_upload_status(conn, member_id):
+    """Latest upload job for a member (used by the status endpoint)."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT upload_id, target, status, attempts, result_url, updated_at
+                FROM media_uploads WHERE member_id = %s
+                ORDER BY upload_id DESC LIMIT 1
+            """, (member_id,))
+            return cursor.fetchone()
+    except Exception as e:
+        print(f"Upload Status Error: {e}")
+        return None
+
+
+# --- 2. Worker ---
+def _remove_spool_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@trace_root('task', 'media_upload', sample_rate=1.0)
+def _process_job(upload_id):
+    job = _claim_job(upload_id)
+    if not job:
+        return
+
+    subfolder = UPLOAD_TARGETS[job['target']][0]
+    if not os.path.exists(job['spool_path']):
+        # Spooled on another host or already cleaned up; nothing left to retry
+        _fail_job(upload_id, "Spool file missing", final=True)
+        return
+
+    # Resize + re-encode first; the copy takes the member_id public_id so
+    # existing delete logic (profile_public_id / logo_public_id) keeps working
+    try:
+        rendered_path = render_image(job['spool_path'])
+    except ValueError as e:
+        # Passed the magic-byte check but doesn't decode: every retry would fail the same way
+        _fail_job(upload_id, e, final=True)
+        _remove_spool_file(job['spool_path'])
+        print(f"Background upload {upload_id} rejected: {e}")
+        return
+
+    if rendered_path:
+        result = upload_to_cloudinary(rendered_path, subfolder, job['member_id'])
+        _remove_spool_file(rendered_path)
+    else:
+        result = upload_to_cloudinary(job['spool_path'], subfolder, job['member_id'], filename=job['file_name'])
+
+    if result:
+        _complete_job(job, result['secure_url'], result['public_id'])
+        invalidate(*TARGET_LISTINGS[job['target']])
+        _remove_spool_file(job['spool_path'])
+        print(f"Background upload {upload_id} finished for {job['member_id']}")
+        return
+
+    final = job['attempts'] >= UPLOAD_MAX_ATTEMPTS
+    _fail_job(upload_id, "Cloudinary upload failed", final)
+    if final:
+        _remove_spool_file(job['spool_path'])
+        print(f"Background upload {upload_id} failed after {job['attempts']} attempts")
+    else:
+        # Exponential backoff before the job goes back on the queue
+        delay = UPLOAD_RETRY_DELAY * (2 ** (job['attempts'] - 1))
+        threading.Timer(delay, _job_queue.put, args=(upload_id,)).start()
+
+
+def _requeue_stale_jobs():
+    try:
+        for upload_id in _stale_job_ids():
+            _job_queue.put(upload_id)
+    except Exception as e:
+        print(f"Upload Queue Recovery Error: {e}")
+
+
+def _worker_loop():
+    while True:
+        try:
+            upload_id = _job_queue.get(timeout=UPLOAD_RECLAIM_SECONDS)
+        except queue.Empty:
+            _requeue_stale_jobs()
+            continue
+        try:
+            _process_job(upload_id)
+        except Exception as e:
+            print(f"Upload Worker Error (job {upload_id}): {e}")
+        finally:
+            _job_queue.task_done()
+
+
+def start_upload_worker():
+    """Starts the worker once per process and re-queues stale jobs left from a previous run."""
+    global _worker_started
+    with _worker_lock:
+        if _worker_started:
+            return
+        _worker_started = True
+
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    _requeue_stale_jobs()
+
+    thread = threading.Thread(target=_worker_loop, daemon=True, name='media-upload-worker')
+    thread.start()
+
+
+# --- 3. Public API ---
+def validate_media_upload(file_obj):
+    """Error message for a picture/logo that can't be queued, or None if it's acceptable."""
+    return validate_upload(file_obj, max_bytes=MEDIA_UPLOAD_MAX_BYTES, allowed_extensions=MEDIA_UPLOAD_EXTENSIONS)
+
+
+def queue_media_upload(file_obj, target, member_id, cursor=None):
+    """
+    Spools the upload to local disk and queues it for Cloudinary.
+    The worker owns the pic/logo columns: callers must not write them themselves.
+    Inside a request's transaction pass its cursor: the job row then commits or
+    rolls back with the caller's changes and reaches the worker only once the
+    request succeeded (a rolled-back edit never gets its picture applied).
+    Returns the job id, or None (also for a file validate_media_upload rejects).
+    """
+    if target not in UPLOAD_TARGETS or validate_media_upload(file_obj):
+        return None
+
+    start_upload_worker()
+
+    # Random spool name: never trust the client filename on disk
+    spool_path = os.path.join(UPLOAD_SPOOL_DIR, f"{member_id}-{uuid.uuid4().hex}")
+    try:
+        file_obj.stream.seek(0)
+        file_obj.save(spool_path)  # Streams the spooled temp file to disk in chunks
+        if cursor is not None:
+            upload_id = _insert_job_row(cursor, member_id, target, spool_path, file_obj.filename)
+        else:
+            upload_id = _insert_job(member_id, target, spool_path, file_obj.filename)
+    except Exception as e:
+        print(f"Upload Queue Error: {e}")
+        _remove_spool_file(spool_path)
+        return None
+
+    if cursor is None:
+        _job_queue.put(upload_id)
+        return upload_id
+
+    # Runs after @with_db committed the view's transaction (or after the error response)
+    @after_this_request
+    def _enqueue(response):
+        if response.status_code < 400:
+            _job_queue.put(upload_id)
+        else:
+            _remove_spool_file(spool_path)
+        return response
+
+    return upload_id
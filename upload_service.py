@@ -0,0 +1,180 @@
+import os
+import hashlib
+import cloudinary.uploader
+from tracing import span
+
+# --- Upload Settings ---
+# Cloudinary needs chunks of at least 5 MB; anything smaller goes up in one part.
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 6 * 1024 * 1024))
+# Socket timeout of each Cloudinary request (one per chunk). A stalled transfer
+# fails with an error instead of holding its caller; nothing keeps running after it.
+UPLOAD_TIMEOUT = int(os.getenv('UPLOAD_TIMEOUT', 120))
+
+# Magic bytes -> file kind. Only the first few bytes of the upload are read.
+MAGIC_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'%PDF-', 'pdf'),
+    (b'PK\x03\x04', 'zip'),   # zip and docx (docx is a zip container)
+    (b'Rar!\x1a\x07', 'rar'),
+]
+
+# Extension -> kinds its content is allowed to sniff as
+EXTENSION_KINDS = {
+    'png': {'png'},
+    'jpg': {'jpg'},
+    'jpeg': {'jpg'},
+    'gif': {'gif'},
+    'webp': {'webp'},
+    'pdf': {'pdf'},
+    'zip': {'zip'},
+    'docx': {'zip'},
+    'rar': {'rar'},
+    'txt': {'text'},
+}
+
+
+def _stream_of(file_obj):
+    """Returns the underlying spooled stream of a werkzeug FileStorage (or the object itself)."""
+    return getattr(file_obj, 'stream', file_obj)
+
+
+def get_upload_size(file_obj):
+    """Size of an upload in bytes, measured on the spooled temp file (body is never read)."""
+    # Not the part's Content-Length header: the client sets it, so it can't enforce a limit
+    stream = _stream_of(file_obj)
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def sniff_file_kind(file_obj):
+    """Detects the real file kind from its magic bytes. Returns None if unknown."""
+    stream = _stream_of(file_obj)
+    stream.seek(0)
+    header = stream.read(512)
+    stream.seek(0)
+
+    for signature, kind in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return kind
+    # WEBP is a RIFF container: the format tag sits after the chunk size
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+
+    # Plain text has no signature; treat NUL-free, decodable headers as text
+    if header and b'\x00' not in header:
+        try:
+            header.decode('utf-8')
+            return 'text'
+        except UnicodeDecodeError:
+            pass
+    return None
+
+
+def validate_upload(file_obj, max_bytes=None, allowed_extensions=None):
+    """
+    Checks size and type of an upload without materialising it.
+    Returns an error message, or None if the file is acceptable.
+    """
+    if not file_obj or not file_obj.filename:
+        return "No selected file"
+
+    size = get_upload_size(file_obj)
+    if size == 0:
+        return "File is empty"
+    if max_bytes and size > max_bytes:
+        return f"File too large. Max {max_bytes // (1024 * 1024)}MB allowed."
+
+    extension = file_obj.filename.rsplit('.', 1)[-1].lower() if '.' in file_obj.filename else ''
+    if allowed_extensions is not None and extension not in allowed_extensions:
+        return "File type not allowed"
+
+    # The declared extension must match what the bytes actually are
+    expected = EXTENSION_KINDS.get(extension)
+    if expected is not None and sniff_file_kind(file_obj) not in expected:
+        return "File content does not match its extension"
+
+    return None
+
+
+def hash_upload(file_obj, chunk_size=64 * 1024):
+    """Streaming SHA-256 of an upload (reads the spooled file in chunks, then rewinds)."""
+    stream = _stream_of(file_obj)
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _folder_options(subfolder, member_id):
+    """Cloudinary folder/public_id rules shared by every upload."""
+    if subfolder == 'chat':
+        # Random ID for chat to prevent collisions
+        return {'folder': "technest/uploads/chat_files", 'public_id': None, 'overwrite': False}
+    # Overwrite for profiles/logos, keyed by member_id
+    return {'folder': f"technest/uploads/{subfolder}", 'public_id': str(member_id), 'overwrite': True}
+
+
+def _chunked_upload(source, filename, options):
+    """Streams the file to Cloudinary chunk by chunk."""
+    return cloudinary.uploader.upload_large(
+        source,
+        chunk_size=UPLOAD_CHUNK_SIZE,
+        timeout=UPLOAD_TIMEOUT,
+        resource_type="auto",  # 'auto' handles PDF, JPG, PNG correctly
+        filename=filename,     # Helps Cloudinary detect MIME type
+        **options
+    )
+
+
+def upload_to_cloudinary(source, subfolder, member_id=None, filename=None):
+    """
+    Streams a file (FileStorage, open file or local path) to Cloudinary.
+    Returns the full Cloudinary result dict, or None on failure.
+    Blocks the caller for the transfer; under eventlet the socket I/O yields
+    to other greenlets, so only this request (or upload job) waits.
+    """
+    if not source:
+        return None
+
+    try:
+        if isinstance(source, str):
+            # Local spool path: the upload opens (and closes) the file itself
+            filename = filename or os.path.basename(source)
+        else:
+            filename = filename or getattr(source, 'filename', None) or 'upload'
+            source = _stream_of(source)
+            source.seek(0)
+
+        with span('cloudinary.upload', subfolder=subfolder):
+            return _chunked_upload(source, filename, _folder_options(subfolder, member_id))
+
+    except Exception as e:
+        print(f"Cloudinary Upload Error: {e}")
+        return None
+
+
+def save_to_cloudinary(file_obj, subfolder, member_id=None):
+    """
+    Streams an upload to Cloudinary straight from the request's spooled temp file.
+    Returns (secure_url, public_id) or (None, None).
+    """
+    if not file_obj:
+        return None, None
+
+    # Safety Check: Did we actually get data?
+    if get_upload_size(file_obj) == 0:
+        print("!!! ERROR: File is empty (0 bytes).")
+        return None, None
+
+    result = upload_to_cloudinary(file_obj, subfolder, member_id)
+    if not result:
+        return None, None
+    return result['secure_url'], result['public_id']